@@ -1,27 +1,38 @@
 
 import json
 from typing import  List, Dict, Optional, Union, Any
-import copy
 from typing import List, Callable, Union
-from jsonschema import validate, ValidationError
+from jsonschema import validate, ValidationError, Draft7Validator
+from jsonschema.exceptions import best_match
 import inspect
-from repl.tools import web_search, get_weather, date,  ask_user, write_code, find_symbol, read_url
-from repl.prompts import ACTION_SCHEMA, REFLECTION_SCHEMA, SYSTEM_PROMPTS, PLANNER_SCHEMA, REQUIREMENTS_SCHEMA , STEP_CONFIG
-from repl.util import process_and_print_streaming_response, function_to_string
-from datetime import datetime
-from openai import OpenAI
+import contextlib
+from repl.prompts import ACTION_SCHEMA, REFLECTION_SCHEMA, SYSTEM_PROMPTS, PLANNER_SCHEMA, REQUIREMENTS_SCHEMA , STEP_CONFIG, FUSED_STEP_CONFIG, SHARED_PREAMBLE, PromptTemplate, get_current_date
+from repl.util import process_and_print_streaming_response, function_to_string, merge_fields
 from repl.types import Result, Agent
 import logging
-from requests.exceptions import RequestException, Timeout, ConnectionError
-from repl.llm import LLM
-
-
-logging.basicConfig(
-    filename="app.log",  # Log file name
-    filemode="a",        # Append mode (use "w" to overwrite)
-    format="%(asctime)s - %(levelname)s - %(message)s",
-    level=logging.INFO   # Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-)
+import asyncio
+import sys
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from repl.llm import LLM, AsyncLLM
+from repl.registry import ToolRegistry
+from repl.json_stream import JSONStreamParser, extract_json
+from repl.routing import ModelRouter
+from repl.session import SessionStore, CURRENT_SESSION, CURRENT_QUERY
+from repl.plugins import load_tools
+from repl.metrics import METRICS, RUNS, RUN_DURATION, STEP_DURATION, STEP_REPEATS, STEP_RETRIES, SCHEMA_FAILURES, observe_tool
+
+
+def configure_logging(filename="app.log"):
+    """File logging for the interactive loop. Importing the module leaves logging to the application."""
+    logging.basicConfig(
+        filename=filename,   # Log file name
+        filemode="a",        # Append mode (use "w" to overwrite)
+        format="%(asctime)s - %(levelname)s - %(message)s",
+        level=logging.INFO   # Log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
+    )
 
 __CTX_VARS_NAME__ = "context_variables"
 
@@ -32,23 +43,128 @@ class Requirements:
     def add_requirement(self, item):
         self.requirements.append(item)       
 
+class StepOutput:
+    def __init__(self, parser: Optional[JSONStreamParser] = None):
+        """Collects the streamed text and native tool calls of one step."""
+        self.parser = parser
+        self.content = ""
+        self.tool_calls = defaultdict(lambda: {"function": {"arguments": "", "name": ""}, "id": "", "type": ""})
+
+
+class RunState:
+    def __init__(self, input_str: str, session_id: Optional[str], max_turns: int):
+        """
+        The state of one `execute`/`aexecute` run. It is kept per run instead of on the agent,
+        so concurrent runs on one agent do not see each other's session, question or trace.
+        """
+        self.input_str = input_str
+        self.input_message = [{"role": "user", "content": input_str}]
+        self.session_id = session_id
+        # Tools without a session still get a scratch directory of their own per run,
+        # removed when the run ends (see `ReAct.release_tool_session`)
+        self.tool_session = session_id if session_id is not None else uuid.uuid4().hex
+        self.max_turns = max_turns
+        self.history = []
+        self.memory = []
+        self.step_idx = 0
+        self.run = None  # run number in the session store
+        self.saved = 0
+        self.trace = None
+        self.finished = False
+        self.start = time.perf_counter()
+
+
+class StepRequest:
+    def __init__(self, llm, step: str, messages, response_schema, output: StepOutput):
+        """Asks the caller of `ReAct.run_steps` to stream one LLM attempt of a step into `output`."""
+        self.llm = llm
+        self.step = step
+        self.messages = messages
+        self.response_schema = response_schema
+        self.output = output
+
+
+class ToolRequest:
+    def __init__(self, actions: List[Dict[str, Any]]):
+        """Asks the caller of `ReAct.run_steps` to run the tool calls of an action step."""
+        self.actions = actions
+
+
 class ReAct:
-    def __init__(self, llm=LLM(), context="" , step_config=STEP_CONFIG):
+    def __init__(self, llm=None, context="" , step_config=STEP_CONFIG, max_parallel_tools=4, tool_mode="prompt", prompt_layout="system", router=None, context_manager=None, tracer=None, session_store=None, history_limit=50):
         """
         Initializes the ReAct agent with configurable steps, system prompts, and response schemas.
 
         Args:
-            model (str): The LLM model to use.
+            llm (LLM): The default LLM. Defaults to `LLM()`, built when the agent is created.
             context (str): Additional context for the agent.
             temperature (float): Sampling temperature for responses.
             top_p (float): Nucleus sampling parameter.
             step_config (dict): Dictionary defining steps, each with a system prompt and schema.
+                Use `FUSED_STEP_CONFIG` for two LLM calls per turn instead of four.
+            max_parallel_tools (int): Maximum number of tool calls of one action step that run concurrently.
+            tool_mode (str): "prompt" lists the tools in the action prompt and parses a JSON reply.
+                "native" sends the tools through the API's tool-calling interface.
+            prompt_layout (str): "system" puts the step prompt first as system message.
+                "prefix" keeps a stable shared preamble first and appends the step instructions
+                after history and memory, so backends with prefix caching reuse the conversation's KV cache.
+            router (ModelRouter): Chooses the LLM per step. A step config may set "llm" to its own
+                LLM instance, or to a dict of LLM arguments (model, temperature, ...).
+            context_manager (ContextManager): Fits each step's prompt into a token budget and reports
+                tokens per step. None sends the full history and memory.
+            tracer (TraceRecorder | TraceReplayer): Records every run's LLM streams and tool calls to a
+                trace file, or replays them from one (see `repl.trace`).
+            session_store (SessionStore): Persists the history of sessions and checkpoints every step,
+                so `execute(..., session_id=...)` resumes an interrupted run (see `repl.session`).
+            history_limit (int): Number of newest history messages loaded from the session store.
         """
+        if prompt_layout not in ("system", "prefix"):
+            raise ValueError(f"Unknown prompt layout: {prompt_layout}")
+        if tool_mode not in ("prompt", "native"):
+            raise ValueError(f"Unknown tool mode: {tool_mode}")
         self.steps = list(step_config.keys()) if step_config else ["think", "action", "observation", "reflection"]
         self.step_config = step_config or {}
         self.context = context    
         self.function_map = None  
-        self.llm = llm
+        self.llm = llm = llm if llm is not None else LLM()
+        self.max_parallel_tools = max_parallel_tools
+        self.tool_mode = tool_mode
+        self.prompt_layout = prompt_layout
+        self.router = router or ModelRouter()
+        self.context_manager = context_manager
+        self.tracer = tracer
+        self.session_store = session_store
+        self.history_limit = history_limit
+        self.step_llms = {}
+        for step, config in self.step_config.items():
+            step_llm = config.get("llm")
+            if isinstance(step_llm, dict):
+                # Build the step model with the same class (sync/async) as the default LLM
+                defaults = {"client": llm.client} if "client" not in step_llm else {}
+                step_llm = type(llm)(**{**defaults, **step_llm})
+            if step_llm is not None:
+                self.step_llms[step] = step_llm
+        self._tool_pool = None
+        self.registry = None
+        self._prompt_cache = {}
+        # Validators are compiled once per step instead of on every response
+        self.validators = {
+            step: Draft7Validator(config["schema"])
+            for step, config in self.step_config.items()
+            if config.get("schema")
+        }
+
+    def close(self) -> None:
+        """Shuts down the tool thread pool. The agent can still be used; the pool is recreated on demand."""
+        pool, self._tool_pool = self._tool_pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
 
     def format_response(self, content: str, step: str) -> Dict[str, Any]:
         """
@@ -68,14 +184,30 @@ class ReAct:
         schema = self.step_config[step].get("schema")
 
         if schema:
+            validator = self.validators.get(step) or Draft7Validator(schema)
             try:
                 # Parse and validate JSON response
-                data = json.loads(content)
-                validate(instance=data, schema=schema)
+                try:
+                    data = json.loads(content)
+                except json.JSONDecodeError:
+                    # Tolerate text around the JSON value, e.g. a ```json fence. A valid value is
+                    # preferred over an earlier bracketed one such as "[1]" in a preamble.
+                    extracted = extract_json(content, validator.is_valid) or extract_json(content)
+                    if extracted is None:
+                        raise
+                    data = json.loads(extracted)
+
+                error = best_match(validator.iter_errors(data))
+                if error is not None:
+                    raise error
                 return data
             except json.JSONDecodeError:
+                if METRICS.enabled:
+                    SCHEMA_FAILURES.inc(step=step)
                 return {"error": f"Invalid JSON format for step: {step}", "raw_content": content}
             except ValidationError as e:
+                if METRICS.enabled:
+                    SCHEMA_FAILURES.inc(step=step)
                 return {"error": f"Schema validation failed for step: {step}", "details": str(e)}
 
         # If no schema is provided, return plain text
@@ -86,32 +218,262 @@ class ReAct:
         config = self.step_config.get(step, {})
         return config.get("prompt", ""), config.get("schema", None)
 
+    def close_stream(self, completion):
+        """Closes a completion stream early so the backend stops generating tokens."""
+        close = getattr(completion, "close", None)
+        if close:
+            try:
+                close()
+            except Exception as e:
+                logging.warning(f"Failed to close completion stream: {e}")
+
+    def abort_stream(self, completion):
+        """
+        Closes the HTTP stream below any cache, metrics or trace wrappers, so an abandoned
+        step is neither cached nor recorded as complete. Wrappers with an `abort` method (the
+        trace recorder) record the partial stream as aborted first.
+        """
+        while getattr(completion, "stream", None) is not None:
+            if hasattr(completion, "abort"):
+                completion.abort()
+            completion = completion.stream
+        self.close_stream(completion)
+
+    async def aclose_stream(self, completion):
+        close = getattr(completion, "close", None) or getattr(completion, "aclose", None)
+        if close:
+            try:
+                result = close()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                logging.warning(f"Failed to close completion stream: {e}")
+
+    async def aabort_stream(self, completion):
+        """Async counterpart of `abort_stream`."""
+        while getattr(completion, "stream", None) is not None:
+            if hasattr(completion, "abort"):
+                completion.abort()
+            completion = completion.stream
+        await self.aclose_stream(completion)
+
+    @contextlib.contextmanager
+    def tool_context(self, state: Optional[RunState]):
+        """Lets tools see the run's session and question, e.g. for their sandbox scratch directory."""
+        session_token = CURRENT_SESSION.set(state.tool_session if state else None)
+        query_token = CURRENT_QUERY.set(state.input_str if state else None)
+        try:
+            yield
+        finally:
+            CURRENT_SESSION.reset(session_token)
+            CURRENT_QUERY.reset(query_token)
+
+    @staticmethod
+    def release_tool_session(state: RunState) -> None:
+        """
+        Removes the sandbox scratch directory and fetched-page index of a run without a
+        session. Sessions keep theirs for their next runs.
+        """
+        if state.session_id is not None:
+            return
+        # Both modules are only imported once a tool used them
+        sandbox = sys.modules.get("repl.sandbox")
+        if sandbox is not None:
+            sandbox.remove_scratch_dir(state.tool_session)
+        retrieval = sys.modules.get("repl.retrieval")
+        if retrieval is not None:
+            retrieval.drop_index(state.tool_session)
+
+    def use_tools(self, tools: List[Callable]) -> ToolRegistry:
+        """
+        Registers the tools for a run. The registry and the prompts rendered from it are
+        reused as long as the same tool functions are passed.
+        """
+        if self.registry is None or not self.registry.matches(tools):
+            self.registry = ToolRegistry(tools)
+            self.function_map = self.registry.function_map
+            self._prompt_cache = {}
+        return self.registry
+
+    def step_type(self, step: str) -> str:
+        """The loop handling of a step ("action", "reflection", ...). Defaults to the step name."""
+        return self.step_config.get(step, {}).get("type", step)
+
+    def uses_native_tools(self, step: str) -> bool:
+        return self.tool_mode == "native" and self.step_type(step) == "action"
+
+    def get_system_prompt(self, step: str) -> str:
+        """
+        Returns the system prompt of a step. The template is compiled once with the tool
+        descriptions filled in; the date is rendered on every call so it never goes stale.
+        """
+        template = self._prompt_cache.get(step)
+        if template is None:
+            prompt, _ = self.get_step_prompt_and_schema(step)
+            if self.uses_native_tools(step):
+                prompt = self.step_config[step].get("native_prompt", prompt)
+            template = PromptTemplate(prompt)
+            if "tools" in template.fields and self.registry is not None:
+                template = template.partial(tools=self.registry.descriptions())
+            self._prompt_cache[step] = template
+        return template.render(date=get_current_date())
+
+    def build_messages(self, step: str, history, input_message, memory) -> List[Dict[str, Any]]:
+        """
+        Assembles the messages for a step according to `prompt_layout`.
+        """
+        system_prompt = self.get_system_prompt(step)
+        if self.prompt_layout == "prefix":
+            preamble = SHARED_PREAMBLE + (f"\nContext: {self.context}" if self.context else "")
+            head = [{"role": "system", "content": preamble}]
+            tail = [{"role": "system", "content": system_prompt}]
+        else:
+            head = [{"role": "system", "content": system_prompt}]
+            tail = []
+
+        if self.context_manager is not None:
+            return self.context_manager.build(step, head, history, input_message, memory, tail)
+        return head + history + input_message + memory + tail
+
     
-    def handle_tool_calls(self, action: Dict[str, Any]):
+    def handle_tool_calls(self, action: Dict[str, Any], state: Optional[RunState] = None):
         """
         Executes an action by looking up the corresponding function in the function map.
 
         Args:
             action (Dict[str, Any]): A dictionary containing the action type and parameters.
+            state (Optional[RunState]): The run the call belongs to.
+
+        Parameters are validated against the tool's precompiled schema first; invalid
+        calls return a structured error Result instead of raising inside the tool.
 
         Returns:
-            Dict[str, str]: A dictionary with "error" and "result" keys.
+            The tool result, or a Result with `error` and `repeat` set.
         """           
+        start = time.perf_counter() if METRICS.enabled else None
         try:
-            result = Result()
-            func = self.function_map.get(action["action"])
-            if not func:
-                result.value = f"Error: Unknown action {action['action']}"
-                result.repeat = True 
-                result.error = True
-                return result
-                       
-            return func(**action["parameters"])
+            if self.registry is None:
+                self.use_tools(list((self.function_map or {}).values()))
+            with self.tool_context(state):
+                if self.tracer:
+                    result = self.tracer.tool_call(state.trace if state else None, action, self.registry.dispatch)
+                else:
+                    result = self.registry.dispatch(action)
         
         except Exception as e:           
+            result = Result()
             result.error = True
             result.value = f"Error executing action: {str(e)}"
             result.repeat = True            
+
+        if start is not None:
+            self.observe_tool(action, start, result)
+        return result
+
+    def observe_tool(self, action, start: float, result) -> None:
+        """Records the latency and outcome of a tool call. Unregistered names are grouped as "unknown"."""
+        name = action.get("action") if isinstance(action, dict) else None
+        if self.registry is None or name not in self.registry.tools:
+            name = "unknown"
+        observe_tool(name, start, isinstance(result, Result) and result.error)
+
+    def get_actions(self, response) -> List[Dict[str, Any]]:
+        """
+        Normalizes an action step response into a list of tool calls.
+
+        Accepts a single {"action", "parameters"} object, {"actions": [...]} or a bare list.
+        """
+        if isinstance(response, list):
+            return response
+        if isinstance(response, dict) and isinstance(response.get("actions"), list):
+            return response["actions"]
+        return [response]
+
+    def merge_tool_call_deltas(self, tool_calls, deltas) -> None:
+        """Assembles streamed `tool_calls` deltas, keyed by their index."""
+        for delta in deltas:
+            delta = delta.model_dump() if hasattr(delta, "model_dump") else dict(delta)
+            index = delta.pop("index", 0)
+            merge_fields(tool_calls[index], delta)
+
+    def tool_calls_to_actions(self, tool_calls) -> List[Dict[str, Any]]:
+        """Converts assembled native tool calls into {"action", "parameters"} calls."""
+        actions = []
+        for index in sorted(tool_calls):
+            function = tool_calls[index]["function"]
+            try:
+                parameters = json.loads(function["arguments"]) if function["arguments"].strip() else {}
+                actions.append({"action": function["name"], "parameters": parameters})
+            except json.JSONDecodeError:
+                actions.append({
+                    "error": f"Invalid JSON arguments for tool call {function['name']}",
+                    "raw_content": function["arguments"],
+                })
+        return actions
+
+    def handle_parallel_tool_calls(self, actions: List[Dict[str, Any]], state: Optional[RunState] = None) -> List[Result]:
+        """
+        Runs several tool calls concurrently in a bounded thread pool.
+
+        Results are returned in the order of `actions`. A failing tool yields an error
+        Result at its position instead of discarding the other results.
+
+        Args:
+            actions (List[Dict[str, Any]]): The tool calls of one action step.
+            state (Optional[RunState]): The run the calls belong to.
+
+        Returns:
+            List[Result]: One result per action, in order.
+        """
+        if len(actions) == 1:
+            return [self._run_tool_call(actions[0], state)]
+
+        if self._tool_pool is None:
+            self._tool_pool = ThreadPoolExecutor(max_workers=self.max_parallel_tools, thread_name_prefix="react-tool")
+
+        futures = [self._tool_pool.submit(self._run_tool_call, action, state) for action in actions]
+        return [future.result() for future in futures]
+
+    def _run_tool_call(self, action: Dict[str, Any], state: Optional[RunState] = None) -> Result:
+        try:
+            return self.handle_function_result(self.handle_tool_calls(action, state))
+        except Exception as e:
+            return Result(value=f"Error executing action: {str(e)}", error=True, repeat=True)
+
+    def process_tool_results(self, actions, results, memory, step):
+        """
+        Appends tool results to memory in action order and decides how the loop continues.
+
+        Returns:
+            Tuple[List[Dict], bool, bool]: The events to yield, whether the run is finished
+            and whether the action step has to be repeated.
+        """
+        events = []
+        labeled = len(actions) > 1
+
+        for action, tool_result in zip(actions, results):
+            value = tool_result.value
+            if labeled:
+                name = action.get("action", "unknown") if isinstance(action, dict) else "unknown"
+                value = f"[{name}] {value}"
+            memory.append({"role": "tool", "content": value, "step": step})
+
+        finishing = next((r for r in results if r.finish), None)
+        if finishing:
+            events.append({"content": finishing.value, "step": "observation"})
+            memory.append({"role": "assistant", "content": finishing.value, "step": "observation"})
+            return events, True, False
+
+        # Only repeat the action step if no tool produced a usable result
+        if all(r.repeat for r in results):
+            if METRICS.enabled:
+                STEP_REPEATS.inc(step=step)
+            events.append({"content": "No Tool Result. Try again.", "step": "tool"})
+            return events, False, True
+
+        for action, tool_result in zip(actions, results):
+            events.append({"content": tool_result.value, "step": "tool"})
+        return events, False, False
     
     def handle_function_result(self, result) -> Result:
         match result:
@@ -152,106 +514,359 @@ class ReAct:
         )
         return [last_observation]
 
-    def execute(self, input_str, messages, tools=[], max_turns=20, debug=True):
-        current_step_idx = 0
-        finished = False
+    def get_step_llms(self, step: str) -> List[Any]:
+        """The LLMs to try for a step, as chosen by the router."""
+        return self.router.route(step, self.step_llms.get(step), self.llm)
 
-        # Create a function map for available tools
-        self.function_map = {f.__name__: f for f in tools} 
-        
-        input_message = [{"role": "user", "content": input_str}]
-        history = copy.deepcopy(messages)
-        memory = []
-        
-        while not finished and len(memory) < max_turns:
-            current_step = self.steps[current_step_idx]
-            system_prompt, response_schema = self.get_step_prompt_and_schema(current_step)
-            
-            # Format the system prompt   
-            if "{tools}" in system_prompt: 
-                functions = [function_to_string(f) for f in tools]   
-                system_prompt = system_prompt.format( tools=functions)  
+    def consume_chunk(self, chunk, output: StepOutput):
+        """
+        Adds a streamed chunk to the step output.
 
-            response_format = {"type": "json_object", "json_schema": response_schema} if response_schema else None
+        Returns:
+            Tuple[Optional[str], bool]: The text to emit and whether the JSON response is complete.
+        """
+        if not chunk.choices:
+            return None, False
+        delta = chunk.choices[0].delta
+        if getattr(delta, "tool_calls", None):
+            self.merge_tool_call_deltas(output.tool_calls, delta.tool_calls)
+        content = delta.content
+        if not content:
+            return None, False
+        end = output.parser.feed(content) if output.parser else None
+        if end is not None:
+            content = content[:end]
+        output.content += content
+        return content, end is not None
+
+    def stream_step(self, llm, step, messages, response_schema, output: StepOutput, trace_run=None):
+        """Streams one step from `llm`, yielding content events into the caller."""
+        native = self.uses_native_tools(step)
+        functions = self.registry.schemas() if native else None
+        response_format = {"type": "json_object", "json_schema": response_schema} if response_schema and not native else None
+
+        if self.tracer:
+            completion = self.tracer.completion(trace_run, step, llm, messages, functions, response_format)
+        else:
+            completion = llm.get_chat_completion(messages, functions=functions, stream=True, response_format=response_format)
+        try:
+            for chunk in completion:
+                content, complete = self.consume_chunk(chunk, output)
+                if content:
+                    yield {"content": content, "step": step}
+                if complete:
+                    # JSON steps stop the stream as soon as the top-level value is complete
+                    self.close_stream(completion)
+                    break
+        except GeneratorExit:
+            # The consumer closed the run, e.g. a disconnected client: stop the generation
+            self.abort_stream(completion)
+            raise
+
+    async def astream_step(self, llm, step, messages, response_schema, output: StepOutput, trace_run=None):
+        native = self.uses_native_tools(step)
+        functions = self.registry.schemas() if native else None
+        response_format = {"type": "json_object", "json_schema": response_schema} if response_schema and not native else None
+
+        if self.tracer:
+            completion = await self.tracer.acompletion(trace_run, step, llm, messages, functions, response_format)
+        else:
+            completion = await llm.get_chat_completion(messages, functions=functions, stream=True, response_format=response_format)
+        done = False
+        try:
+            async for chunk in completion:
+                content, complete = self.consume_chunk(chunk, output)
+                if content:
+                    yield {"content": content, "step": step}
+                if complete:
+                    await self.aclose_stream(completion)
+                    break
+            done = True
+        finally:
+            if not done:
+                # Closed by the consumer, a cancelled task or an error: stop the generation
+                await self.aabort_stream(completion)
+
+    def new_step_output(self, step, response_schema) -> StepOutput:
+        if not response_schema or self.uses_native_tools(step):
+            return StepOutput()
+        # Only a value matching the schema ends the stream early, not e.g. a "[1]" in a preamble
+        validator = self.validators.get(step)
+        if validator is None or validator.schema is not response_schema:
+            validator = Draft7Validator(response_schema)
+        return StepOutput(JSONStreamParser(validator.is_valid))
+
+    def parse_step_output(self, step: str, output: StepOutput):
+        """
+        Turns the step output into the parsed response and the text kept in memory.
+        """
+        if output.tool_calls:
+            # Native tool calls are kept in memory as their JSON equivalent
+            response = self.tool_calls_to_actions(output.tool_calls)
+            return response, json.dumps(response)
+        return self.format_response(output.content, step), output.content
 
-            # Construct messages
-            messages = [{"role": "system", "content": system_prompt}] + history + input_message + memory
+    def start_session(self, session_id, input_str, messages):
+        """
+        Loads the history of a stored session and its interrupted run if that run had the same input.
 
-            try:
-                completion = self.llm.get_chat_completion(messages, stream=True, response_format=response_format)
-            except Exception as e:
-                yield {"error": str(e), "step": "chat"}
-                return
-            
-            message_content = ""
-            for chunk in completion:
-                delta = chunk.choices[0].delta
-                if delta.content:
-                    yield {"content": delta.content, "step": current_step}
-                    message_content += delta.content
+        Returns:
+            Tuple[List, List, int, Optional[int]]: The history, the memory, the index of the step
+            to run and the run number in the session store (None without a session).
+        """
+        if session_id is None:
+            return list(messages), [], 0, None
+        if self.session_store is None:
+            raise ValueError("session_id requires a session_store")
+
+        store = self.session_store
+        # Messages are never modified, so the history is shared instead of deep-copied
+        history = list(messages) if messages is not None else store.history(session_id, self.history_limit)
+        pending = store.pending_run(session_id)
+        if pending and pending["input"] == input_str:
+            logging.info(f"Resuming run {pending['run']} of session {session_id} at step {pending['step_idx']}")
+            return history, pending["memory"], pending["step_idx"], pending["run"]
+        return history, [], 0, store.start_run(session_id, input_str)
+
+    def resume(self, session_id, tools=[], max_turns=20):
+        """
+        Resumes the interrupted run of a session from its last completed step.
+        Yields nothing if the session has no unfinished run.
+        """
+        pending = self.session_store.pending_run(session_id)
+        if pending:
+            yield from self.execute(pending["input"], None, tools=tools, max_turns=max_turns, session_id=session_id)
+
+    def start_run(self, input_str, messages, tools, max_turns, session_id) -> RunState:
+        """Registers the tools and sets up the state of a run, resuming a stored session if there is one."""
+        self.use_tools(tools)
+        state = RunState(input_str, session_id, max_turns)
+        state.history, state.memory, state.step_idx, state.run = self.start_session(session_id, input_str, messages)
+        state.saved = len(state.memory)
+        if self.tracer:
+            settings = {"step_config": self.step_config, "tool_mode": self.tool_mode, "prompt_layout": self.prompt_layout, "context": self.context}
+            state.trace = self.tracer.start_run(input_str, state.history, list(self.registry.tools), settings)
+        if METRICS.enabled:
+            RUNS.inc()
+        return state
+
+    def run_steps(self, state: RunState):
+        """
+        The step loop of a run, shared by `execute` and `aexecute`. Besides the events for the
+        consumer (including {"reset", "step"} when a step's streamed content is discarded
+        because the step is re-run on the escalation model) it yields requests that the caller fulfills with its sync or async I/O:
+        `StepRequest` (stream an LLM attempt, forwarding its content events) and `ToolRequest`
+        (run tool calls). The caller sends back None or the streaming error, and the tool
+        results or the exception raised while running them.
+        """
+        memory = state.memory
+        while not state.finished and len(memory) < state.max_turns:
+            if state.run is not None:
+                # Checkpoint after every completed step
+                state.saved = self.session_store.checkpoint(state.session_id, state.run, state.step_idx, memory, state.saved)
+            current_step = self.steps[state.step_idx]
+            _, response_schema = self.get_step_prompt_and_schema(current_step)
 
-            memory.append({"role": "assistant", "content": message_content, "step": current_step})
+            # Construct messages
+            messages = self.build_messages(current_step, state.history, state.input_message, memory)
+
+            llms = self.get_step_llms(current_step)
+            step_start = time.perf_counter()
+            for attempt, llm in enumerate(llms):
+                output = self.new_step_output(current_step, response_schema)
+                error = yield StepRequest(llm, current_step, messages, response_schema, output)
+                if error is not None:
+                    yield {"error": str(error), "step": "chat"}
+                    return
+
+                response, message_content = self.parse_step_output(current_step, output)
+                # Escalate to the next model if the response is invalid
+                if attempt + 1 == len(llms) or not self.router.should_escalate(current_step, response):
+                    break
+                if METRICS.enabled:
+                    STEP_RETRIES.inc(step=current_step)
+                # The rejected attempt was already streamed: tell the consumer to discard it
+                yield {"reset": True, "step": current_step, "escalate_to": getattr(llms[attempt + 1], "model", None)}
+
+            if METRICS.enabled:
+                STEP_DURATION.observe(time.perf_counter() - step_start, step=current_step)
+
+            if output.tool_calls:
+                yield {"content": message_content, "step": current_step}
 
-            # Process the response
-            response = self.format_response(message_content, current_step)
+            memory.append({"role": "assistant", "content": message_content, "step": current_step})
 
-            match current_step:
+            match self.step_type(current_step):
                 case "reflection":
+                    if isinstance(response, dict) and response.get("observation"):
+                        # Fused observe/reflect step: keep the observation for the next turn and the summary
+                        memory.append({"role": "assistant", "content": response["observation"], "step": "observation"})
                     if response.get("done", False):
-                        finished = True
+                        state.finished = True
                         continue
                 case "action":
                     try:
-                        result = self.handle_tool_calls(response)
-                        tool_result = self.handle_function_result(result)
-                        
-                        memory.append({
-                            "role": "tool",
-                            "content": tool_result.value,
-                            "step": current_step
-                        })
-                        
-                        if tool_result.repeat:
-                            yield {"content": "No Tool Result. Try again.", "step": "tool"}
+                        actions = self.get_actions(response)
+                        results = yield ToolRequest(actions)
+                        if isinstance(results, Exception):
+                            raise results
+                        events, state.finished, repeat = self.process_tool_results(actions, results, memory, current_step)
+                        for event in events:
+                            yield event
+
+                        if state.finished or repeat:
                             continue
 
-                        if tool_result.finish:
-                            finished = True
-                            yield {"content": tool_result.value, "step": "observation"}
-                            memory.append({
-                                "role": "assistant",
-                                "content": tool_result.value,
-                                "step": "observation"
-                            })
-                            continue
-
-                        yield {"content": tool_result.value, "step": "tool"}
-
                     except Exception as e:
                         memory.append({"role": "tool", "content": str(e)})
                         continue
 
-            current_step_idx = (current_step_idx + 1) % len(self.steps)
+            state.step_idx = (state.step_idx + 1) % len(self.steps)
+
+        if METRICS.enabled:
+            RUN_DURATION.observe(time.perf_counter() - state.start)
+        response = state.input_message + self.summarize_history(memory)
+        if self.tracer:
+            self.tracer.end_run(state.trace, response)
+        if state.run is not None:
+            self.session_store.finish_run(state.session_id, state.run, response)
+        yield {"response": response}
 
-        yield {"response": input_message + self.summarize_history(memory)}
+    def execute(self, input_str, messages, tools=[], max_turns=20, debug=True, session_id=None):
+        state = self.start_run(input_str, messages, tools, max_turns, session_id)
+        try:
+            steps = self.run_steps(state)
+            reply = None
+            while True:
+                try:
+                    item = steps.send(reply)
+                except StopIteration:
+                    return
+                reply = None
+                if isinstance(item, StepRequest):
+                    stream = self.stream_step(item.llm, item.step, item.messages, item.response_schema, item.output, state.trace)
+                    try:
+                        for event in stream:
+                            yield event
+                    except Exception as e:
+                        reply = e
+                    finally:
+                        stream.close()
+                elif isinstance(item, ToolRequest):
+                    try:
+                        reply = self.handle_parallel_tool_calls(item.actions, state)
+                    except Exception as e:
+                        reply = e
+                else:
+                    yield item
+        finally:
+            self.release_tool_session(state)
+
+    async def ahandle_tool_calls(self, action: Dict[str, Any], state: Optional[RunState] = None):
+        """
+        Async counterpart of `handle_tool_calls`. Coroutine tools are awaited directly,
+        sync tools run in the default executor so they do not block the event loop.
 
+        Args:
+            action (Dict[str, Any]): A dictionary containing the action type and parameters.
+            state (Optional[RunState]): The run the call belongs to.
+
+        Returns:
+            The raw tool result, or a Result describing the error.
+        """
+        tool, error = self.registry.resolve(action)
+        if error:
+            return error
+
+        if not tool.is_coroutine:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(None, self.handle_tool_calls, action, state)
 
-def run_react_loop(store_history=False):
-    agent = ReAct(context="AI assistant for engineering tasks") 
-    history = []    
+        start = time.perf_counter() if METRICS.enabled else None
+        try:
+            with self.tool_context(state):
+                if self.tracer:
+                    result = await self.tracer.atool_call(state.trace if state else None, action, lambda a: tool.func(**a.get("parameters", {})))
+                else:
+                    result = await tool.func(**action.get("parameters", {}))
+        except Exception as e:
+            result = Result(value=f"Error executing action: {str(e)}", error=True, repeat=True)
+        if start is not None:
+            self.observe_tool(action, start, result)
+        return result
+
+    async def ahandle_parallel_tool_calls(self, actions: List[Dict[str, Any]], state: Optional[RunState] = None) -> List[Result]:
+        """
+        Async counterpart of `handle_parallel_tool_calls`, bounded by `max_parallel_tools`.
+        """
+        semaphore = asyncio.Semaphore(self.max_parallel_tools)
+
+        async def run(action):
+            async with semaphore:
+                try:
+                    return self.handle_function_result(await self.ahandle_tool_calls(action, state))
+                except Exception as e:
+                    return Result(value=f"Error executing action: {str(e)}", error=True, repeat=True)
+
+        return list(await asyncio.gather(*(run(action) for action in actions)))
+
+    async def aexecute(self, input_str, messages, tools=[], max_turns=20, debug=True, session_id=None):
+        """
+        Async version of `execute`. Requires an `AsyncLLM` and yields the same
+        {"content", "step"} / {"response"} events, so one event loop can serve many sessions.
+        """
+        state = self.start_run(input_str, messages, tools, max_turns, session_id)
+        try:
+            steps = self.run_steps(state)
+            reply = None
+            while True:
+                try:
+                    item = steps.send(reply)
+                except StopIteration:
+                    return
+                reply = None
+                if isinstance(item, StepRequest):
+                    stream = self.astream_step(item.llm, item.step, item.messages, item.response_schema, item.output, state.trace)
+                    try:
+                        async for event in stream:
+                            yield event
+                    except Exception as e:
+                        reply = e
+                    finally:
+                        # Async generators are not closed when they are dropped
+                        await stream.aclose()
+                elif isinstance(item, ToolRequest):
+                    try:
+                        reply = await self.ahandle_parallel_tool_calls(item.actions, state)
+                    except Exception as e:
+                        reply = e
+                else:
+                    yield item
+        finally:
+            self.release_tool_session(state)
+
+
+def run_react_loop(store_history=False, session_id="default", db_path="sessions.db"):
+    configure_logging()
+    tools = load_tools(["web_search", "write_code", "ask_user"])
+    session_store = SessionStore(db_path) if store_history else None
+    agent = ReAct(context="AI assistant for engineering tasks", session_store=session_store) 
+
+    if session_store and session_store.pending_run(session_id):
+        # Finish the run that was interrupted last time before asking for new input
+        print("Resuming the interrupted run...")
+        process_and_print_streaming_response(agent.resume(session_id, tools=tools))
     
     while True:
         print()  # Adds an empty line
         user_input = input("\033[91mUser\033[0m: ")     
          
-        response =  agent.execute(user_input , history, tools=[ web_search, write_code, ask_user])  
-        response = process_and_print_streaming_response(response)   
-        
-        if store_history:
-            # update history 
-            history.extend(response)   
+        if session_store:
+            # History is loaded from and appended to the session store
+            response = agent.execute(user_input, None, tools=tools, session_id=session_id)
         else:
-            history = []     
+            response = agent.execute(user_input, [], tools=tools)
+        process_and_print_streaming_response(response)   
 
 if __name__ == "__main__":
     run_react_loop(True)    
@@ -0,0 +1,263 @@
+"""
+Batch runner: pushes a JSONL file of queries through ReAct.execute.
+
+Each input line is a JSON object. The query is taken from --query-field (by default
+"query", or "title" and "body" joined), the id from --id-field (by default "request_id",
+or "id", or the line number). Results are appended to the output JSONL as they finish,
+so an interrupted run resumes by skipping ids already in the output.
+
+Usage:
+    python batch.py requests.jsonl results.jsonl [--workers 4] [--executor thread|process]
+                    [--model phi4:14b] [--base-url http://node1:11434/v1/,http://node2:11434/v1/] [--fused]
+                    [--tools web_search,read_url] [--max-turns 20] [--retry-errors]
+"""
+import argparse
+import json
+import math
+import multiprocessing.util
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, as_completed
+
+_local = threading.local()
+_settings = {}
+_shared = {}
+_agents = []
+_client_lock = threading.Lock()
+
+
+def percentile(values, q):
+    """Nearest-rank percentile of a list of numbers."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(1, math.ceil(q / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def load_records(path, id_field, query_field):
+    records = []
+    with open(path, encoding="utf-8") as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            data = json.loads(line)
+            record_id = data.get(id_field) or data.get("id") or str(line_number)
+            if query_field in data:
+                query = data[query_field]
+            else:
+                query = "\n\n".join(str(data[k]) for k in ("title", "body") if data.get(k))
+            records.append({"id": str(record_id), "query": query})
+    return records
+
+
+def load_done(path, retry_errors):
+    """Ids already written to the output file."""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                row = json.loads(line)
+            except json.JSONDecodeError:
+                # Partially written last line of a crashed run
+                continue
+            if retry_errors and row.get("error"):
+                continue
+            done.add(row["id"])
+    return done
+
+
+def init_worker(settings):
+    """Stores the agent settings; agents are built lazily, one per worker thread or process."""
+    _settings.clear()
+    _settings.update(settings)
+    _shared.clear()
+
+
+def init_process_worker(settings):
+    """Pool initializer of `--executor process`; the worker closes its agents when it exits."""
+    init_worker(settings)
+    # Pool processes end with os._exit, which skips atexit handlers but runs multiprocessing finalizers
+    multiprocessing.util.Finalize(None, close_agents, exitpriority=10)
+
+
+def make_client(settings):
+    """One client for a base URL, an `EndpointPool` for a comma-separated list of them."""
+    urls = [url.strip() for url in settings["base_url"].split(",") if url.strip()]
+    if len(urls) > 1:
+        from repl.pool import EndpointPool
+        endpoints = [{"base_url": url, "api_key": settings["api_key"], "timeout": settings["timeout"]} for url in urls]
+        return EndpointPool(endpoints, hedge_after=settings.get("hedge_after"))
+    from openai import OpenAI
+    return OpenAI(base_url=urls[0], api_key=settings["api_key"], timeout=settings["timeout"])
+
+
+def get_agent():
+    agent = getattr(_local, "agent", None)
+    if agent is None:
+        from ReAct import ReAct
+        from repl.llm import LLM
+        from repl.prompts import STEP_CONFIG, FUSED_STEP_CONFIG
+        from repl.plugins import load_tools
+
+        with _client_lock:
+            # Worker threads share one client, so an endpoint pool sees all outstanding requests
+            if "client" not in _shared:
+                _shared["client"] = make_client(_settings)
+        client = _shared["client"]
+        agent = ReAct(
+            llm=LLM(model=_settings["model"], client=client),
+            step_config=FUSED_STEP_CONFIG if _settings["fused"] else STEP_CONFIG,
+        )
+        _local.agent = agent
+        _local.tools = load_tools(_settings["tools"])
+        with _client_lock:
+            _agents.append(agent)
+    return agent, _local.tools
+
+
+def close_agents():
+    """Closes the agents built by the worker threads of this process."""
+    with _client_lock:
+        agents = list(_agents)
+        _agents.clear()
+    for agent in agents:
+        agent.close()
+
+
+def run_query(record):
+    """Runs one query and returns its result row."""
+    started = time.time()
+    start = time.perf_counter()
+    first_event = None
+    events = 0
+    response = None
+    error = None
+
+    try:
+        agent, tools = get_agent()
+        for event in agent.execute(record["query"], [], tools=tools, max_turns=_settings["max_turns"]):
+            events += 1
+            if first_event is None and "content" in event:
+                first_event = time.perf_counter() - start
+            if "error" in event:
+                error = event["error"]
+            if "response" in event:
+                response = event["response"]
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+
+    answer = None
+    if response:
+        answer = next((m["content"] for m in reversed(response) if m and m.get("role") == "assistant"), None)
+
+    return {
+        "id": record["id"],
+        "query": record["query"],
+        "answer": answer,
+        "response": response,
+        "error": error,
+        "events": events,
+        "started_at": started,
+        "seconds": time.perf_counter() - start,
+        "first_event_seconds": first_event,
+    }
+
+
+def run_pending(pool, pending, out, run=run_query):
+    """
+    Runs the pending queries on the pool and appends each result row to `out` as it finishes.
+    On Ctrl-C the queued queries are cancelled instead of run, so they are picked up on resume.
+
+    Returns:
+        tuple: The latencies of the completed queries and the number of errors.
+    """
+    latencies = []
+    errors = 0
+    futures = [pool.submit(run, record) for record in pending]
+    try:
+        for count, future in enumerate(as_completed(futures), 1):
+            row = future.result()
+            out.write(json.dumps(row) + "\n")
+            out.flush()
+            latencies.append(row["seconds"])
+            errors += bool(row["error"])
+            print(f"[{count}/{len(pending)}] {row['id']} {row['seconds']:.2f}s" + (f" error: {row['error']}" if row["error"] else ""), file=sys.stderr)
+    except KeyboardInterrupt:
+        pool.shutdown(wait=False, cancel_futures=True)
+        print("Interrupted, completed results are saved. Run again to resume.", file=sys.stderr)
+    return latencies, errors
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file with one query per line")
+    parser.add_argument("output", help="JSONL file the results are appended to")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--executor", choices=["thread", "process"], default="thread")
+    parser.add_argument("--id-field", default="request_id")
+    parser.add_argument("--query-field", default="query")
+    parser.add_argument("--model", default="phi4:14b")
+    parser.add_argument("--base-url", default="http://localhost:11434/v1/", help="Comma-separated URLs balance over several backends")
+    parser.add_argument("--hedge-after", type=float, help="Seconds without a first token before a hedged request (with several base URLs)")
+    parser.add_argument("--api-key", default="ollama")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--fused", action="store_true", help="Use the fused two-step loop")
+    parser.add_argument("--tools", default="web_search,read_url,read_urls")
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--retry-errors", action="store_true", help="Re-run queries that failed in a previous run")
+    args = parser.parse_args()
+
+    settings = {
+        "model": args.model,
+        "base_url": args.base_url,
+        "api_key": args.api_key,
+        "timeout": args.timeout,
+        "hedge_after": args.hedge_after,
+        "fused": args.fused,
+        "tools": [name.strip() for name in args.tools.split(",") if name.strip()],
+        "max_turns": args.max_turns,
+    }
+
+    records = load_records(args.input, args.id_field, args.query_field)
+    done = load_done(args.output, args.retry_errors)
+    pending = [r for r in records if r["id"] not in done]
+    print(f"{len(records)} queries, {len(records) - len(pending)} already done, {len(pending)} to run", file=sys.stderr)
+
+    if args.executor == "process":
+        pool = ProcessPoolExecutor(max_workers=args.workers, initializer=init_process_worker, initargs=(settings,))
+    else:
+        init_worker(settings)
+        pool = ThreadPoolExecutor(max_workers=args.workers, thread_name_prefix="batch")
+
+    start = time.perf_counter()
+    # Not `with pool`: its exit waits for every queued query, also after Ctrl-C
+    try:
+        with open(args.output, "a", encoding="utf-8") as out:
+            latencies, errors = run_pending(pool, pending, out)
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+        # Process workers close their own agents on exit, see `init_process_worker`
+        close_agents()
+
+    elapsed = time.perf_counter() - start
+    if latencies:
+        stats = {
+            "completed": len(latencies),
+            "errors": errors,
+            "seconds": elapsed,
+            "throughput_qps": len(latencies) / elapsed,
+            "p50": percentile(latencies, 50),
+            "p95": percentile(latencies, 95),
+            "p99": percentile(latencies, 99),
+        }
+        print(json.dumps(stats))
+
+
+if __name__ == "__main__":
+    main()
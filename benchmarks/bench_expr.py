@@ -0,0 +1,64 @@
+"""
+Benchmark of calculate_expression over list and range variables: one vectorized numpy
+call versus evaluating the compiled scalar expression once per element.
+
+The first line reports which path `evaluate` takes in this environment. Without numpy
+installed only the per-element path is measured.
+
+Usage:
+    python benchmarks/bench_expr.py [--sizes 10 1000 100000] [--repeat 5]
+"""
+import argparse
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from repl.expr import compile_expression, vectorized
+
+EXPRESSIONS = [
+    "x * 2 + 1",
+    "sqrt(x**2 + 3**2) if x > 10 else log(x + 1)",
+    "1000 * (1 + 0.05 / 12) ** (12 * x)",
+]
+
+
+def measure(func, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 1000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    use_numpy = vectorized()
+    if use_numpy:
+        import numpy
+        print(f"evaluate path: vectorized (numpy {numpy.__version__})")
+    else:
+        print("evaluate path: per-element fallback (numpy not installed)")
+
+    print(f"{'expression':<46}{'size':>8} | {'per-element ms':>14} | {'numpy ms':>9} | {'speedup':>7}")
+    for expression in EXPRESSIONS:
+        compiled = compile_expression(expression)
+        for size in args.sizes:
+            values = {"x": list(range(size))}
+            elements = measure(lambda: compiled._evaluate_elements(values, size), args.repeat)
+            if use_numpy:
+                vector = measure(lambda: compiled._evaluate_vector(values, size), args.repeat)
+                numbers = f"{vector:>9.2f} | {elements / vector:>6.1f}x"
+            else:
+                numbers = f"{'-':>9} | {'-':>7}"
+            print(f"{expression[:45]:<46}{size:>8} | {elements:>14.2f} | {numbers}")
+
+
+if __name__ == "__main__":
+    main()
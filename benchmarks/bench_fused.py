@@ -0,0 +1,156 @@
+"""
+End-to-end comparison of the four-step ReAct loop (STEP_CONFIG) with the fused
+two-step loop (FUSED_STEP_CONFIG): wall time, LLM calls and token usage per query.
+
+Runs against an OpenAI-compatible endpoint (Ollama by default). Tools are stubbed so
+only the LLM round trips are measured.
+
+Usage:
+    python benchmarks/bench_fused.py [--base-url http://localhost:11434/v1/] [--model phi4:14b]
+                                     [--queries queries.txt] [--max-turns 20] [--output fused.json]
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from ReAct import ReAct
+from repl.llm import LLM
+from repl.prompts import STEP_CONFIG, FUSED_STEP_CONFIG
+
+DEFAULT_QUERIES = [
+    "What is the weather in Berlin and in Paris right now?",
+    "Find the latest stable Python release and summarize its main changes.",
+    "Search for the population of Tokyo and compare it to New York.",
+]
+
+
+def web_search(query: str) -> str:
+    """Performs a web search for the given query and retrieves a list of search results."""
+    return f"- **[Result for {query}](https://example.com)**  \n  **Description:** Stub result with the answer to: {query}\n"
+
+
+def get_weather(location: str, time: str = "now") -> str:
+    """Get the current weather in a given location. Location MUST be a city."""
+    return json.dumps({"location": location, "temperature": "65", "time": time})
+
+
+def estimate_tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+class CountingCompletions:
+    def __init__(self, completions, stats):
+        self.completions = completions
+        self.stats = stats
+
+    def create(self, **params):
+        self.stats["calls"] += 1
+        self.stats["prompt_tokens"] += sum(estimate_tokens(m["content"]) for m in params["messages"])
+        stream = self.completions.create(**params)
+        return self._count(stream) if params.get("stream") else stream
+
+    def _count(self, stream):
+        first = None
+        start = time.perf_counter()
+        try:
+            for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    if first is None:
+                        first = time.perf_counter() - start
+                        self.stats["ttft"].append(first)
+                    self.stats["completion_tokens"] += estimate_tokens(chunk.choices[0].delta.content)
+                yield chunk
+        finally:
+            close = getattr(stream, "close", None)
+            if close:
+                close()
+
+    def close(self):
+        pass
+
+
+class CountingClient:
+    """Proxies an OpenAI client and counts calls and (estimated) tokens."""
+
+    def __init__(self, client):
+        self.stats = {"calls": 0, "prompt_tokens": 0, "completion_tokens": 0, "ttft": []}
+
+        class Chat:
+            pass
+
+        self.chat = Chat()
+        self.chat.completions = CountingCompletions(client.chat.completions, self.stats)
+
+    def reset(self):
+        self.stats.update(calls=0, prompt_tokens=0, completion_tokens=0, ttft=[])
+
+
+def run(config_name, step_config, client, args, queries):
+    agent = ReAct(llm=LLM(model=args.model, client=client), step_config=step_config)
+    rows = []
+    for query in queries:
+        client.reset()
+        start = time.perf_counter()
+        for _ in agent.execute(query, [], tools=[web_search, get_weather], max_turns=args.max_turns):
+            pass
+        rows.append({
+            "mode": config_name,
+            "query": query,
+            "seconds": time.perf_counter() - start,
+            "llm_calls": client.stats["calls"],
+            "prompt_tokens": client.stats["prompt_tokens"],
+            "completion_tokens": client.stats["completion_tokens"],
+            "mean_ttft": statistics.mean(client.stats["ttft"]) if client.stats["ttft"] else None,
+        })
+        print(f"{config_name:<7} {rows[-1]['seconds']:7.2f}s {rows[-1]['llm_calls']:3d} calls "
+              f"{rows[-1]['prompt_tokens']:7d} prompt {rows[-1]['completion_tokens']:6d} completion  {query[:50]}")
+    return rows
+
+
+def summarize(rows):
+    return {
+        "seconds": statistics.mean(r["seconds"] for r in rows),
+        "llm_calls": statistics.mean(r["llm_calls"] for r in rows),
+        "prompt_tokens": statistics.mean(r["prompt_tokens"] for r in rows),
+        "completion_tokens": statistics.mean(r["completion_tokens"] for r in rows),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:11434/v1/")
+    parser.add_argument("--api-key", default="ollama")
+    parser.add_argument("--model", default="phi4:14b")
+    parser.add_argument("--queries", help="Text file with one query per line")
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--output", help="Write per-query results and the summary as JSON")
+    args = parser.parse_args()
+
+    queries = DEFAULT_QUERIES
+    if args.queries:
+        with open(args.queries) as f:
+            queries = [line.strip() for line in f if line.strip()]
+
+    client = CountingClient(OpenAI(base_url=args.base_url, api_key=args.api_key, timeout=120.0))
+    rows = run("steps", STEP_CONFIG, client, args, queries) + run("fused", FUSED_STEP_CONFIG, client, args, queries)
+
+    summary = {mode: summarize([r for r in rows if r["mode"] == mode]) for mode in ("steps", "fused")}
+    print()
+    for mode, values in summary.items():
+        print(f"{mode:<7} mean {values['seconds']:.2f}s, {values['llm_calls']:.1f} calls, "
+              f"{values['prompt_tokens']:.0f} prompt / {values['completion_tokens']:.0f} completion tokens per query")
+    print(f"speedup: {summary['steps']['seconds'] / summary['fused']['seconds']:.2f}x")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"rows": rows, "summary": summary}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
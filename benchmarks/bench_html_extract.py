@@ -0,0 +1,107 @@
+"""
+Benchmark of the read_url text extraction: full BeautifulSoup parse + truncation
+versus the streaming, byte-capped TextExtractor.
+
+Usage:
+    python benchmarks/bench_html_extract.py [corpus_dir] [--max-chars 5000] [--repeat 5]
+
+corpus_dir should contain saved pages (*.html, *.htm). Without it, synthetic pages
+from 10 KB to 4 MB are generated.
+"""
+import argparse
+import glob
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bs4 import BeautifulSoup
+from repl.html_text import extract_text_from_chunks
+
+CHUNK_SIZE = 16384
+
+
+def full_parse(body: bytes, max_chars: int) -> tuple:
+    soup = BeautifulSoup(body.decode("utf-8", errors="replace"), "html.parser")
+    for element in soup(["script", "style", "meta", "noscript"]):
+        element.extract()
+    return soup.get_text(separator="\n", strip=True)[:max_chars], len(body)
+
+
+def streaming_parse(body: bytes, max_chars: int) -> tuple:
+    consumed = [0]
+
+    def chunks():
+        for start in range(0, len(body), CHUNK_SIZE):
+            chunk = body[start:start + CHUNK_SIZE]
+            consumed[0] += len(chunk)
+            yield chunk
+
+    return extract_text_from_chunks(chunks(), max_chars=max_chars, encoding="utf-8"), consumed[0]
+
+
+def synthetic_corpus() -> list:
+    paragraph = "<p>" + "Lorem ipsum dolor sit amet, consectetur adipiscing elit. " * 4 + "</p>\n"
+    script = "<script>" + "var x = {a: 1, b: [1, 2, 3]};" * 50 + "</script>\n"
+    pages = []
+    for size_kb in (10, 100, 1000, 4000):
+        body = []
+        length = 0
+        while length < size_kb * 1024:
+            block = script + "<div>" + paragraph * 5 + "</div>\n"
+            body.append(block)
+            length += len(block)
+        html = "<html><head><style>body {color: red}</style></head><body>" + "".join(body) + "</body></html>"
+        pages.append((f"synthetic-{size_kb}kb", html.encode("utf-8")))
+    return pages
+
+
+def load_corpus(path: str) -> list:
+    files = sorted(glob.glob(os.path.join(path, "*.html")) + glob.glob(os.path.join(path, "*.htm")))
+    pages = []
+    for file in files:
+        with open(file, "rb") as f:
+            pages.append((os.path.basename(file), f.read()))
+    return pages
+
+
+def measure(func, body: bytes, max_chars: int, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        text, consumed = func(body, max_chars)
+        timings.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    func(body, max_chars)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {"ms": min(timings) * 1000, "peak_kb": peak / 1024, "read_kb": consumed / 1024, "chars": len(text)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("corpus", nargs="?", help="Directory with saved HTML pages")
+    parser.add_argument("--max-chars", type=int, default=5000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    pages = load_corpus(args.corpus) if args.corpus else synthetic_corpus()
+    if not pages:
+        sys.exit(f"No *.html files found in {args.corpus}")
+
+    print(f"{'page':<28}{'size KB':>9} | {'full ms':>9}{'peak KB':>10} | {'stream ms':>9}{'peak KB':>10}{'read KB':>9} | {'speedup':>7}")
+    for name, body in pages:
+        full = measure(full_parse, body, args.max_chars, args.repeat)
+        stream = measure(streaming_parse, body, args.max_chars, args.repeat)
+        print(
+            f"{name[:27]:<28}{len(body) / 1024:>9.0f} | {full['ms']:>9.2f}{full['peak_kb']:>10.0f} | "
+            f"{stream['ms']:>9.2f}{stream['peak_kb']:>10.0f}{stream['read_kb']:>9.0f} | {full['ms'] / stream['ms']:>6.1f}x"
+        )
+
+
+if __name__ == "__main__":
+    main()
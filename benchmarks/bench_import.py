@@ -0,0 +1,113 @@
+"""
+Startup benchmark: import time of the agent modules and time until the batch and server
+entry points are usable, each measured in fresh interpreter processes.
+
+Also checks that importing the agent does not import the heavy dependencies that only
+some tools need (openai is imported on the first completion, tool dependencies on the
+first tool call).
+
+Usage:
+    python benchmarks/bench_import.py [--repeat 5] [--check]
+
+With --check the exit code is 1 if a target is missed or a heavy module is imported eagerly.
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Startup targets in seconds, on top of the bare interpreter start
+TARGETS = {
+    "import ReAct": 0.35,
+    "import repl.tools": 0.30,
+    "batch.py --help": 0.15,
+    "server.py ready": 1.0,
+}
+
+LAZY_MODULES = ["openai", "requests", "bs4", "pytz", "ddg", "serpapi", "numpy"]
+
+
+def run(args) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable] + args, cwd=ROOT, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def server_ready() -> float:
+    """Seconds from process start until /health answers."""
+    port = free_port()
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "server.py", "--port", str(port), "--workers", "4"],
+        cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < 30:
+            try:
+                urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1).read()
+                return time.perf_counter() - start
+            except OSError:
+                if process.poll() is not None:
+                    raise RuntimeError("server.py exited during startup")
+                time.sleep(0.005)
+        raise RuntimeError("server.py did not become ready")
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def eager_modules() -> list:
+    code = f"import sys, ReAct, repl.tools; ReAct.ReAct(); print(__import__('json').dumps([m for m in {LAZY_MODULES!r} if m in sys.modules]))"
+    output = subprocess.run([sys.executable, "-c", code], cwd=ROOT, check=True, capture_output=True, text=True).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--check", action="store_true", help="Fail if a target is missed")
+    args = parser.parse_args()
+
+    measurements = {
+        "python": lambda: run(["-c", "pass"]),
+        "import ReAct": lambda: run(["-c", "import ReAct"]),
+        "import repl.tools": lambda: run(["-c", "import repl.tools"]),
+        "batch.py --help": lambda: run(["batch.py", "--help"]),
+        "server.py ready": server_ready,
+    }
+    results = {name: statistics.median(measure() for _ in range(args.repeat)) for name, measure in measurements.items()}
+    baseline = results.pop("python")
+
+    failed = False
+    print(f"{'':<20} {'median':>9} {'startup':>9} {'target':>9}")
+    print(f"{'python -c pass':<20} {baseline * 1000:>7.0f}ms")
+    for name, seconds in results.items():
+        startup = seconds - baseline
+        target = TARGETS[name]
+        ok = startup <= target
+        failed |= not ok
+        print(f"{name:<20} {seconds * 1000:>7.0f}ms {startup * 1000:>7.0f}ms {target * 1000:>7.0f}ms {'ok' if ok else 'MISSED'}")
+
+    eager = eager_modules()
+    print(f"\nHeavy modules imported by 'import ReAct, repl.tools; ReAct.ReAct()': {', '.join(eager) or 'none'}")
+    failed |= bool(eager)
+
+    if args.check and failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
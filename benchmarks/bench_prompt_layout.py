@@ -0,0 +1,104 @@
+"""
+Measures prefill time per step for the "system" and "prefix" prompt layouts on a long
+conversation. Time to first token with a 1-token completion is used as prefill time.
+
+With the "system" layout every step starts with a different system prompt, so a backend
+with prefix caching (Ollama, vLLM) re-processes the whole conversation on each step.
+With the "prefix" layout only the step instructions at the end are new.
+
+Usage:
+    python benchmarks/bench_prompt_layout.py [--base-url http://localhost:11434/v1/] [--model phi4:14b]
+                                             [--history-turns 30] [--turns 3] [--output layout.json]
+"""
+import argparse
+import json
+import os
+import random
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from ReAct import ReAct
+from repl.llm import LLM
+
+FILLER = (
+    "The brake controller reads the wheel speed sensors every 10 ms, computes the slip ratio and "
+    "adjusts the hydraulic pressure. The CRC of each sensor frame is checked before the value is used. "
+)
+
+
+def web_search(query: str) -> str:
+    """Performs a web search for the given query and retrieves a list of search results."""
+    return ""
+
+
+def build_history(turns: int, nonce: str) -> list:
+    history = []
+    for i in range(turns):
+        history.append({"role": "user", "content": f"[{nonce}] Question {i}: " + FILLER * 3})
+        history.append({"role": "assistant", "content": f"Answer {i}: " + FILLER * 4, "step": "observation"})
+    return history
+
+
+def measure_ttft(llm: LLM, messages: list) -> float:
+    start = time.perf_counter()
+    stream = llm.get_chat_completion(messages, stream=True)
+    try:
+        for chunk in stream:
+            if chunk.choices and chunk.choices[0].delta.content:
+                break
+    finally:
+        stream.close()
+    return time.perf_counter() - start
+
+
+def run(layout: str, args) -> dict:
+    client = OpenAI(base_url=args.base_url, api_key=args.api_key, timeout=300.0)
+    llm = LLM(model=args.model, max_completion_tokens=1, client=client)
+    agent = ReAct(llm=llm, prompt_layout=layout)
+    agent.use_tools([web_search])
+
+    # A fresh nonce per layout, so one run cannot reuse the other's cache
+    history = build_history(args.history_turns, f"{layout}-{random.random()}")
+    input_message = [{"role": "user", "content": "Summarize the failure modes of the brake controller."}]
+    memory = []
+    timings = {step: [] for step in agent.steps}
+
+    # Warm up the shared conversation once
+    measure_ttft(llm, agent.build_messages(agent.steps[0], history, input_message, memory))
+
+    for _ in range(args.turns):
+        for step in agent.steps:
+            timings[step].append(measure_ttft(llm, agent.build_messages(step, history, input_message, memory)))
+            memory.append({"role": "assistant", "content": f"{step} output. " + FILLER, "step": step})
+
+    return {step: statistics.mean(values) * 1000 for step, values in timings.items()}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:11434/v1/")
+    parser.add_argument("--api-key", default="ollama")
+    parser.add_argument("--model", default="phi4:14b")
+    parser.add_argument("--history-turns", type=int, default=30)
+    parser.add_argument("--turns", type=int, default=3)
+    parser.add_argument("--output", help="Write the results as JSON")
+    args = parser.parse_args()
+
+    results = {layout: run(layout, args) for layout in ("system", "prefix")}
+
+    print(f"{'step':<14}{'system ms':>11}{'prefix ms':>11}{'saved ms':>10}")
+    for step in results["system"]:
+        system, prefix = results["system"][step], results["prefix"][step]
+        print(f"{step:<14}{system:>11.1f}{prefix:>11.1f}{system - prefix:>10.1f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Local stand-in for the Ollama/OpenAI `/v1/chat/completions` endpoint with scripted responses.
+
+Responses are chosen per ReAct step (detected from the step prompt) and streamed as
+Server-Sent Events with a configurable time to first token and token rate.
+
+Usage:
+    python benchmarks/mock_server.py [--port 11435] [--ttft 0.2] [--token-rate 40] [--turns 1] [--script script.json]
+
+The script file is a JSON object mapping step names (think, action, observation,
+reflection, reason_act, observe_reflect) to response texts.
+"""
+import argparse
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+DEFAULT_SCRIPT = {
+    "think": "- The user needs current information.\n- Search the web for it, then summarize the results.",
+    "action": '{"action": "web_search", "parameters": {"query": "benchmark query"}}',
+    "observation": "The search returned three relevant results that answer the question.",
+    "reflection": '{"done": %s, "reason": "The observations answer the question."}',
+    "reason_act": '{"thought": "Search the web.", "action": "web_search", "parameters": {"query": "benchmark query"}}',
+    "observe_reflect": '{"observation": "The search answered the question.", "done": %s, "reason": "Answered."}',
+}
+
+# Markers in the step prompts, most specific first
+STEP_MARKERS = [
+    ("reasoning and action-taking", "reason_act"),
+    ("observation and reflection", "observe_reflect"),
+    ("action-taking agent", "action"),
+    ("reflection agent", "reflection"),
+    ("review the results", "observation"),
+]
+
+
+def split_tokens(text: str, size: int = 4) -> list:
+    """Splits a text into pseudo tokens of about `size` characters."""
+    return [text[i:i + size] for i in range(0, len(text), size)] or [""]
+
+
+class ScriptedResponder:
+    def __init__(self, script=None, turns: int = 1):
+        """
+        Picks the scripted response for a request.
+
+        Args:
+            script (Optional[dict]): Responses per step. Defaults to `DEFAULT_SCRIPT`.
+            turns (int): Number of reflection steps until the task is reported as done.
+        """
+        self.script = {**DEFAULT_SCRIPT, **(script or {})}
+        self.turns = turns
+
+    def detect_step(self, messages) -> str:
+        system = " ".join(m.get("content", "") for m in messages if m.get("role") == "system")
+        # In the prefix layout the step instructions are the last system message
+        if messages and messages[-1].get("role") == "system":
+            system = messages[-1].get("content", "")
+        for marker, step in STEP_MARKERS:
+            if marker in system:
+                return step
+        return "think"
+
+    def respond(self, messages) -> str:
+        step = self.detect_step(messages)
+        text = self.script.get(step, self.script["think"])
+        if "%s" in text:
+            reflections = sum(1 for m in messages if m.get("role") == "assistant" and '"done"' in m.get("content", ""))
+            text = text % ("true" if reflections + 1 >= self.turns else "false")
+        return text
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.rstrip("/").endswith("/models"):
+            self._send_json({"object": "list", "data": [{"id": "mock", "object": "model", "created": 0, "owned_by": "mock"}]})
+        else:
+            self.send_error(404)
+
+    def do_POST(self):
+        if not self.path.rstrip("/").endswith("/chat/completions"):
+            self.send_error(404)
+            return
+        length = int(self.headers.get("Content-Length", 0))
+        request = json.loads(self.rfile.read(length) or b"{}")
+        server = self.server
+        text = server.responder.respond(request.get("messages", []))
+        model = request.get("model", "mock")
+        server.requests += 1
+
+        if request.get("stream"):
+            self._stream(text, model)
+        else:
+            time.sleep(server.ttft + len(split_tokens(text)) / server.token_rate if server.token_rate else server.ttft)
+            self._send_json({
+                "id": f"chatcmpl-{uuid.uuid4().hex[:12]}",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": text}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": 0, "completion_tokens": len(split_tokens(text)), "total_tokens": len(split_tokens(text))},
+            })
+
+    def _send_json(self, data):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _stream(self, text, model):
+        server = self.server
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:12]}"
+        created = int(time.time())
+        delay = 1.0 / server.token_rate if server.token_rate else 0
+
+        def event(delta, finish_reason=None):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": model,
+                "choices": [{"index": 0, "delta": delta, "finish_reason": finish_reason}],
+            }
+            self.wfile.write(b"data: " + json.dumps(chunk).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        try:
+            time.sleep(server.ttft)
+            for i, token in enumerate(split_tokens(text)):
+                if i and delay:
+                    time.sleep(delay)
+                event({"role": "assistant", "content": token} if i == 0 else {"content": token})
+            event({}, "stop")
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client closed the stream early, e.g. after a complete JSON object
+            server.cancelled += 1
+
+
+class MockServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, ttft: float = 0.0, token_rate: float = 0.0, responder=None):
+        """
+        Mock completion server.
+
+        Args:
+            port (int): Port to listen on; 0 picks a free port.
+            ttft (float): Delay before the first token in seconds.
+            token_rate (float): Tokens per second; 0 streams as fast as possible.
+            responder (Optional[ScriptedResponder]): Chooses the responses.
+        """
+        super().__init__(("127.0.0.1", port), MockHandler)
+        self.ttft = ttft
+        self.token_rate = token_rate
+        self.responder = responder or ScriptedResponder()
+        self.requests = 0
+        self.cancelled = 0
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/"
+
+    def start(self) -> "MockServer":
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--ttft", type=float, default=0.2, help="Time to first token in seconds")
+    parser.add_argument("--token-rate", type=float, default=40.0, help="Tokens per second, 0 for unlimited")
+    parser.add_argument("--turns", type=int, default=1, help="Reflections until the task is done")
+    parser.add_argument("--script", help="JSON file with responses per step")
+    args = parser.parse_args()
+
+    script = None
+    if args.script:
+        with open(args.script) as f:
+            script = json.load(f)
+
+    server = MockServer(args.port, args.ttft, args.token_rate, ScriptedResponder(script, args.turns))
+    print(f"Mock server listening on {server.base_url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
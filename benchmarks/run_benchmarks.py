@@ -0,0 +1,227 @@
+"""
+Offline benchmark suite for the agent's own overhead, independent of model latency.
+
+Runs against the local mock server (benchmarks/mock_server.py) and an in-process scripted
+client, with stub tools. Measures:
+    - loop overhead per step (model latency zero)
+    - event throughput out of `execute`
+    - `format_response` / schema validation cost
+    - memory growth over long sessions
+
+Results are written as JSON so runs of different releases can be compared.
+
+Usage:
+    python benchmarks/run_benchmarks.py [--output bench_results.json] [--runs 50] [--compare previous.json]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from openai import OpenAI
+from openai.types.chat import ChatCompletionChunk
+from ReAct import ReAct
+from repl.llm import LLM
+from mock_server import MockServer, ScriptedResponder, split_tokens
+from stub_tools import STUB_TOOLS
+
+
+class ScriptedCompletions:
+    def __init__(self, responder):
+        self.responder = responder
+        self.requests = 0
+
+    def create(self, **params):
+        self.requests += 1
+        text = self.responder.respond(params["messages"])
+        return iter([
+            ChatCompletionChunk.model_validate({
+                "id": "bench", "object": "chat.completion.chunk", "created": 0, "model": params["model"],
+                "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}],
+            })
+            for token in split_tokens(text)
+        ])
+
+
+class ScriptedClient:
+    """In-process client without HTTP, to isolate the loop's own cost."""
+
+    def __init__(self, responder):
+        self.chat = type("Chat", (), {})()
+        self.chat.completions = ScriptedCompletions(responder)
+
+
+def run_session(agent, query="benchmark query", history=None, max_turns=20):
+    steps = 0
+    events = 0
+    response = None
+    last_step = None
+    for event in agent.execute(query, history or [], tools=STUB_TOOLS, max_turns=max_turns):
+        events += 1
+        if event.get("step") and event["step"] != last_step:
+            steps += 1
+            last_step = event["step"]
+        if "response" in event:
+            response = event["response"]
+    return steps, events, response
+
+
+def bench_loop_overhead(client, runs, turns):
+    """Wall time per step with zero model latency."""
+    agent = ReAct(llm=LLM(model="mock", client=client))
+    run_session(agent)  # warm up
+    per_step = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        steps, _, _ = run_session(agent)
+        per_step.append((time.perf_counter() - start) / max(1, steps))
+    return {
+        "mean_ms_per_step": statistics.mean(per_step) * 1000,
+        "p95_ms_per_step": sorted(per_step)[int(0.95 * (len(per_step) - 1))] * 1000,
+        "turns": turns,
+    }
+
+
+def bench_event_throughput(client, runs):
+    """Events per second out of execute with long responses at unlimited token rate."""
+    agent = ReAct(llm=LLM(model="mock", client=client))
+    total_events = 0
+    start = time.perf_counter()
+    for _ in range(runs):
+        _, events, _ = run_session(agent)
+        total_events += events
+    elapsed = time.perf_counter() - start
+    return {"events_per_second": total_events / elapsed, "events": total_events}
+
+
+def bench_format_response(iterations):
+    """Cost of parsing and validating JSON step responses."""
+    agent = ReAct(llm=LLM(model="mock", client=ScriptedClient(ScriptedResponder())))
+    cases = {
+        "action": '{"action": "web_search", "parameters": {"query": "benchmark query"}}',
+        "action_multi": '{"actions": [' + ", ".join(['{"action": "web_search", "parameters": {"query": "q"}}'] * 3) + "]}",
+        "action_fenced": '```json\n{"action": "web_search", "parameters": {"query": "q"}}\n```',
+        "reflection": '{"done": true, "reason": "The observations answer the question."}',
+        "reflection_invalid": '{"done": "yes"}',
+    }
+    results = {}
+    for name, content in cases.items():
+        step = name.split("_")[0]
+        start = time.perf_counter()
+        for _ in range(iterations):
+            agent.format_response(content, step)
+        results[name] = {"us_per_call": (time.perf_counter() - start) / iterations * 1e6}
+    return results
+
+
+def bench_memory_growth(client, sessions, turns):
+    """Allocated memory while a conversation history keeps growing across sessions."""
+    agent = ReAct(llm=LLM(model="mock", client=client))
+    history = []
+    gc.collect()
+    tracemalloc.start()
+    samples = []
+    for i in range(sessions):
+        _, _, response = run_session(agent, f"query {i}", history)
+        history.extend(response)
+        if (i + 1) % max(1, sessions // 10) == 0:
+            gc.collect()
+            current, peak = tracemalloc.get_traced_memory()
+            samples.append({"session": i + 1, "current_kb": current / 1024, "peak_kb": peak / 1024})
+    tracemalloc.stop()
+    growth = (samples[-1]["current_kb"] - samples[0]["current_kb"]) / max(1, samples[-1]["session"] - samples[0]["session"])
+    return {"samples": samples, "kb_per_session": growth, "turns": turns}
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True, stderr=subprocess.DEVNULL).strip()
+    except Exception:
+        return None
+
+
+def compare(results, previous_path, threshold):
+    """Prints metrics that regressed by more than `threshold` against a previous result file."""
+    with open(previous_path) as f:
+        previous = json.load(f)
+    checks = [
+        ("loop_overhead.inprocess.mean_ms_per_step", False),
+        ("loop_overhead.http.mean_ms_per_step", False),
+        ("event_throughput.inprocess.events_per_second", True),
+        ("memory_growth.kb_per_session", False),
+    ]
+    regressions = []
+    for path, higher_is_better in checks:
+        old, new = previous, results
+        for key in path.split("."):
+            old, new = (old or {}).get(key), (new or {}).get(key)
+        if not old or new is None:
+            continue
+        change = (new - old) / old
+        if (change < -threshold) if higher_is_better else (change > threshold):
+            regressions.append(f"{path}: {old:.3f} -> {new:.3f} ({change:+.0%})")
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    return not regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--runs", type=int, default=50)
+    parser.add_argument("--turns", type=int, default=3, help="Turns per session until the task is done")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--sessions", type=int, default=100)
+    parser.add_argument("--compare", help="Previous result file to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed relative regression")
+    args = parser.parse_args()
+
+    responder = ScriptedResponder(turns=args.turns)
+    server = MockServer(responder=responder).start()
+    http_client = OpenAI(base_url=server.base_url, api_key="mock", timeout=30.0)
+    inprocess_client = ScriptedClient(responder)
+
+    try:
+        results = {
+            "meta": {
+                "timestamp": time.time(),
+                "revision": git_revision(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "args": vars(args),
+            },
+            "loop_overhead": {
+                "inprocess": bench_loop_overhead(inprocess_client, args.runs, args.turns),
+                "http": bench_loop_overhead(http_client, max(1, args.runs // 5), args.turns),
+            },
+            "event_throughput": {
+                "inprocess": bench_event_throughput(inprocess_client, args.runs),
+                "http": bench_event_throughput(http_client, max(1, args.runs // 5)),
+            },
+            "format_response": bench_format_response(args.iterations),
+            "memory_growth": bench_memory_growth(inprocess_client, args.sessions, args.turns),
+        }
+    finally:
+        server.stop()
+
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+
+    print(json.dumps({k: v for k, v in results.items() if k != "meta"}, indent=2))
+    print(f"Results written to {args.output}")
+
+    if args.compare and not compare(results, args.compare, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
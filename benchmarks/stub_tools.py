@@ -0,0 +1,34 @@
+"""
+Deterministic stand-ins for the network tools, so benchmarks measure the agent and not the web.
+Set STUB_LATENCY to simulate tool latency in seconds.
+"""
+import json
+import time
+from repl.types import Result
+
+STUB_LATENCY = 0.0
+
+SEARCH_RESULT = "\n".join(
+    f"- **[Result {i}](https://example.com/{i})**  \n  **Description:** Stub description of search result {i}.\n"
+    for i in range(1, 6)
+)
+
+
+def web_search(query: str) -> Result:
+    """Performs a web search for the given query and retrieves a list of search results."""
+    time.sleep(STUB_LATENCY)
+    return Result(value=SEARCH_RESULT)
+
+
+def read_url(url: str) -> Result:
+    """Fetches and extracts text content from a given webpage URL."""
+    time.sleep(STUB_LATENCY)
+    return Result(value=f"Content of {url}. " * 100)
+
+
+def get_weather(location: str, time: str = "now") -> str:
+    """Get the current weather in a given location. Location MUST be a city."""
+    return json.dumps({"location": location, "temperature": "65", "time": time})
+
+
+STUB_TOOLS = [web_search, read_url, get_weather]
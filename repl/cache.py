@@ -0,0 +1,377 @@
+import copy
+import functools
+import hashlib
+import inspect
+import json
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+
+def make_key(*parts) -> str:
+    """
+    Builds a stable cache key from JSON-serializable parts.
+
+    Dictionaries are serialized with sorted keys, so the key does not depend on insertion order.
+
+    Returns:
+        str: A sha256 hex digest.
+    """
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class MemoryCache:
+    def __init__(self, maxsize: int = 256, ttl: Optional[float] = None):
+        """
+        In-memory LRU cache with an optional time to live.
+
+        Args:
+            maxsize (int): Maximum number of entries. The least recently used entry is evicted first.
+            ttl (Optional[float]): Default lifetime of an entry in seconds. None keeps entries until evicted.
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            value, expires = entry
+            if expires is not None and expires < time.time():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        expires = time.time() + ttl if ttl is not None else None
+        with self._lock:
+            self._data[key] = (value, expires)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: str) -> None:
+        """Deletes all entries whose key starts with `prefix`."""
+        with self._lock:
+            for key in [key for key in self._data if key.startswith(prefix)]:
+                del self._data[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class SQLiteCache:
+    def __init__(self, path: str = "cache.db", max_bytes: int = 100 * 1024 * 1024, ttl: Optional[float] = None):
+        """
+        Persistent cache stored in a SQLite database. Values are pickled.
+
+        When the stored values exceed `max_bytes`, the least recently accessed entries are evicted.
+
+        Args:
+            path (str): Path of the database file.
+            max_bytes (int): Maximum total size of the stored values in bytes.
+            ttl (Optional[float]): Default lifetime of an entry in seconds. None keeps entries until evicted.
+        """
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL, "
+            "expires REAL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS cache_accessed ON cache (accessed)")
+        self._conn.commit()
+
+    def get(self, key: str, default: Any = None) -> Any:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires FROM cache WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return default
+            value, expires = row
+            if expires is not None and expires < now:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return default
+            self._conn.execute("UPDATE cache SET accessed = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+        try:
+            return pickle.loads(value)
+        except Exception:
+            self.delete(key)
+            return default
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        ttl = self.ttl if ttl is None else ttl
+        now = time.time()
+        blob = pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL)
+        if len(blob) > self.max_bytes:
+            return
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now + ttl if ttl is not None else None, now),
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        """Deletes expired entries, then the least recently accessed ones until the size limit holds."""
+        self._conn.execute("DELETE FROM cache WHERE expires IS NOT NULL AND expires < ?", (time.time(),))
+        total = self._conn.execute("SELECT COALESCE(SUM(size), 0) FROM cache").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self._conn.execute("SELECT key, size FROM cache ORDER BY accessed").fetchall():
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+            self._conn.commit()
+
+    def delete_prefix(self, prefix: str) -> None:
+        """Deletes all entries whose key starts with `prefix`."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache WHERE substr(key, 1, ?) = ?", (len(prefix), prefix))
+            self._conn.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TieredCache:
+    def __init__(self, memory: Optional[MemoryCache] = None, disk: Optional[SQLiteCache] = None):
+        """
+        Two-level cache: a fast memory tier in front of an optional persistent disk tier.
+
+        Disk hits are promoted to the memory tier. Hits and misses are counted.
+
+        Args:
+            memory (Optional[MemoryCache]): The memory tier. Defaults to an LRU with 256 entries.
+            disk (Optional[SQLiteCache]): The disk tier, or None to cache in memory only.
+        """
+        self.memory = memory if memory is not None else MemoryCache()
+        self.disk = disk
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str, default: Any = None) -> Any:
+        missing = object()
+        value = self.memory.get(key, missing)
+        if value is missing and self.disk is not None:
+            value = self.disk.get(key, missing)
+            if value is not missing:
+                self.memory.set(key, value)
+        if value is missing:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.memory.set(key, value, ttl)
+        if self.disk is not None:
+            self.disk.set(key, value, ttl)
+
+    def delete(self, key: str) -> None:
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def delete_prefix(self, prefix: str) -> None:
+        self.memory.delete_prefix(prefix)
+        if self.disk is not None:
+            self.disk.delete_prefix(prefix)
+
+    def clear(self) -> None:
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+        self.hits = 0
+        self.misses = 0
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "size": len(self.memory)}
+
+
+class _OwnMemoryTier(TieredCache):
+    """
+    A tool's own memory tier in front of the disk tier of a shared cache (see `cached_tool`).
+    Hits and misses are counted in the shared cache, so its stats include the tool.
+    """
+
+    def __init__(self, memory: MemoryCache, shared: TieredCache):
+        super().__init__(memory, shared.disk)
+        self.shared = shared
+
+    def get(self, key: str, default: Any = None) -> Any:
+        missing = object()
+        value = super().get(key, missing)
+        if value is missing:
+            self.shared.misses += 1
+            return default
+        self.shared.hits += 1
+        return value
+
+
+# Shared cache for tool results. Memory only by default, see `configure_tool_cache`.
+TOOL_CACHE = TieredCache(MemoryCache(maxsize=512))
+
+
+def configure_tool_cache(path: Optional[str] = None, maxsize: int = 512, max_bytes: int = 50 * 1024 * 1024) -> TieredCache:
+    """
+    Replaces the shared tool result cache.
+
+    Args:
+        path (Optional[str]): SQLite file for the disk tier. None keeps tool results in memory only.
+        maxsize (int): Number of entries in the memory tier.
+        max_bytes (int): Size limit of the disk tier in bytes.
+
+    Returns:
+        TieredCache: The new tool cache.
+    """
+    global TOOL_CACHE
+    disk = SQLiteCache(path, max_bytes=max_bytes) if path else None
+    TOOL_CACHE = TieredCache(MemoryCache(maxsize=maxsize), disk)
+    return TOOL_CACHE
+
+
+if os.environ.get("REACT_TOOL_CACHE"):
+    configure_tool_cache(os.environ["REACT_TOOL_CACHE"])
+
+
+def normalize_value(value: Any, casefold: bool = False) -> Any:
+    """
+    Normalizes a tool argument so equivalent calls share a cache key.
+
+    Strings are stripped and runs of whitespace collapsed (and case-folded if requested),
+    containers are normalized recursively.
+    """
+    if isinstance(value, str):
+        value = " ".join(value.split())
+        return value.casefold() if casefold else value
+    if isinstance(value, dict):
+        return {str(k): normalize_value(v, casefold) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize_value(v, casefold) for v in value]
+    return value
+
+
+def is_cacheable(result: Any) -> bool:
+    """Errors and results that ask for a retry are never cached."""
+    if getattr(result, "error", False) or getattr(result, "repeat", False):
+        return False
+    if isinstance(result, str) and result.startswith(("Error", "An error occurred")):
+        return False
+    return True
+
+
+def cached_tool(ttl: Optional[float] = 300, casefold: bool = False, cache: Optional[TieredCache] = None, cache_if=is_cacheable, memory_size: Optional[int] = None):
+    """
+    Decorator that caches the results of a tool for `ttl` seconds.
+
+    The wrapped function keeps its name, docstring and signature, so it can be used as a tool
+    unchanged. It gets `cache_info()` and `cache_clear()` like `functools.lru_cache`.
+
+    Args:
+        ttl (Optional[float]): Lifetime of a cached result in seconds. None caches until evicted.
+        casefold (bool): Ignore the case of string arguments (useful for search queries).
+        cache (Optional[TieredCache]): Cache to use. Defaults to the shared `TOOL_CACHE`.
+        cache_if (Callable): Predicate deciding whether a result is stored.
+        memory_size (Optional[int]): Keep at most this many results of the tool in memory, in a
+            memory tier of its own in front of the cache's disk tier. For tools with large results.
+    """
+    def decorator(func):
+        signature = inspect.signature(func)
+        lock = threading.Lock()
+        counters = {"hits": 0, "misses": 0}
+        memory = MemoryCache(maxsize=memory_size) if memory_size is not None else None
+        own_tier = None
+        # Keys start with the tool's name, so cache_clear can delete the tool's entries only
+        prefix = f"{func.__module__}.{func.__qualname__}:"
+
+        def get_store() -> TieredCache:
+            nonlocal own_tier
+            shared = cache if cache is not None else TOOL_CACHE
+            if memory is None:
+                return shared
+            tier = own_tier
+            if tier is None or tier.shared is not shared:
+                # Built once per shared cache; `configure_tool_cache` replaces TOOL_CACHE
+                memory.clear()
+                tier = own_tier = _OwnMemoryTier(memory, shared)
+            return tier
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            store = get_store()
+            try:
+                bound = signature.bind(*args, **kwargs)
+                bound.apply_defaults()
+                arguments = normalize_value(dict(bound.arguments), casefold)
+            except TypeError:
+                # Let the tool raise its own error for invalid arguments
+                return func(*args, **kwargs)
+
+            key = prefix + make_key(arguments)
+            missing = object()
+            value = store.get(key, missing)
+            if value is not missing:
+                with lock:
+                    counters["hits"] += 1
+                return copy.copy(value)
+
+            with lock:
+                counters["misses"] += 1
+            result = func(*args, **kwargs)
+            if cache_if(result):
+                # Store a copy, so callers modifying the result do not change the cached value
+                store.set(key, copy.copy(result), ttl)
+            return result
+
+        def cache_info() -> dict:
+            with lock:
+                return {"hits": counters["hits"], "misses": counters["misses"], "ttl": ttl}
+
+        def cache_clear() -> None:
+            # Entries of other tools live in the same store, so only this tool's are deleted
+            get_store().delete_prefix(prefix)
+            with lock:
+                counters["hits"] = counters["misses"] = 0
+
+        wrapper.cache_info = cache_info
+        wrapper.cache_clear = cache_clear
+        return wrapper
+
+    return decorator
@@ -0,0 +1,177 @@
+import logging
+from collections import deque
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+try:
+    import tiktoken
+except ImportError:  # Listed in requirements.txt; without it tokens are estimated
+    tiktoken = None
+
+# Extra tokens per message for the role and chat template markers
+MESSAGE_OVERHEAD = 4
+# Share of the context window kept free when tokens are only estimated, i.e. counted with a
+# tiktoken encoding or the character heuristic instead of the served model's tokenizer
+APPROXIMATE_MARGIN = 0.1
+
+
+class TokenCounter:
+    def __init__(self, tokenizer: Optional[Any] = None, encoding: str = "cl100k_base", margin: Optional[float] = None):
+        """
+        Counts tokens of message contents.
+
+        Only the served model's own tokenizer counts exactly. tiktoken encodings are OpenAI's
+        (e.g. not phi4's), and the character heuristic is coarser still, so with either of them
+        `ContextManager` keeps `margin` of the window free.
+
+        Args:
+            tokenizer (Optional[Any]): Any object with `encode(text) -> list`, e.g. a Hugging Face
+                tokenizer matching the served model, or the name of one to load with
+                `transformers.AutoTokenizer`. Defaults to tiktoken if installed, otherwise about
+                four characters per token.
+            encoding (str): The tiktoken encoding used when no tokenizer is given.
+            margin (Optional[float]): Share of the context window kept free for counting errors.
+                Defaults to 0 with a tokenizer and `APPROXIMATE_MARGIN` otherwise.
+        """
+        name = None
+        if isinstance(tokenizer, str):
+            name, tokenizer = tokenizer, None
+            try:
+                from transformers import AutoTokenizer
+                tokenizer = AutoTokenizer.from_pretrained(name)
+            except Exception as e:
+                logging.warning(f"Tokenizer {name} unavailable, estimating tokens: {e}")
+        exact = tokenizer is not None
+        if exact:
+            self.description = f"tokenizer {name or type(tokenizer).__name__}"
+        elif tiktoken is None:
+            logging.warning("tiktoken not installed, estimating tokens as four characters each")
+            self.description = "4 characters per token"
+        else:
+            try:
+                tokenizer = tiktoken.get_encoding(encoding)
+                self.description = f"tiktoken {encoding}"
+            except Exception as e:
+                logging.warning(f"tiktoken encoding {encoding} unavailable, estimating tokens: {e}")
+                self.description = "4 characters per token"
+        self.tokenizer = tokenizer
+        self.margin = margin if margin is not None else (0.0 if exact else APPROXIMATE_MARGIN)
+        logging.info(f"Counting tokens with {self.description}, {self.margin:.0%} of the window kept free")
+        # Contents are immutable strings, so counts are cached by content
+        self.count = lru_cache(maxsize=4096)(self._count)
+
+    def _count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self.tokenizer is None:
+            return (len(text) + 3) // 4
+        return len(self.tokenizer.encode(text))
+
+    def count_message(self, message: Dict[str, Any]) -> int:
+        content = message.get("content")
+        return MESSAGE_OVERHEAD + (self.count(content) if isinstance(content, str) else 0)
+
+    def count_messages(self, messages: List[Dict[str, Any]]) -> int:
+        return sum(self.count_message(m) for m in messages)
+
+
+class ContextManager:
+    def __init__(
+        self,
+        max_tokens: int = 8000,
+        reserve_tokens: int = 1000,
+        keep_recent: int = 6,
+        tool_output_tokens: int = 200,
+        counter: Optional[TokenCounter] = None,
+        max_stats: int = 100,
+    ):
+        """
+        Fits the prompt of each step into a token budget.
+
+        The system prompt(s) and the current input message are always kept. Older tool
+        outputs in memory are compressed to their first `tool_output_tokens` tokens, and a
+        sliding window keeps the newest memory and history messages that fit the budget.
+        Messages are shared, never copied, unless they are compressed.
+
+        Args:
+            max_tokens (int): Context window of the model.
+            reserve_tokens (int): Tokens kept free for the completion.
+            keep_recent (int): Number of newest memory messages never compressed.
+            tool_output_tokens (int): Size older tool outputs are compressed to.
+            counter (Optional[TokenCounter]): Token counter. Defaults to `TokenCounter()`. Its
+                `margin` share of `max_tokens` is kept free in addition to `reserve_tokens`.
+            max_stats (int): Number of most recent prompts kept in `stats`.
+        """
+        self.max_tokens = max_tokens
+        self.reserve_tokens = reserve_tokens
+        self.keep_recent = keep_recent
+        self.tool_output_tokens = tool_output_tokens
+        self.counter = counter or TokenCounter()
+        # Per-prompt token stats; bounded, since agents live as long as their server or batch worker
+        self.stats = deque(maxlen=max_stats)
+        self._compressed = {}
+
+    def compress(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """Returns a shortened copy of a long tool output. Compressed copies are reused."""
+        content = message.get("content")
+        if message.get("role") != "tool" or not isinstance(content, str):
+            return message
+        if self.counter.count(content) <= self.tool_output_tokens:
+            return message
+
+        compressed = self._compressed.get(content)
+        if compressed is None:
+            # Characters per token of this content, to cut close to the token limit
+            ratio = len(content) / max(1, self.counter.count(content))
+            head = content[:int(self.tool_output_tokens * ratio)]
+            compressed = head + f"\n...[tool output truncated, {len(content) - len(head)} characters omitted]"
+            if len(self._compressed) > 1024:
+                self._compressed.clear()
+            self._compressed[content] = compressed
+        return {**message, "content": compressed}
+
+    def build(
+        self,
+        step: str,
+        head: List[Dict[str, Any]],
+        history: List[Dict[str, Any]],
+        input_message: List[Dict[str, Any]],
+        memory: List[Dict[str, Any]],
+        tail: Optional[List[Dict[str, Any]]] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Assembles `head + history + input_message + memory + tail` within the budget.
+
+        Returns:
+            List[Dict[str, Any]]: The messages for the step.
+        """
+        tail = tail or []
+        pinned = head + input_message + tail
+        # The counter's margin covers its counting error, see `TokenCounter`
+        available = self.max_tokens - self.reserve_tokens - int(self.max_tokens * self.counter.margin)
+        budget = available - self.counter.count_messages(pinned)
+
+        # Rolling compression of older tool outputs
+        cutoff = len(memory) - self.keep_recent
+        memory = [self.compress(m) if i < cutoff else m for i, m in enumerate(memory)]
+
+        kept_memory, budget = self._window(memory, budget)
+        kept_history, budget = self._window(history, budget) if len(kept_memory) == len(memory) else ([], budget)
+
+        messages = head + kept_history + input_message + kept_memory + tail
+        tokens = available - budget
+        dropped = len(history) + len(memory) - len(kept_history) - len(kept_memory)
+        self.stats.append({"step": step, "tokens": tokens, "messages": len(messages), "dropped": dropped})
+        logging.info(f"Context for step '{step}': {tokens} tokens, {len(messages)} messages, {dropped} dropped")
+        return messages
+
+    def _window(self, messages: List[Dict[str, Any]], budget: int):
+        """Keeps the newest contiguous messages that fit into the budget."""
+        start = len(messages)
+        while start > 0:
+            cost = self.counter.count_message(messages[start - 1])
+            if cost > budget:
+                break
+            budget -= cost
+            start -= 1
+        return messages[start:], budget
@@ -0,0 +1,275 @@
+import ast
+import functools
+import logging
+import math
+from typing import Any, Dict, List, Optional, Union
+
+# Limits that keep every evaluation cheap
+MAX_EXPRESSION_LENGTH = 2000
+MAX_ELEMENTS = 100_000
+MAX_INT_BITS = 100_000  # integer powers with larger results are rejected
+CACHE_SIZE = 512
+
+
+class ExpressionError(ValueError):
+    """An expression outside the supported subset, invalid variables or a failed evaluation."""
+
+
+FUNCTIONS = {
+    name: getattr(math, name)
+    for name in (
+        "sqrt", "exp", "log10", "log2", "sin", "cos", "tan", "asin", "acos", "atan", "atan2",
+        "sinh", "cosh", "tanh", "floor", "ceil", "hypot", "degrees", "radians",
+    )
+}
+FUNCTIONS.update({"log": math.log, "abs": abs, "round": round, "min": min, "max": max})
+
+CONSTANTS = {"pi": math.pi, "e": math.e, "tau": math.tau, "inf": math.inf}
+
+# numpy equivalents of FUNCTIONS, by attribute name, for vectorized evaluation
+NUMPY_FUNCTIONS = {
+    "sqrt": "sqrt", "exp": "exp", "log10": "log10", "log2": "log2", "sin": "sin", "cos": "cos",
+    "tan": "tan", "asin": "arcsin", "acos": "arccos", "atan": "arctan", "atan2": "arctan2",
+    "sinh": "sinh", "cosh": "cosh", "tanh": "tanh", "floor": "floor", "ceil": "ceil",
+    "hypot": "hypot", "degrees": "degrees", "radians": "radians", "abs": "abs", "round": "round",
+}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BinOp, ast.UnaryOp, ast.BoolOp, ast.Compare, ast.IfExp, ast.Call, ast.Name, ast.Load, ast.Constant,
+    ast.Add, ast.Sub, ast.Mult, ast.Div, ast.FloorDiv, ast.Mod, ast.Pow, ast.UAdd, ast.USub, ast.Not, ast.And, ast.Or,
+    ast.Eq, ast.NotEq, ast.Lt, ast.LtE, ast.Gt, ast.GtE,
+)
+
+
+def _safe_pow(base, exponent):
+    if isinstance(base, int) and isinstance(exponent, int) and exponent > 0 and abs(base) > 1:
+        if exponent * base.bit_length() > MAX_INT_BITS:
+            raise ExpressionError("Result too large")
+    return base ** exponent
+
+
+def _call(name: str, *args) -> ast.Call:
+    return ast.Call(func=ast.Name(id=name, ctx=ast.Load()), args=list(args), keywords=[])
+
+
+class _Rewriter(ast.NodeTransformer):
+    """
+    Rewrites a validated expression for evaluation. Scalar code guards `**`; vectorized code
+    replaces the operators that need Python truth values (`if`/`and`/`or`/`not`, chained
+    comparisons) with their elementwise numpy functions.
+    """
+
+    def __init__(self, vector: bool):
+        self.vector = vector
+
+    def visit_BinOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Pow) and not self.vector:
+            return _call("__pow", node.left, node.right)
+        return node
+
+    def visit_IfExp(self, node):
+        self.generic_visit(node)
+        return _call("__where", node.test, node.body, node.orelse) if self.vector else node
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        if not self.vector:
+            return node
+        return _call("__and" if isinstance(node.op, ast.And) else "__or", *node.values)
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        return _call("__not", node.operand) if self.vector and isinstance(node.op, ast.Not) else node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if not self.vector or len(node.ops) == 1:
+            return node
+        operands = [node.left] + node.comparators
+        pairs = [ast.Compare(left=operands[i], ops=[op], comparators=[operands[i + 1]]) for i, op in enumerate(node.ops)]
+        return _call("__and", *pairs)
+
+
+def _validate(tree: ast.AST) -> None:
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Constant):
+            if type(node.value) not in (int, float, complex, bool):
+                raise ExpressionError(f"Unsupported constant: {node.value!r}")
+        elif isinstance(node, ast.Name):
+            if node.id.startswith("_"):
+                raise ExpressionError(f"Unsupported name: {node.id}")
+        elif isinstance(node, ast.Call):
+            if not isinstance(node.func, ast.Name) or node.func.id not in FUNCTIONS or node.keywords:
+                raise ExpressionError(f"Only calls of these functions are supported: {', '.join(sorted(FUNCTIONS))}")
+        elif not isinstance(node, _ALLOWED_NODES):
+            raise ExpressionError(f"Unsupported syntax: {type(node).__name__}")
+
+
+@functools.lru_cache(maxsize=1)
+def _vector_namespace() -> Dict[str, Any]:
+    import numpy as np
+
+    namespace = {name: getattr(np, attribute) for name, attribute in NUMPY_FUNCTIONS.items()}
+    namespace.update(
+        log=lambda x, base=None: np.log(x) if base is None else np.log(x) / np.log(base),
+        min=lambda *args: functools.reduce(np.minimum, args),
+        max=lambda *args: functools.reduce(np.maximum, args),
+        __where=np.where,
+        __and=lambda *args: functools.reduce(np.logical_and, args),
+        __or=lambda *args: functools.reduce(np.logical_or, args),
+        __not=np.logical_not,
+        __builtins__={},
+        **CONSTANTS,
+    )
+    return namespace
+
+
+@functools.lru_cache(maxsize=1)
+def vectorized() -> bool:
+    """Whether list and range variables are evaluated in one numpy call (True) or per element."""
+    try:
+        import numpy  # noqa: F401
+    except ImportError:
+        logging.warning("numpy not installed, list and range variables are evaluated per element")
+        return False
+    return True
+
+
+_SCALAR_NAMESPACE = {"__builtins__": {}, "__pow": _safe_pow, **FUNCTIONS, **CONSTANTS}
+
+
+def _expand_range(name: str, spec: Dict[str, Any]) -> List:
+    try:
+        start, stop = float(spec.get("start", 0)), float(spec["stop"])
+        num = int(spec["num"]) if "num" in spec else None
+        step = float(spec.get("step", 1))
+    except (KeyError, TypeError, ValueError):
+        raise ExpressionError(f'Range {name} needs "stop" and either "step" or "num"')
+
+    if num is not None:
+        if not 0 < num <= MAX_ELEMENTS:
+            raise ExpressionError(f"Range {name} must have 1 to {MAX_ELEMENTS} values")
+        step = (stop - start) / (num - 1) if num > 1 else 0.0
+        return [start + i * step for i in range(num)]
+    if step == 0:
+        raise ExpressionError(f"Range {name} has step 0")
+    num = max(0, math.ceil((stop - start) / step))
+    if num > MAX_ELEMENTS:
+        raise ExpressionError(f"Range {name} must have at most {MAX_ELEMENTS} values")
+    values = [start + i * step for i in range(num)]
+    # Keep integer ranges integral, e.g. {"start": 1, "stop": 11}
+    return [int(v) for v in values] if start.is_integer() and step.is_integer() else values
+
+
+def _as_values(name: str, value) -> Union[int, float, List]:
+    """Converts a variable to a number or a list of numbers. Ranges are expanded."""
+    if isinstance(value, dict):
+        return _expand_range(name, value)
+    if isinstance(value, (list, tuple)):
+        if len(value) > MAX_ELEMENTS:
+            raise ExpressionError(f"Variable {name} must have at most {MAX_ELEMENTS} values")
+        if not all(isinstance(v, (int, float)) for v in value):
+            raise ExpressionError(f"Variable {name} must be a flat list of numbers")
+        return list(value)
+    if isinstance(value, (int, float)):
+        return value
+    raise ExpressionError(f"Variable {name} must be a number, a list of numbers or a range")
+
+
+class CompiledExpression:
+    def __init__(self, expression: str):
+        """
+        A validated, compiled expression. Only arithmetic, comparisons, conditional
+        expressions, `FUNCTIONS`, `CONSTANTS` and variables are allowed; no attribute access,
+        subscripts or other calls, so evaluating it cannot reach anything else.
+
+        Args:
+            expression (str): The expression, e.g. "sqrt(x**2 + y**2)".
+
+        Raises:
+            ExpressionError: If the expression is invalid or uses unsupported syntax.
+        """
+        expression = expression.strip()
+        if len(expression) > MAX_EXPRESSION_LENGTH:
+            raise ExpressionError(f"Expression longer than {MAX_EXPRESSION_LENGTH} characters")
+        try:
+            self.tree = ast.parse(expression, "<expression>", "eval")
+        except SyntaxError as e:
+            raise ExpressionError(f"Invalid expression: {e.msg}")
+        _validate(self.tree)
+        self.expression = expression
+        names = {node.id for node in ast.walk(self.tree) if isinstance(node, ast.Name)}
+        self.variables = sorted(names - set(FUNCTIONS) - set(CONSTANTS))
+        self._scalar = self._compile(vector=False)
+        self._vector = None
+
+    def _compile(self, vector: bool):
+        tree = _Rewriter(vector).visit(ast.parse(self.expression, "<expression>", "eval"))
+        return compile(ast.fix_missing_locations(tree), "<expression>", "eval")
+
+    def evaluate(self, variables: Optional[Dict[str, Any]] = None):
+        """
+        Evaluates the expression.
+
+        Args:
+            variables (Optional[Dict[str, Any]]): Numbers, lists of numbers or ranges
+                ({"start", "stop", "step"} or {"start", "stop", "num"}). With lists or ranges the
+                expression is evaluated for every position at once; all of them must have the
+                same length.
+
+        Returns:
+            The value, or a list of values if a variable is a list or range.
+
+        Raises:
+            ExpressionError: If a variable is missing or invalid, or the evaluation fails.
+        """
+        values = {name: _as_values(name, value) for name, value in (variables or {}).items()}
+        missing = [name for name in self.variables if name not in values]
+        if missing:
+            raise ExpressionError(f"Missing variables: {', '.join(missing)}")
+
+        lengths = {len(value) for value in values.values() if isinstance(value, list)}
+        if len(lengths) > 1:
+            raise ExpressionError("List and range variables must have the same length")
+        try:
+            if not lengths:
+                return eval(self._scalar, _SCALAR_NAMESPACE, values)
+            length = lengths.pop()
+            if vectorized():
+                return self._evaluate_vector(values, length)
+            return self._evaluate_elements(values, length)
+        except ExpressionError:
+            raise
+        except (ArithmeticError, ValueError, TypeError, NameError) as e:
+            raise ExpressionError(f"{type(e).__name__}: {e}")
+
+    def _evaluate_vector(self, values: Dict[str, Any], length: int) -> List:
+        import numpy as np
+
+        namespace = _vector_namespace()
+        if self._vector is None:
+            self._vector = self._compile(vector=True)
+        # Float arrays, so large integer results overflow to inf instead of silently wrapping
+        arrays = {name: np.asarray(value, dtype=float) if isinstance(value, list) else value for name, value in values.items()}
+        with np.errstate(all="ignore"):
+            result = eval(self._vector, namespace, arrays)
+        return np.broadcast_to(result, (length,)).tolist()
+
+    def _evaluate_elements(self, values: Dict[str, Any], length: int) -> List:
+        # Without numpy, evaluate the scalar code once per position
+        return [
+            eval(self._scalar, _SCALAR_NAMESPACE, {name: value[i] if isinstance(value, list) else value for name, value in values.items()})
+            for i in range(length)
+        ]
+
+
+@functools.lru_cache(maxsize=CACHE_SIZE)
+def compile_expression(expression: str) -> CompiledExpression:
+    """Compiles an expression, reusing the compiled form of recently used expressions."""
+    return CompiledExpression(expression)
+
+
+def evaluate(expression: str, variables: Optional[Dict[str, Any]] = None):
+    """Compiles (cached) and evaluates an expression, see `CompiledExpression.evaluate`."""
+    return compile_expression(expression).evaluate(variables)
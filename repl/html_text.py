@@ -0,0 +1,129 @@
+import codecs
+from html.parser import HTMLParser
+from typing import Iterable, Optional
+
+# Elements whose content is never readable text
+SKIP_TAGS = {"script", "style", "noscript", "template"}
+
+
+class TextExtractor(HTMLParser):
+    def __init__(self, max_chars: int = 5000):
+        """
+        Incremental HTML-to-text parser. Text is collected while the document is fed
+        and parsing stops as soon as `max_chars` characters were extracted.
+
+        Text nodes are stripped and joined with newlines, like
+        `BeautifulSoup.get_text(separator="\\n", strip=True)`.
+
+        Args:
+            max_chars (int): Text budget in characters.
+        """
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.parts = []
+        self.length = 0
+        self.done = False
+        self._skip_depth = 0
+        # Data of the current text node, which may arrive in several pieces when the
+        # document is fed in chunks
+        self._pending = []
+        self._pending_length = 0
+
+    def handle_starttag(self, tag, attrs):
+        self._flush()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._flush()
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_data(self, data):
+        if self.done or self._skip_depth:
+            return
+        self._pending.append(data)
+        self._pending_length += len(data)
+        if self.length + self._pending_length >= self.max_chars:
+            self._flush()
+
+    def _flush(self):
+        text = "".join(self._pending).strip()
+        self._pending = []
+        self._pending_length = 0
+        if self.done or not text:
+            return
+        self.parts.append(text)
+        self.length += len(text) + 1
+        if self.length >= self.max_chars:
+            self.done = True
+
+    def feed(self, data: str) -> bool:
+        """
+        Feeds the next piece of the document.
+
+        Returns:
+            bool: True once the text budget is reached and no more input is needed.
+        """
+        if not self.done:
+            super().feed(data)
+        return self.done
+
+    def close(self):
+        super().close()
+        self._flush()
+
+    def get_text(self) -> str:
+        self._flush()
+        return "\n".join(self.parts)[:self.max_chars]
+
+
+def extract_text(html: str, max_chars: int = 5000) -> str:
+    """
+    Extracts readable text from a complete HTML document.
+    """
+    parser = TextExtractor(max_chars)
+    parser.feed(html)
+    parser.close()
+    return parser.get_text()
+
+
+def extract_text_from_chunks(
+    chunks: Iterable[bytes],
+    max_chars: int = 5000,
+    encoding: Optional[str] = None,
+    max_bytes: Optional[int] = None,
+) -> str:
+    """
+    Extracts readable text from a stream of raw body chunks and stops reading
+    once the text budget or the byte cap is reached.
+
+    Args:
+        chunks (Iterable[bytes]): Body chunks, e.g. `response.iter_content(16384)`.
+        max_chars (int): Text budget in characters.
+        encoding (Optional[str]): Body encoding. Defaults to utf-8.
+        max_bytes (Optional[int]): Stop after this many bytes even if the budget is not reached.
+
+    Returns:
+        str: The extracted text.
+    """
+    try:
+        decoder = codecs.getincrementaldecoder(encoding or "utf-8")(errors="replace")
+    except LookupError:
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+
+    parser = TextExtractor(max_chars)
+    received = 0
+    for chunk in chunks:
+        if not chunk:
+            continue
+        received += len(chunk)
+        if parser.feed(decoder.decode(chunk)):
+            break
+        if max_bytes is not None and received >= max_bytes:
+            break
+    else:
+        parser.feed(decoder.decode(b"", final=True))
+        parser.close()
+
+    return parser.get_text()
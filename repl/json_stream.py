@@ -0,0 +1,98 @@
+import json
+from typing import Any, Callable, Optional
+
+class JSONStreamParser:
+    def __init__(self, accept: Optional[Callable[[Any], bool]] = None):
+        """
+        Incremental scanner for a streamed JSON value.
+
+        Deltas are fed as they arrive. The scanner tracks string, escape and nesting
+        state, so it knows the moment the top-level object or array is closed and the
+        rest of the stream can be dropped. Text before the first `{` or `[`
+        (e.g. a ```json fence) is skipped. A closed value that is not valid JSON or is
+        rejected by `accept` (e.g. the "[1]" in "Using [1] as the index: {...}") is skipped
+        as well, and scanning continues after it.
+
+        Args:
+            accept (Optional[Callable[[Any], bool]]): Checks a parsed value, e.g. the `is_valid`
+                of the step's schema validator. None accepts any valid JSON object or array.
+        """
+        self.accept = accept
+        self.parts = []
+        self.length = 0
+        self.start = None
+        self.end = None
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+
+    @property
+    def complete(self) -> bool:
+        return self.end is not None
+
+    def feed(self, text: str) -> Optional[int]:
+        """
+        Feeds the next delta.
+
+        Returns:
+            Optional[int]: None while the value is incomplete. Once the top-level value
+            closes, the offset in `text` just past its last character.
+        """
+        if self.complete:
+            return 0
+
+        offset = self.length
+        self.parts.append(text)
+        self.length += len(text)
+
+        for i, char in enumerate(text):
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                continue
+
+            if self.start is None:
+                if char in "{[":
+                    self.start = offset + i
+                    self._depth = 1
+                continue
+
+            if char == '"':
+                self._in_string = True
+            elif char in "{[":
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    if self._accepts(offset + i + 1):
+                        self.end = offset + i + 1
+                        return i + 1
+                    self.start = None
+        return None
+
+    def _accepts(self, end: int) -> bool:
+        try:
+            value = json.loads("".join(self.parts)[self.start:end])
+        except ValueError:
+            return False
+        return self.accept is None or self.accept(value)
+
+    def get_text(self) -> str:
+        """The JSON text seen so far, without leading and trailing noise once complete."""
+        text = "".join(self.parts)
+        if self.start is None:
+            return text
+        return text[self.start:self.end]
+
+
+def extract_json(content: str, accept: Optional[Callable[[Any], bool]] = None) -> Optional[str]:
+    """
+    Returns the first complete top-level JSON object or array in `content` that `accept`s, or None.
+    """
+    parser = JSONStreamParser(accept)
+    parser.feed(content)
+    return parser.get_text() if parser.complete else None
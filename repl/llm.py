@@ -1,7 +1,159 @@
-from openai import OpenAI
+# openai is imported on first use: it is the most expensive import of the agent
 from typing import Dict, Any
 from typing import  List, Dict, Optional, Union, Any
-import inspect
+import asyncio
+import threading
+import time
+from repl.cache import make_key
+from repl.metrics import METRICS, LLM_REQUESTS, LLM_ERRORS, TIME_TO_FIRST_TOKEN, TOKENS_PER_SECOND, PROMPT_TOKENS, COMPLETION_TOKENS
+from repl.util import function_to_json
+
+class RecordedStream:
+    def __init__(self, stream, cache, key: str):
+        """
+        Passes a completion stream through and stores its chunks in the cache.
+
+        Chunks are stored when the stream is exhausted, or when the consumer deliberately
+        stops early by calling `close()` (e.g. once a JSON response is complete).
+        A stream that is abandoned without `close()` is not cached.
+        """
+        self.stream = stream
+        self.cache = cache
+        self.key = key
+        self.chunks = []
+        self._stored = False
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self.chunks.append(chunk.model_dump())
+            yield chunk
+        self._store()
+
+    def _store(self):
+        if self.chunks and not self._stored:
+            self.cache.set(self.key, self.chunks)
+            self._stored = True
+
+    def close(self):
+        self._store()
+        close = getattr(self.stream, "close", None)
+        if close:
+            close()
+
+
+class AsyncRecordedStream(RecordedStream):
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self.chunks.append(chunk.model_dump())
+            yield chunk
+        await self._astore()
+
+    async def _astore(self):
+        # The cache may write to disk, which must not block the event loop
+        if self.chunks and not self._stored:
+            self._stored = True
+            await asyncio.get_running_loop().run_in_executor(None, self.cache.set, self.key, self.chunks)
+
+    async def close(self):
+        await self._astore()
+        close = getattr(self.stream, "close", None)
+        if close:
+            await close()
+
+
+class MeasuredStream:
+    def __init__(self, stream, model: str, start: float, prompt_tokens: int):
+        """
+        Passes a completion stream through and records time to first token, tokens per second
+        and token counts once the stream is exhausted or closed.
+
+        Token counts reported by the backend (a final chunk with `usage`) take precedence;
+        otherwise every content or tool call delta counts as one completion token and the
+        prompt is estimated from its length.
+        """
+        self.stream = stream
+        self.model = model
+        self.start = start
+        self.prompt_tokens = prompt_tokens
+        self.completion_tokens = 0
+        self.first_token = None
+        self._recorded = False
+
+    def _observe(self, chunk):
+        usage = getattr(chunk, "usage", None)
+        if usage:
+            self.prompt_tokens = usage.prompt_tokens
+            self.completion_tokens = usage.completion_tokens
+            return
+        if chunk.choices and (chunk.choices[0].delta.content or chunk.choices[0].delta.tool_calls):
+            if self.first_token is None:
+                self.first_token = time.perf_counter()
+            self.completion_tokens += 1
+
+    def __iter__(self):
+        for chunk in self.stream:
+            self._observe(chunk)
+            yield chunk
+        self._record()
+
+    def _record(self):
+        if self._recorded:
+            return
+        self._recorded = True
+        end = time.perf_counter()
+        PROMPT_TOKENS.inc(self.prompt_tokens, model=self.model)
+        COMPLETION_TOKENS.inc(self.completion_tokens, model=self.model)
+        if self.first_token is not None:
+            TIME_TO_FIRST_TOKEN.observe(self.first_token - self.start, model=self.model)
+            if end > self.first_token and self.completion_tokens > 1:
+                TOKENS_PER_SECOND.observe((self.completion_tokens - 1) / (end - self.first_token), model=self.model)
+
+    def close(self):
+        self._record()
+        close = getattr(self.stream, "close", None)
+        if close:
+            close()
+
+
+class AsyncMeasuredStream(MeasuredStream):
+    async def __aiter__(self):
+        async for chunk in self.stream:
+            self._observe(chunk)
+            yield chunk
+        self._record()
+
+    async def close(self):
+        self._record()
+        close = getattr(self.stream, "close", None)
+        if close:
+            await close()
+
+
+DEFAULT_BASE_URL = "http://localhost:11434/v1/"
+_default_clients = {}
+_default_clients_lock = threading.Lock()
+
+
+def default_client(client_class: str = "OpenAI"):
+    """
+    The shared client for the local Ollama server, built on first use instead of at import time.
+
+    Args:
+        client_class (str): "OpenAI" or "AsyncOpenAI".
+    """
+    with _default_clients_lock:
+        client = _default_clients.get(client_class)
+        if client is None:
+            import openai
+            client = getattr(openai, client_class)(base_url=DEFAULT_BASE_URL, api_key='ollama', timeout=20.0)
+            _default_clients[client_class] = client
+        return client
+
+
+def estimate_prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    """About four characters per token, plus the per-message chat template overhead."""
+    return sum((len(m["content"]) + 3) // 4 + 4 for m in messages)
+
 
 class LLM:
     def __init__(
@@ -10,7 +162,8 @@ class LLM:
         temperature: float = 0.1,
         top_p: float = 0.5,
         max_completion_tokens: int = 1000,
-        client = OpenAI(base_url='http://localhost:11434/v1/', api_key='ollama', timeout=20.0),
+        client = None,
+        cache = None,
     ):
         """
         Initialize the LLM class.
@@ -20,13 +173,29 @@ class LLM:
             temperature (float): Sampling temperature. Default is 0.1.
             top_p (float): Nucleus sampling parameter. Default is 0.5.
             max_completion_tokens (int): Maximum number of tokens to generate. Default is 1000.
-            client (Optional[object]): The client object to interact with the API. Default is None.
+            client (Optional[object]): The client object to interact with the API, or an `EndpointPool`
+                (see `repl.pool`) to balance over several backends. Defaults to a shared client for
+                the local Ollama server, created on first use.
+            cache (Optional[object]): Opt-in response cache with `get`/`set` (e.g. `repl.cache.TieredCache`). Default is None.
         """
         self.model = model
         self.temperature = temperature
         self.top_p = top_p
         self.max_completion_tokens = max_completion_tokens
-        self.client = client
+        self._client = client
+        self.cache = cache
+
+    default_client_class = "OpenAI"
+
+    @property
+    def client(self):
+        if self._client is None:
+            self._client = default_client(self.default_client_class)
+        return self._client
+
+    @client.setter
+    def client(self, client):
+        self._client = client
 
     def get_chat_completion(
         self,
@@ -50,6 +219,92 @@ class LLM:
         if not self.client:
             raise ValueError("Client is not initialized. Please provide a client object.")
 
+        create_params = self.build_params(messages, functions, stream, response_format)
+        if not METRICS.enabled:
+            return self.complete(create_params, stream)
+
+        start = time.perf_counter()
+        try:
+            response = self.complete(create_params, stream)
+        except Exception:
+            LLM_ERRORS.inc(model=self.model)
+            raise
+        return self.measure(response, create_params, start, MeasuredStream)
+
+    def complete(self, create_params: Dict[str, Any], stream: bool):
+        """Sends the request, or answers it from the cache if one is configured."""
+        if self.cache is None:
+            # Make the API call
+            return self.client.chat.completions.create(**create_params)
+
+        key = self.cache_key(create_params)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return self.replay_cached(cached, stream)
+
+        response = self.client.chat.completions.create(**create_params)
+        if stream:
+            return RecordedStream(response, self.cache, key)
+
+        self.cache.set(key, response.model_dump())
+        return response
+
+    def measure(self, response, create_params: Dict[str, Any], start: float, stream_class):
+        """Records the request metrics; streams are wrapped to measure them as they are consumed."""
+        LLM_REQUESTS.inc(model=self.model)
+        if create_params["stream"]:
+            return stream_class(response, self.model, start, estimate_prompt_tokens(create_params["messages"]))
+
+        usage = getattr(response, "usage", None)
+        if usage:
+            PROMPT_TOKENS.inc(usage.prompt_tokens, model=self.model)
+            COMPLETION_TOKENS.inc(usage.completion_tokens, model=self.model)
+        return response
+
+    def cache_key(self, create_params: Dict[str, Any]) -> str:
+        """
+        Returns a stable hash of the request fields that determine the completion.
+        """
+        return make_key(
+            create_params["model"],
+            create_params["messages"],
+            create_params["temperature"],
+            create_params["top_p"],
+            create_params["max_tokens"],
+            create_params.get("response_format"),
+            create_params.get("tools"),
+            create_params["stream"],
+        )
+
+    def replay_cached(self, cached, stream: bool):
+        """
+        Rebuilds a cached response. Streams are replayed as a synthetic stream of chunks.
+        """
+        from openai.types.chat import ChatCompletion, ChatCompletionChunk
+
+        if stream:
+            return (ChatCompletionChunk.model_validate(chunk) for chunk in cached)
+        return ChatCompletion.model_validate(cached)
+
+    def build_params(
+        self,
+        messages: List[Dict[str, str]],
+        functions: Optional[List[object]] = None,
+        stream: bool = False,
+        response_format: Optional[Dict[str, str]] = None,
+    ) -> Dict[str, Any]:
+        """
+        Builds the keyword arguments for `chat.completions.create`.
+
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with "role" and "content".
+            functions (Optional[List[object]]): List of functions to include in the request. Default is None.
+            stream (bool): Whether to stream the response. Default is False.
+            response_format (Optional[Dict[str, str]]): Format of the response. Default is None.
+
+        Returns:
+            Dict[str, Any]: The request parameters.
+        """
         # Convert functions to JSON if provided
         tools = [self.function_to_json(f) for f in functions] if functions else []
 
@@ -79,14 +334,12 @@ class LLM:
         if tools:
             create_params["tools"] = tools
 
-        # Make the API call
-        return self.client.chat.completions.create(**create_params)
+        return create_params
     
     def function_to_json(self, func) -> dict:
         """
-        Converts a Python function into a JSON-serializable dictionary
-        that describes the function's signature, including its name,
-        description, and parameters.
+        Converts a Python function into the JSON tool description sent to the API.
+        Already converted descriptions (dicts, e.g. from `ToolRegistry.schemas`) are passed through.
 
         Args:
             func: The function to be converted.
@@ -94,48 +347,91 @@ class LLM:
         Returns:
             A dictionary representing the function's signature in JSON format.
         """
-        type_map = {
-            str: "string",
-            int: "integer",
-            float: "number",
-            bool: "boolean",
-            list: "array",
-            dict: "object",
-            type(None): "null",
-        }
+        if isinstance(func, dict):
+            return func
+        return function_to_json(func)
+
+class AsyncLLM(LLM):
+    default_client_class = "AsyncOpenAI"
+
+    def __init__(
+        self,
+        model: str = "phi4:14b",
+        temperature: float = 0.1,
+        top_p: float = 0.5,
+        max_completion_tokens: int = 1000,
+        client = None,
+        cache = None,
+    ):
+        """
+        Initialize the AsyncLLM class. Same as `LLM`, but backed by an `AsyncOpenAI` client
+        so many sessions can share one event loop.
 
+        Args:
+            model (str): The model to use for completions. Default is "phi4:14b".
+            temperature (float): Sampling temperature. Default is 0.1.
+            top_p (float): Nucleus sampling parameter. Default is 0.5.
+            max_completion_tokens (int): Maximum number of tokens to generate. Default is 1000.
+            client (Optional[object]): The async client object to interact with the API, or an
+                `AsyncEndpointPool`. Defaults to a shared `AsyncOpenAI` client for the local Ollama server.
+            cache (Optional[object]): Opt-in response cache with `get`/`set`. Default is None.
+        """
+        super().__init__(model, temperature, top_p, max_completion_tokens, client, cache)
+
+    async def get_chat_completion(
+        self,
+        messages: List[Dict[str, str]],
+        functions: Optional[List[object]] = None,
+        stream: bool = False,
+        response_format: Optional[Dict[str, str]] = None,
+    ) -> Union[Dict, object]:
+        """
+        Get a chat completion from the model without blocking the event loop.
+
+        Args:
+            messages (List[Dict[str, str]]): List of message dictionaries with "role" and "content".
+            functions (Optional[List[object]]): List of functions to include in the request. Default is None.
+            stream (bool): Whether to stream the response. Default is False.
+            response_format (Optional[Dict[str, str]]): Format of the response. Default is None.
+
+        Returns:
+            Union[Dict, object]: The completion response, or an async stream of chunks if `stream` is True.
+        """
+        if not self.client:
+            raise ValueError("Client is not initialized. Please provide a client object.")
+
+        create_params = self.build_params(messages, functions, stream, response_format)
+        if not METRICS.enabled:
+            return await self.complete(create_params, stream)
+
+        start = time.perf_counter()
         try:
-            signature = inspect.signature(func)
-        except ValueError as e:
-            raise ValueError(
-                f"Failed to get signature for function {func.__name__}: {str(e)}"
-            )
-
-        parameters = {}
-        for param in signature.parameters.values():
-            try:
-                param_type = type_map.get(param.annotation, "string")
-            except KeyError as e:
-                raise KeyError(
-                    f"Unknown type annotation {param.annotation} for parameter {param.name}: {str(e)}"
-                )
-            parameters[param.name] = {"type": param_type}
-
-        required = [
-            param.name
-            for param in signature.parameters.values()
-            if param.default == inspect._empty
-        ]
+            response = await self.complete(create_params, stream)
+        except Exception:
+            LLM_ERRORS.inc(model=self.model)
+            raise
+        return self.measure(response, create_params, start, AsyncMeasuredStream)
+
+    async def complete(self, create_params: Dict[str, Any], stream: bool):
+        if self.cache is None:
+            return await self.client.chat.completions.create(**create_params)
+
+        # Cache lookups and stores may hit SQLite, so they run in the default executor
+        loop = asyncio.get_running_loop()
+        key = self.cache_key(create_params)
+        cached = await loop.run_in_executor(None, self.cache.get, key)
+        if cached is not None:
+            return self.areplay_cached(cached) if stream else self.replay_cached(cached, stream)
+
+        response = await self.client.chat.completions.create(**create_params)
+        if stream:
+            return AsyncRecordedStream(response, self.cache, key)
+
+        await loop.run_in_executor(None, self.cache.set, key, response.model_dump())
+        return response
+
+    async def areplay_cached(self, cached):
+        from openai.types.chat import ChatCompletionChunk
 
-        return {
-            "type": "function",
-            "function": {
-                "name": func.__name__,
-                "description": func.__doc__ or "",
-                "parameters": {
-                    "type": "object",
-                    "properties": parameters,
-                    "required": required,
-                },
-            },
-        }
\ No newline at end of file
+        for chunk in cached:
+            yield ChatCompletionChunk.model_validate(chunk)
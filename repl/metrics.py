@@ -0,0 +1,193 @@
+import bisect
+import math
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+RATE_BUCKETS = (1, 2, 5, 10, 20, 30, 50, 75, 100, 150, 200, 500)
+
+
+def _label_key(labelnames: Sequence[str], labels: Dict[str, str]) -> Tuple[str, ...]:
+    return tuple(str(labels.get(name, "")) for name in labelnames)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labelnames, key, extra: Optional[Dict[str, str]] = None) -> str:
+    pairs = list(zip(labelnames, key)) + list((extra or {}).items())
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def render(self):
+        name = self.name[:-len("_total")] if self.name.endswith("_total") else self.name
+        yield f"# HELP {name} {self.documentation}"
+        yield f"# TYPE {name} counter"
+        with self._lock:
+            items = list(self.values.items())
+        for key, value in items:
+            yield f"{name}_total{_format_labels(self.labelnames, key)} {_format_value(value)}"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {",".join(key): value for key, value in self.values.items()}
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels) -> None:
+        key = _label_key(self.labelnames, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self.values.get(key)
+            if state is None:
+                state = self.values[key] = {"counts": [0] * (len(self.buckets) + 1), "sum": 0.0, "count": 0}
+            state["counts"][index] += 1
+            state["sum"] += value
+            state["count"] += 1
+
+    def render(self):
+        yield f"# HELP {self.name} {self.documentation}"
+        yield f"# TYPE {self.name} histogram"
+        with self._lock:
+            items = [(key, {"counts": list(s["counts"]), "sum": s["sum"], "count": s["count"]}) for key, s in self.values.items()]
+        for key, state in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), state["counts"]):
+                cumulative += count
+                yield f"{self.name}_bucket{_format_labels(self.labelnames, key, {'le': _format_value(bound)})} {cumulative}"
+            yield f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(state['sum'])}"
+            yield f"{self.name}_count{_format_labels(self.labelnames, key)} {state['count']}"
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                ",".join(key): {"count": s["count"], "sum": s["sum"], "mean": s["sum"] / s["count"] if s["count"] else 0.0}
+                for key, s in self.values.items()
+            }
+
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = False):
+        """
+        Holds the agent's metrics. Instrumented code checks `enabled` before doing any work,
+        so disabled metrics cost one attribute lookup.
+        """
+        self.enabled = enabled
+        self.metrics = {}
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.metrics.setdefault(name, Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.metrics.setdefault(name, Histogram(name, documentation, labelnames, buckets))
+
+    def render(self, openmetrics: bool = False) -> str:
+        """Renders all metrics in the Prometheus text format (or OpenMetrics with `# EOF`)."""
+        lines = [line for metric in self.metrics.values() for line in metric.render()]
+        if openmetrics:
+            lines.append("# EOF")
+        return "\n".join(lines) + "\n"
+
+    def snapshot(self) -> dict:
+        """In-process API: current values of all metrics as a dictionary."""
+        return {name: metric.snapshot() for name, metric in self.metrics.items()}
+
+    def reset(self) -> None:
+        for metric in self.metrics.values():
+            with metric._lock:
+                metric.values.clear()
+
+
+METRICS = MetricsRegistry(enabled=os.environ.get("REACT_METRICS", "") not in ("", "0"))
+
+STEP_DURATION = METRICS.histogram("react_step_duration_seconds", "Duration of the LLM part of a step.", ["step"])
+RUN_DURATION = METRICS.histogram("react_run_duration_seconds", "Duration of an execute run.", buckets=DEFAULT_BUCKETS + (120.0, 300.0))
+RUNS = METRICS.counter("react_runs_total", "Number of execute runs.")
+LLM_REQUESTS = METRICS.counter("react_llm_requests_total", "Number of chat completion requests.", ["model"])
+LLM_ERRORS = METRICS.counter("react_llm_errors_total", "Number of failed chat completion requests.", ["model"])
+TIME_TO_FIRST_TOKEN = METRICS.histogram("react_llm_time_to_first_token_seconds", "Time from request to first streamed token.", ["model"])
+TOKENS_PER_SECOND = METRICS.histogram("react_llm_tokens_per_second", "Completion tokens per second after the first token.", ["model"], RATE_BUCKETS)
+PROMPT_TOKENS = METRICS.counter("react_llm_prompt_tokens_total", "Prompt tokens (reported by the backend or estimated).", ["model"])
+COMPLETION_TOKENS = METRICS.counter("react_llm_completion_tokens_total", "Completion tokens (reported by the backend or estimated).", ["model"])
+TOOL_DURATION = METRICS.histogram("react_tool_duration_seconds", "Duration of tool calls.", ["tool"])
+TOOL_CALLS = METRICS.counter("react_tool_calls_total", "Number of tool calls.", ["tool", "status"])
+STEP_REPEATS = METRICS.counter("react_step_repeats_total", "Action steps repeated because no tool produced a result.", ["step"])
+STEP_RETRIES = METRICS.counter("react_step_retries_total", "Steps re-run on another model after an invalid response.", ["step"])
+SCHEMA_FAILURES = METRICS.counter("react_schema_failures_total", "Step responses that failed JSON parsing or schema validation.", ["step"])
+
+
+def observe_tool(name: str, start: float, failed: bool) -> None:
+    TOOL_DURATION.observe(time.perf_counter() - start, tool=name)
+    TOOL_CALLS.inc(tool=name, status="error" if failed else "ok")
+
+
+def enable() -> None:
+    METRICS.enabled = True
+
+
+def disable() -> None:
+    METRICS.enabled = False
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        openmetrics = "application/openmetrics-text" in self.headers.get("Accept", "")
+        body = METRICS.render(openmetrics).encode("utf-8")
+        self.send_response(200)
+        if openmetrics:
+            self.send_header("Content-Type", "application/openmetrics-text; version=1.0.0; charset=utf-8")
+        else:
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+def start_http_server(port: int = 9464, addr: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serves the metrics at http://addr:port/metrics from a background thread and enables collection.
+    """
+    enable()
+    server = ThreadingHTTPServer((addr, port), MetricsHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True, name="react-metrics").start()
+    return server
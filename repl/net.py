@@ -0,0 +1,79 @@
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+DEFAULT_HEADERS = {"User-Agent": "Mozilla/5.0"}
+
+_lock = threading.Lock()
+_session = None
+_config = {
+    "pool_connections": 16,   # number of hosts with a kept-alive pool
+    "pool_maxsize": 8,        # connections per host
+    "retries": 3,
+    "backoff_factor": 0.5,
+    "status_forcelist": (429, 500, 502, 503, 504),
+    "timeout": 10,
+}
+
+
+def configure_http(**options) -> None:
+    """
+    Changes the settings of the shared connection pool. The next `get_session` call builds a new session.
+
+    Args:
+        pool_connections (int): Number of hosts to keep connection pools for.
+        pool_maxsize (int): Maximum number of connections per host. Requests block when all are in use.
+        retries (int): Number of retries for connection errors and retryable status codes.
+        backoff_factor (float): Exponential backoff factor between retries in seconds.
+        status_forcelist (tuple): HTTP status codes that are retried.
+        timeout (float): Default request timeout in seconds.
+    """
+    global _session
+    unknown = set(options) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown HTTP options: {', '.join(sorted(unknown))}")
+
+    with _lock:
+        _config.update(options)
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def get_session() -> requests.Session:
+    """
+    Returns the shared keep-alive session used by all network tools.
+    """
+    global _session
+    if _session is not None:
+        return _session
+
+    with _lock:
+        if _session is None:
+            retry = Retry(
+                total=_config["retries"],
+                backoff_factor=_config["backoff_factor"],
+                status_forcelist=_config["status_forcelist"],
+                allowed_methods=frozenset(["GET", "HEAD"]),
+            )
+            adapter = HTTPAdapter(
+                pool_connections=_config["pool_connections"],
+                pool_maxsize=_config["pool_maxsize"],
+                max_retries=retry,
+                pool_block=True,
+            )
+            session = requests.Session()
+            session.headers.update(DEFAULT_HEADERS)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+    return _session
+
+
+def http_get(url: str, **kwargs) -> requests.Response:
+    """
+    GET request through the shared session with the configured default timeout.
+    """
+    kwargs.setdefault("timeout", _config["timeout"])
+    return get_session().get(url, **kwargs)
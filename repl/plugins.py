@@ -0,0 +1,89 @@
+import importlib
+import json
+import os
+import threading
+from typing import Callable, Dict, List
+
+# Declarative manifest of the built-in tools: name -> "module:attribute".
+# A tool's module is only imported when the tool is loaded, and the tools import their
+# heavy dependencies on first call.
+TOOL_MANIFEST = {
+    "web_search": "repl.tools:web_search",
+    "google": "repl.tools:google",
+    "read_url": "repl.tools:read_url",
+    "read_urls": "repl.tools:read_urls",
+    "search_fetched": "repl.tools:search_fetched",
+    "get_weather": "repl.tools:get_weather",
+    "date": "repl.tools:date",
+    "count_letters": "repl.tools:count_letters",
+    "calculate_expression": "repl.tools:calculate_expression",
+    "find_symbol": "repl.tools:find_symbol",
+    "ask_user": "repl.tools:ask_user",
+    "write_code": "repl.tools:write_code",
+    "run_code": "repl.tools:run_code",
+}
+
+# Installed packages can provide tools through this entry point group, e.g. in pyproject.toml:
+#   [project.entry-points."react.tools"]
+#   my_tool = "my_package.tools:my_tool"
+ENTRY_POINT_GROUP = "react.tools"
+
+_lock = threading.Lock()
+_loaded: Dict[str, Callable] = {}
+_entry_points = None
+
+
+def register_tool(name: str, target: str) -> None:
+    """Adds a tool to the manifest. `target` is "module:attribute"."""
+    with _lock:
+        TOOL_MANIFEST[name] = target
+        _loaded.pop(name, None)
+
+
+def load_manifest(path: str) -> None:
+    """Adds the tools of a JSON manifest file ({"name": "module:attribute", ...})."""
+    with open(path, encoding="utf-8") as f:
+        for name, target in json.load(f).items():
+            register_tool(name, target)
+
+
+def _plugin_entry_points() -> Dict[str, str]:
+    """Tools of installed plugins; scanned once, and only for names not in the manifest."""
+    global _entry_points
+    if _entry_points is None:
+        from importlib.metadata import entry_points
+        _entry_points = {ep.name: ep.value for ep in entry_points(group=ENTRY_POINT_GROUP)}
+    return _entry_points
+
+
+def available_tools() -> Dict[str, str]:
+    """All known tool names and their targets, without importing any tool."""
+    return {**_plugin_entry_points(), **TOOL_MANIFEST}
+
+
+def load_tool(name: str) -> Callable:
+    """
+    Imports a tool by name.
+
+    Raises:
+        KeyError: If no tool of that name is in the manifest or an installed plugin.
+    """
+    tool = _loaded.get(name)
+    if tool is not None:
+        return tool
+    target = TOOL_MANIFEST.get(name) or _plugin_entry_points().get(name)
+    if target is None:
+        raise KeyError(f"Unknown tool: {name}")
+    module, _, attribute = target.partition(":")
+    tool = getattr(importlib.import_module(module), attribute)
+    with _lock:
+        _loaded[name] = tool
+    return tool
+
+
+def load_tools(names: List[str]) -> List[Callable]:
+    return [load_tool(name) for name in names]
+
+
+if os.environ.get("REACT_TOOL_MANIFEST"):
+    load_manifest(os.environ["REACT_TOOL_MANIFEST"])
@@ -0,0 +1,426 @@
+import asyncio
+import logging
+import random
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from types import SimpleNamespace
+from typing import Any, Dict, List, Optional, Union
+
+from openai import OpenAI, AsyncOpenAI, APIConnectionError, APIStatusError, APITimeoutError
+
+_END = object()
+
+
+def is_retryable(error: Exception) -> bool:
+    """Connection failures, timeouts, rate limits and server errors are retried on another endpoint."""
+    if isinstance(error, (APIConnectionError, APITimeoutError)):
+        return True
+    if isinstance(error, APIStatusError):
+        return error.status_code == 429 or error.status_code >= 500
+    return False
+
+
+class Endpoint:
+    def __init__(self, base_url: str, api_key: str = "ollama", timeout: float = 20.0, client: Optional[Any] = None):
+        """
+        One completion backend and its routing state.
+
+        Args:
+            base_url (str): The OpenAI-compatible API base URL, e.g. "http://node1:11434/v1/".
+            api_key (str): The API key.
+            timeout (float): Request timeout in seconds.
+            client (Optional[Any]): A prebuilt (sync or async) client. Built by the pool if None.
+        """
+        self.base_url = base_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.client = client
+        self.probe = None  # sync client of the health checks
+        self.outstanding = 0
+        self.failures = 0
+        self.down_until = 0.0
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "base_url": self.base_url, "healthy": self.healthy, "outstanding": self.outstanding,
+            "requests": self.requests, "errors": self.errors,
+        }
+
+
+class BaseEndpointPool:
+    client_class = OpenAI
+
+    def __init__(
+        self,
+        endpoints: List[Union[str, Dict[str, Any], Endpoint]],
+        retries: int = 2,
+        backoff: float = 0.25,
+        max_backoff: float = 4.0,
+        hedge_after: Optional[float] = None,
+        max_failures: int = 2,
+        cooldown: float = 10.0,
+        health_interval: Optional[float] = 10.0,
+    ):
+        """
+        Spreads chat completions over several OpenAI-compatible endpoints (e.g. Ollama nodes).
+
+        Each request goes to the healthy endpoint with the fewest outstanding requests.
+        Connection failures before the first streamed token are retried on another endpoint
+        with jittered exponential backoff. With `hedge_after`, a second request is sent to
+        another endpoint if the first has not streamed a token after that many seconds; the
+        first one to stream wins and the other is closed.
+
+        The pool has the `chat.completions.create` interface of an OpenAI client, so it is
+        passed to `LLM` as its client.
+
+        Args:
+            endpoints (List[Union[str, Dict[str, Any], Endpoint]]): Base URLs, `Endpoint` arguments or endpoints.
+            retries (int): Additional attempts after a retryable failure.
+            backoff (float): Base delay of the exponential backoff in seconds.
+            max_backoff (float): Maximum backoff delay in seconds.
+            hedge_after (Optional[float]): Seconds without a first token before a hedged request is sent. None disables hedging.
+            max_failures (int): Consecutive failures after which an endpoint is taken out of rotation.
+            cooldown (float): Seconds an unhealthy endpoint stays out of rotation unless a health check passes.
+            health_interval (Optional[float]): Seconds between background health checks of unhealthy endpoints. None disables them.
+        """
+        if not endpoints:
+            raise ValueError("EndpointPool requires at least one endpoint")
+        self.endpoints = [self._endpoint(e) for e in endpoints]
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.hedge_after = hedge_after
+        self.max_failures = max_failures
+        self.cooldown = cooldown
+        self.health_interval = health_interval
+        self.hedges = 0
+        self.retried = 0
+        self._lock = threading.Lock()
+        self._health_thread = None
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    def _endpoint(self, endpoint) -> Endpoint:
+        if isinstance(endpoint, str):
+            endpoint = Endpoint(endpoint)
+        elif isinstance(endpoint, dict):
+            endpoint = Endpoint(**endpoint)
+        if endpoint.client is None:
+            # Retries are done by the pool, across endpoints
+            endpoint.client = self.client_class(base_url=endpoint.base_url, api_key=endpoint.api_key, timeout=endpoint.timeout, max_retries=0)
+        return endpoint
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"endpoints": [e.stats() for e in self.endpoints], "hedges": self.hedges, "retried": self.retried}
+
+    def pick(self, exclude=()) -> Endpoint:
+        """The healthy endpoint with the fewest outstanding requests; ties are broken randomly."""
+        with self._lock:
+            candidates = [e for e in self.endpoints if e not in exclude] or list(self.endpoints)
+            healthy = [e for e in candidates if e.healthy]
+            if not healthy:
+                # Everything is down: try the endpoint that comes back first
+                return min(candidates, key=lambda e: e.down_until)
+            least = min(e.outstanding for e in healthy)
+            return random.choice([e for e in healthy if e.outstanding == least])
+
+    def acquire(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.outstanding += 1
+            endpoint.requests += 1
+
+    def release(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.outstanding -= 1
+
+    def succeeded(self, endpoint: Endpoint) -> None:
+        with self._lock:
+            endpoint.failures = 0
+            endpoint.down_until = 0.0
+
+    def failed(self, endpoint: Endpoint, error: Exception) -> None:
+        with self._lock:
+            endpoint.errors += 1
+            if not is_retryable(error):
+                return
+            endpoint.failures += 1
+            if endpoint.failures >= self.max_failures:
+                endpoint.down_until = time.monotonic() + self.cooldown
+                logging.warning(f"Endpoint {endpoint.base_url} marked unhealthy: {error}")
+        self._start_health_checks()
+
+    def delay(self, attempt: int) -> float:
+        """Full-jitter exponential backoff."""
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def _start_health_checks(self) -> None:
+        if self.health_interval is None or self._health_thread is not None:
+            return
+        with self._lock:
+            if self._health_thread is None:
+                self._health_thread = threading.Thread(target=self._health_loop, daemon=True, name="endpoint-health")
+                self._health_thread.start()
+
+    def _health_loop(self) -> None:
+        while True:
+            time.sleep(self.health_interval)
+            self.check_health(only_unhealthy=True)
+
+    def probe_client(self, endpoint: Endpoint):
+        """
+        The client used for health checks. They run in a thread, so the sync pool reuses the
+        endpoint's client and the async pool builds one sync client per endpoint, once.
+        """
+        if endpoint.probe is None:
+            if self.client_class is OpenAI:
+                endpoint.probe = endpoint.client
+            else:
+                endpoint.probe = OpenAI(base_url=endpoint.base_url, api_key=endpoint.api_key, timeout=endpoint.timeout, max_retries=0)
+        return endpoint.probe
+
+    def check_health(self, only_unhealthy: bool = False) -> Dict[str, bool]:
+        """Lists the models of each endpoint; endpoints that answer are put back into rotation."""
+        results = {}
+        for endpoint in self.endpoints:
+            if only_unhealthy and endpoint.healthy:
+                continue
+            try:
+                self.probe_client(endpoint).models.list(timeout=min(endpoint.timeout, 5.0))
+                self.succeeded(endpoint)
+                results[endpoint.base_url] = True
+            except Exception as e:
+                with self._lock:
+                    endpoint.down_until = time.monotonic() + self.cooldown
+                logging.info(f"Health check of {endpoint.base_url} failed: {e}")
+                results[endpoint.base_url] = False
+        return results
+
+
+class PooledStream:
+    def __init__(self, pool: BaseEndpointPool, endpoint: Endpoint, response, iterator, first):
+        """
+        A completion stream whose first chunk was already read by the pool. The endpoint's
+        outstanding count is released when the stream is exhausted, fails or is closed.
+        """
+        self.pool = pool
+        self.endpoint = endpoint
+        self.response = response
+        self.iterator = iterator
+        self.first = first
+        self._released = False
+
+    def _release(self):
+        if not self._released:
+            self._released = True
+            self.pool.release(self.endpoint)
+
+    def __iter__(self):
+        try:
+            if self.first is not _END:
+                yield self.first
+                yield from self.iterator
+        finally:
+            self._release()
+
+    def close(self):
+        try:
+            close = getattr(self.response, "close", None)
+            if close:
+                close()
+        finally:
+            self._release()
+
+
+class EndpointPool(BaseEndpointPool):
+    def __init__(self, endpoints, **kwargs):
+        super().__init__(endpoints, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=max(4, 2 * len(self.endpoints)), thread_name_prefix="endpoint-pool")
+
+    def _open(self, endpoint: Endpoint, params: Dict[str, Any]):
+        """Sends the request and, for streams, waits for the first chunk."""
+        self.acquire(endpoint)
+        try:
+            response = endpoint.client.chat.completions.create(**params)
+            if not params.get("stream"):
+                self.release(endpoint)
+                self.succeeded(endpoint)
+                return response
+            iterator = iter(response)
+            first = next(iterator, _END)
+        except Exception as e:
+            self.release(endpoint)
+            self.failed(endpoint, e)
+            raise
+        self.succeeded(endpoint)
+        return PooledStream(self, endpoint, response, iterator, first)
+
+    def _discard(self, future):
+        """Closes the stream of a request that lost the hedge."""
+        try:
+            result = future.result()
+        except Exception:
+            return
+        close = getattr(result, "close", None)
+        if close:
+            close()
+
+    def _attempt(self, params: Dict[str, Any], tried: List[Endpoint]):
+        endpoint = self.pick(tried)
+        tried.append(endpoint)
+        if self.hedge_after is None or not params.get("stream") or len(self.endpoints) < 2:
+            return self._open(endpoint, params)
+
+        futures = [self._executor.submit(self._open, endpoint, params)]
+        done, _ = wait(futures, timeout=self.hedge_after)
+        if not done:
+            hedge = self.pick(tried)
+            tried.append(hedge)
+            with self._lock:
+                self.hedges += 1
+            futures.append(self._executor.submit(self._open, hedge, params))
+
+        pending = set(futures)
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    result = future.result()
+                except Exception as e:
+                    error = e
+                    continue
+                for other in futures:
+                    if other is not future:
+                        other.add_done_callback(self._discard)
+                return result
+        raise error
+
+    def create(self, **params):
+        """Same as `OpenAI().chat.completions.create`, routed over the endpoints."""
+        tried = []
+        for attempt in range(self.retries + 1):
+            try:
+                return self._attempt(params, tried)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retried += 1
+                logging.info(f"Completion request failed ({e}), retrying on another endpoint")
+                time.sleep(self.delay(attempt))
+                if len(tried) >= len(self.endpoints):
+                    tried.clear()
+
+
+class AsyncPooledStream(PooledStream):
+    async def __aiter__(self):
+        try:
+            if self.first is not _END:
+                yield self.first
+                async for chunk in self.iterator:
+                    yield chunk
+        finally:
+            self._release()
+
+    async def close(self):
+        try:
+            close = getattr(self.response, "close", None)
+            if close:
+                await close()
+        finally:
+            self._release()
+
+
+class AsyncEndpointPool(BaseEndpointPool):
+    """`EndpointPool` for `AsyncLLM`, backed by `AsyncOpenAI` clients."""
+    client_class = AsyncOpenAI
+
+    async def _open(self, endpoint: Endpoint, params: Dict[str, Any]):
+        self.acquire(endpoint)
+        try:
+            response = await endpoint.client.chat.completions.create(**params)
+            if not params.get("stream"):
+                self.release(endpoint)
+                self.succeeded(endpoint)
+                return response
+            iterator = response.__aiter__()
+            try:
+                first = await iterator.__anext__()
+            except StopAsyncIteration:
+                first = _END
+        except BaseException as e:
+            self.release(endpoint)
+            if isinstance(e, Exception):
+                self.failed(endpoint, e)
+            raise
+        self.succeeded(endpoint)
+        return AsyncPooledStream(self, endpoint, response, iterator, first)
+
+    async def _discard(self, task):
+        try:
+            result = await task
+        except BaseException:
+            return
+        close = getattr(result, "close", None)
+        if close:
+            await close()
+
+    async def _attempt(self, params: Dict[str, Any], tried: List[Endpoint]):
+        endpoint = self.pick(tried)
+        tried.append(endpoint)
+        if self.hedge_after is None or not params.get("stream") or len(self.endpoints) < 2:
+            return await self._open(endpoint, params)
+
+        tasks = [asyncio.ensure_future(self._open(endpoint, params))]
+        try:
+            done, _ = await asyncio.wait(tasks, timeout=self.hedge_after)
+            if not done:
+                hedge = self.pick(tried)
+                tried.append(hedge)
+                with self._lock:
+                    self.hedges += 1
+                tasks.append(asyncio.ensure_future(self._open(hedge, params)))
+
+            pending = set(tasks)
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is not None:
+                        error = task.exception()
+                        continue
+                    for other in tasks:
+                        if other is not task:
+                            asyncio.ensure_future(self._discard(other))
+                    return task.result()
+        except BaseException:
+            # The caller was cancelled: stop the requests still opening and close the streams
+            # already opened, so their endpoints' outstanding counts are released
+            for task in tasks:
+                if task.done():
+                    asyncio.ensure_future(self._discard(task))
+                else:
+                    task.cancel()
+            raise
+        raise error
+
+    async def create(self, **params):
+        tried = []
+        for attempt in range(self.retries + 1):
+            try:
+                return await self._attempt(params, tried)
+            except Exception as e:
+                if attempt == self.retries or not is_retryable(e):
+                    raise
+                with self._lock:
+                    self.retried += 1
+                logging.info(f"Completion request failed ({e}), retrying on another endpoint")
+                await asyncio.sleep(self.delay(attempt))
+                if len(tried) >= len(self.endpoints):
+                    tried.clear()
@@ -1,10 +1,56 @@
 import json
 from datetime import datetime
+from string import Formatter
 
 def get_current_date() -> str:
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-ACTION_SCHEMA = {
+
+class PromptTemplate:
+    def __init__(self, text: str):
+        """
+        A prompt compiled once into literal and placeholder segments, so rendering is a join.
+
+        Placeholders without a value are kept verbatim, which keeps prompts with
+        unescaped literal braces (e.g. JSON examples) working.
+
+        Args:
+            text (str): Template text in `str.format` syntax, e.g. "Today: {date}".
+        """
+        self.text = text
+        self.segments = []
+        try:
+            for literal, field, spec, conversion in Formatter().parse(text):
+                if literal:
+                    self.segments.append((literal, None))
+                if field is not None:
+                    raw = "{" + field + (f"!{conversion}" if conversion else "") + (f":{spec}" if spec else "") + "}"
+                    self.segments.append((raw, field))
+        except ValueError:
+            # Not a valid template, use the text as is
+            self.segments = [(text, None)]
+        self.fields = {field for _, field in self.segments if field}
+
+    def render(self, **values) -> str:
+        return "".join(
+            str(values[field]) if field in values else text
+            for text, field in self.segments
+        )
+
+    def partial(self, **values) -> "PromptTemplate":
+        """Returns a template with some placeholders filled in, e.g. the tool list."""
+        template = PromptTemplate.__new__(PromptTemplate)
+        template.text = self.text
+        template.segments = []
+        for text, field in self.segments:
+            if field in values:
+                template.segments.append((str(values[field]), None))
+            else:
+                template.segments.append((text, field))
+        template.fields = {field for _, field in template.segments if field}
+        return template
+
+TOOL_CALL_SCHEMA = {
     "type": "object",
     "properties": {
         "action": {"type": "string"},
@@ -13,6 +59,21 @@ ACTION_SCHEMA = {
     "required": ["action", "parameters"]
 }
 
+# A single tool call, or several independent tool calls that are run concurrently
+ACTION_SCHEMA = {
+    "anyOf": [
+        TOOL_CALL_SCHEMA,
+        {
+            "type": "object",
+            "properties": {
+                "actions": {"type": "array", "items": TOOL_CALL_SCHEMA, "minItems": 1}
+            },
+            "required": ["actions"]
+        },
+        {"type": "array", "items": TOOL_CALL_SCHEMA, "minItems": 1}
+    ]
+}
+
 REFLECTION_SCHEMA = {
     "type": "object",
     "properties": {
@@ -80,6 +141,15 @@ REQUIREMENTS_SCHEMA = {
   }
 }
 
+# Stable system preamble shared by all steps in the "prefix" prompt layout. The step-specific
+# instructions are appended after the conversation, so the KV cache of the prefix can be reused.
+SHARED_PREAMBLE = (
+    "You are an AI agent that solves the user's task in a loop of steps: think, action, observation and reflection. "
+    "Tools with up-to-date knowledge are executed in the action step and their results appear as tool messages. "
+    "Do not rely on your own knowledge for real-time data.\n"
+    "The instructions for the current step are given in the last message. Follow only those instructions."
+)
+
 STEP_CONFIG = {
     "think": {
         "prompt": (
@@ -91,26 +161,34 @@ STEP_CONFIG = {
             "5. Consider potential issues or challenges that could arise during implementation (e.g., performance issues, errors, limitations of the tools).\n"
             "6. Outline a testing strategy to ensure that the solution works as expected, including edge cases or unexpected inputs.\n"
             "7. Suggest an overall structure or approach to organizing the code for maintainability and clarity. But do not generate code at this stage."
-            f"Do not rely on your own knowledge for real-time data. Once you have finished, tools with up-to-date knowledge are selected. Today: {get_current_date()}.\n"
+            "Do not rely on your own knowledge for real-time data. Once you have finished, tools with up-to-date knowledge are selected. Today: {date}.\n"
             "Keep your reasoning concise, short, logical, and focused on actionable steps. Respond with bullet points or short sentences.\n"
         ),
         "schema": None,
     },
     "action": {
         "prompt": (
-            f"You are an action-taking agent. Today: {get_current_date()}. Based on previous reasoning, choose an action to perform. "
+            "You are an action-taking agent. Today: {date}. Based on previous reasoning, choose an action to perform. "
             "You do not have up-to-date information.\n"
             "You have access to the following tools:\n"
             "{tools}\n"
             "Respond with a JSON object containing the action type and parameters.\n"
             "Example Output: \n"
-            '{{"action": "tool_name", "parameters": {{"param1": "value1", "param2": "value2"}}}}' 
+            '{{"action": "tool_name", "parameters": {{"param1": "value1", "param2": "value2"}}}}\n'
+            "If several independent tool calls are needed (e.g. multiple searches), request them together:\n"
+            '{{"actions": [{{"action": "tool_name", "parameters": {{...}}}}, {{"action": "other_tool", "parameters": {{...}}}}]}}'
         ),
         "schema": ACTION_SCHEMA,
+        # Used with native tool calling: tools are sent through the API instead of the prompt
+        "native_prompt": (
+            "You are an action-taking agent. Today: {date}. Based on previous reasoning, choose an action to perform. "
+            "You do not have up-to-date information.\n"
+            "Call one of the provided tools. If several independent tool calls are needed (e.g. multiple searches), call them together."
+        ),
     },
     "observation": {
         "prompt": (
-            f"Today: {get_current_date()}. You are tasked to review the results of the action taken and summarize them.\n"
+            "Today: {date}. You are tasked to review the results of the action taken and summarize them.\n"
             "Do not rely on your own knowledge for real-time data.\n"
             "If the action failed, analyze why and suggest a fix.\n"
             "Do not take any further actions—just observe and summarize.\n"
@@ -124,15 +202,84 @@ STEP_CONFIG = {
             "Review the entire process so far and decide whether the task is complete.\n"
             "Your decision must be based solely on the observations and reasoning provided.\n"
             "Do not make assumptions or introduce new information.\n"
-            "If the task is complete, respond with a JSON object: {\"done\": true, \"reason\": \"final_result\"}.\n"
-            "If the task is not complete, respond with a JSON object: {\"done\": false, \"reason\": \"reason_for_continuation\"}.\n"
+            "If the task is complete, respond with a JSON object: {{\"done\": true, \"reason\": \"final_result\"}}.\n"
+            "If the task is not complete, respond with a JSON object: {{\"done\": false, \"reason\": \"reason_for_continuation\"}}.\n"
             "Provide a clear and concise explanation of your decision.\n"
-            f"Do not rely on your own knowledge for real-time data. Today: {get_current_date()}."
+            "Do not rely on your own knowledge for real-time data. Today: {date}."
         ),
         "schema": REFLECTION_SCHEMA,
     },
 }
 
+# Fused mode: one call for reasoning plus action, one call for observation plus the done/continue decision.
+# "type" maps a step onto the action or reflection handling of the ReAct loop.
+FUSED_ACTION_SCHEMA = {
+    "allOf": [
+        {
+            "type": "object",
+            "properties": {"thought": {"type": "string"}},
+            "required": ["thought"]
+        },
+        {
+            "anyOf": [
+                TOOL_CALL_SCHEMA,
+                {
+                    "type": "object",
+                    "properties": {
+                        "actions": {"type": "array", "items": TOOL_CALL_SCHEMA, "minItems": 1}
+                    },
+                    "required": ["actions"]
+                }
+            ]
+        }
+    ]
+}
+
+OBSERVE_REFLECT_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "observation": {"type": "string"},
+        "done": {"type": "boolean"},
+        "reason": {"type": "string"}
+    },
+    "required": ["observation", "done", "reason"]
+}
+
+FUSED_STEP_CONFIG = {
+    "reason_act": {
+        "type": "action",
+        "prompt": (
+            "You are a reasoning and action-taking agent. Today: {date}.\n"
+            "First think briefly about the objective, what is missing and which tool gets it. Then choose an action to perform. "
+            "Do not rely on your own knowledge for real-time data.\n"
+            "You have access to the following tools:\n"
+            "{tools}\n"
+            "Respond with a single JSON object containing your short reasoning, the action type and parameters.\n"
+            "Example Output: \n"
+            '{{"thought": "short reasoning", "action": "tool_name", "parameters": {{"param1": "value1"}}}}\n'
+            "If several independent tool calls are needed, request them together:\n"
+            '{{"thought": "short reasoning", "actions": [{{"action": "tool_name", "parameters": {{...}}}}, {{"action": "other_tool", "parameters": {{...}}}}]}}'
+        ),
+        "schema": FUSED_ACTION_SCHEMA,
+        "native_prompt": (
+            "You are a reasoning and action-taking agent. Today: {date}.\n"
+            "Think briefly about the objective and what is missing, then call the provided tools. "
+            "Do not rely on your own knowledge for real-time data."
+        ),
+    },
+    "observe_reflect": {
+        "type": "reflection",
+        "prompt": (
+            "Today: {date}. You are an observation and reflection agent.\n"
+            "Summarize the results of the action taken. If the action failed, analyze why and suggest a fix.\n"
+            "Then decide whether the task is complete, based solely on the observations and reasoning provided.\n"
+            "Do not rely on your own knowledge for real-time data. Do not introduce new information.\n"
+            "Respond with a JSON object: {{\"observation\": \"short summary\", \"done\": true or false, \"reason\": \"final_result or reason_for_continuation\"}}."
+        ),
+        "schema": OBSERVE_REFLECT_SCHEMA,
+    },
+}
+
 SYSTEM_PROMPTS = {
     "think": (
         "You are an AI designed to reason systematically and logically as team of a agent team.\nFor each query:\n"
@@ -0,0 +1,166 @@
+import inspect
+import json
+from typing import Any, Callable, Dict, List, Optional
+from jsonschema import Draft7Validator
+from repl.types import Result
+from repl.util import function_to_json, function_to_string
+
+# JSON schema types used to validate parameters. Unknown annotations are not constrained.
+VALIDATION_TYPES = {
+    str: "string",
+    int: "integer",
+    float: "number",
+    bool: "boolean",
+    list: "array",
+    dict: "object",
+}
+
+
+class Tool:
+    def __init__(self, func: Callable):
+        """
+        A tool function introspected once: its prompt description, its JSON schema
+        for native tool calling and a precompiled validator for its parameters.
+
+        Args:
+            func (Callable): The tool function.
+        """
+        self.func = func
+        self.name = func.__name__
+        self.is_coroutine = inspect.iscoroutinefunction(func)
+        self.description = function_to_string(func)
+        self.schema = function_to_json(func)
+        self.validator = Draft7Validator(self.parameters_schema(func))
+
+    @staticmethod
+    def parameters_schema(func: Callable) -> Dict[str, Any]:
+        """
+        Builds the JSON schema used to validate the parameters of a call.
+        """
+        signature = inspect.signature(func)
+        properties = {}
+        required = []
+        accepts_kwargs = False
+
+        for param in signature.parameters.values():
+            if param.kind == inspect.Parameter.VAR_KEYWORD:
+                accepts_kwargs = True
+                continue
+            if param.kind == inspect.Parameter.VAR_POSITIONAL:
+                continue
+
+            prop = {}
+            param_type = VALIDATION_TYPES.get(param.annotation)
+            if param_type:
+                prop["type"] = [param_type, "null"] if param.default is None else param_type
+            properties[param.name] = prop
+
+            if param.default is inspect.Parameter.empty:
+                required.append(param.name)
+
+        schema = {"type": "object", "properties": properties, "required": required}
+        if not accepts_kwargs:
+            schema["additionalProperties"] = False
+        return schema
+
+    def validate(self, parameters: Any) -> List[Dict[str, str]]:
+        """
+        Validates call parameters.
+
+        Returns:
+            List[Dict[str, str]]: One {"parameter", "message"} entry per violation, empty if valid.
+        """
+        return [
+            {"parameter": ".".join(str(p) for p in error.path) or "parameters", "message": error.message}
+            for error in self.validator.iter_errors(parameters)
+        ]
+
+
+class ToolRegistry:
+    def __init__(self, tools: Optional[List[Callable]] = None):
+        """
+        Registry of the tools available to an agent. Tools are introspected once on registration.
+
+        Args:
+            tools (Optional[List[Callable]]): Tool functions to register.
+        """
+        self.tools: Dict[str, Tool] = {}
+        self._descriptions = None
+        self._schemas = None
+        for func in tools or []:
+            self.register(func)
+
+    def register(self, func: Callable) -> Tool:
+        tool = Tool(func)
+        self.tools[tool.name] = tool
+        self._descriptions = None
+        self._schemas = None
+        return tool
+
+    def matches(self, tools: List[Callable]) -> bool:
+        """Checks whether the registry holds exactly these tool functions."""
+        return len(tools) == len(self.tools) and all(
+            self.tools.get(f.__name__) is not None and self.tools[f.__name__].func is f for f in tools
+        )
+
+    @property
+    def function_map(self) -> Dict[str, Callable]:
+        return {name: tool.func for name, tool in self.tools.items()}
+
+    def descriptions(self) -> List[str]:
+        """Text descriptions of all tools, as inserted into the `{tools}` prompt placeholder."""
+        if self._descriptions is None:
+            self._descriptions = [tool.description for tool in self.tools.values()]
+        return self._descriptions
+
+    def schemas(self) -> List[Dict[str, Any]]:
+        """JSON schemas of all tools for native tool calling."""
+        if self._schemas is None:
+            self._schemas = [tool.schema for tool in self.tools.values()]
+        return self._schemas
+
+    def resolve(self, action: Any):
+        """
+        Looks up and validates a tool call.
+
+        Returns:
+            Tuple[Optional[Tool], Optional[Result]]: The tool, or a structured error Result.
+        """
+        if not isinstance(action, dict):
+            return None, self.error("invalid_action", None, [{"parameter": "action", "message": "Action must be a JSON object."}])
+
+        if "error" in action:
+            details = action.get("details") or action.get("raw_content") or ""
+            return None, self.error("invalid_response", None, [{"parameter": "response", "message": f"{action['error']}. {details}".strip()}])
+
+        name = action.get("action")
+        tool = self.tools.get(name)
+        if tool is None:
+            return None, self.error("unknown_action", name, [{"parameter": "action", "message": f"Unknown action {name}. Available: {', '.join(self.tools)}"}])
+
+        parameters = action.get("parameters", {})
+        errors = tool.validate(parameters)
+        if errors:
+            return None, self.error("invalid_parameters", name, errors)
+
+        return tool, None
+
+    def dispatch(self, action: Any):
+        """
+        Validates a tool call and runs it.
+
+        Returns:
+            The raw tool result, or an error Result with `repeat` set so the action step is retried.
+        """
+        tool, error = self.resolve(action)
+        if error:
+            return error
+        return tool.func(**action.get("parameters", {}))
+
+    @staticmethod
+    def error(kind: str, action: Optional[str], details: List[Dict[str, str]]) -> Result:
+        return Result(
+            value=json.dumps({"error": kind, "action": action, "details": details}),
+            error=True,
+            repeat=True,
+        )
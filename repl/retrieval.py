@@ -0,0 +1,208 @@
+import hashlib
+import math
+import re
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional
+
+# Chunks are built from whole lines (paragraphs) up to this size
+CHUNK_CHARS = 1000
+# Default budget of the chunks returned by a search, in estimated tokens
+TOKEN_BUDGET = 1200
+MAX_DOCUMENTS = 50  # per session; the least recently added documents are dropped
+MAX_SESSIONS = 128
+
+STOPWORDS = frozenset(
+    "a an and are as at be but by can did do does for from had has have how i if in into is it its me my no not of "
+    "on or our so than that the their them then there these they this to was we were what when where which who why "
+    "will with would you your about after also any been before being both could each more most other over same some "
+    "such only own under until very".split()
+)
+
+_WORD = re.compile(r"\w+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased words without stopwords and single characters."""
+    return [word for word in _WORD.findall(text.lower()) if len(word) > 1 and word not in STOPWORDS]
+
+
+def estimate_tokens(text: str) -> int:
+    """About four characters per token, like `TokenCounter` without a tokenizer."""
+    return (len(text) + 3) // 4
+
+
+def chunk_text(text: str, max_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    Splits text into chunks of whole lines of at most `max_chars` characters.
+    Longer lines are split at sentence ends, or at spaces if a sentence is still too long.
+    """
+    pieces = []
+    for line in text.split("\n"):
+        line = line.strip()
+        while len(line) > max_chars:
+            cut = line.rfind(". ", 0, max_chars) + 1
+            if cut < max_chars // 2:
+                cut = line.rfind(" ", 0, max_chars)
+            if cut <= 0:
+                cut = max_chars
+            pieces.append(line[:cut].strip())
+            line = line[cut:].strip()
+        if line:
+            pieces.append(line)
+
+    chunks, current, length = [], [], 0
+    for piece in pieces:
+        if current and length + len(piece) + 1 > max_chars:
+            chunks.append("\n".join(current))
+            current, length = [], 0
+        current.append(piece)
+        length += len(piece) + 1
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+class DocumentIndex:
+    def __init__(self, k1: float = 1.5, b: float = 0.75, chunk_chars: int = CHUNK_CHARS, max_documents: int = MAX_DOCUMENTS):
+        """
+        In-memory BM25 index over the chunks of fetched documents.
+
+        Args:
+            k1 (float): BM25 term frequency saturation.
+            b (float): BM25 length normalization.
+            chunk_chars (int): Maximum chunk size in characters.
+            max_documents (int): Documents kept; adding more drops the oldest.
+        """
+        self.k1 = k1
+        self.b = b
+        self.chunk_chars = chunk_chars
+        self.max_documents = max_documents
+        self.documents: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.chunks: Dict[int, Dict[str, Any]] = {}
+        self.postings: Dict[str, Dict[int, int]] = {}
+        self.total_length = 0
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def add(self, source: str, text: str) -> int:
+        """
+        Adds (or replaces) a document.
+
+        Returns:
+            int: The number of chunks of the document.
+        """
+        # Only a digest of the text is kept, to recognize a document that did not change
+        digest = hashlib.blake2b(text.encode("utf-8", errors="replace"), digest_size=16).digest()
+        with self._lock:
+            document = self.documents.get(source)
+            if document is not None and document["digest"] == digest:
+                self.documents.move_to_end(source)
+                return len(document["chunks"])
+            if document is not None:
+                self._remove(source)
+            while len(self.documents) >= self.max_documents:
+                self._remove(next(iter(self.documents)))
+
+            ids = []
+            for position, chunk in enumerate(chunk_text(text, self.chunk_chars)):
+                terms = Counter(tokenize(chunk))
+                chunk_id = self._next_id
+                self._next_id += 1
+                self.chunks[chunk_id] = {"source": source, "index": position, "text": chunk, "terms": terms, "length": sum(terms.values())}
+                self.total_length += self.chunks[chunk_id]["length"]
+                for term, count in terms.items():
+                    self.postings.setdefault(term, {})[chunk_id] = count
+                ids.append(chunk_id)
+            self.documents[source] = {"digest": digest, "chunks": ids}
+            return len(ids)
+
+    def _remove(self, source: str) -> None:
+        for chunk_id in self.documents.pop(source)["chunks"]:
+            chunk = self.chunks.pop(chunk_id)
+            self.total_length -= chunk["length"]
+            for term in chunk["terms"]:
+                postings = self.postings[term]
+                del postings[chunk_id]
+                if not postings:
+                    del self.postings[term]
+
+    def __contains__(self, source: str) -> bool:
+        return source in self.documents
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def chunk_count(self, source: str) -> int:
+        document = self.documents.get(source)
+        return len(document["chunks"]) if document else 0
+
+    def search(self, query: str, max_tokens: int = TOKEN_BUDGET, source: Optional[str] = None) -> List[Dict[str, Any]]:
+        """
+        Returns the chunks that best match `query`, as many as fit into `max_tokens`.
+
+        Args:
+            query (str): The search query or question.
+            max_tokens (int): Token budget of the returned chunks.
+            source (Optional[str]): Only search the chunks of this document.
+
+        Returns:
+            List[Dict[str, Any]]: Chunks by descending score, each with "source", "index", "text" and "score".
+        """
+        with self._lock:
+            if not self.chunks:
+                return []
+            count = len(self.chunks)
+            average_length = self.total_length / count or 1.0
+            scores = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, frequency in postings.items():
+                    chunk = self.chunks[chunk_id]
+                    if source is not None and chunk["source"] != source:
+                        continue
+                    norm = self.k1 * (1 - self.b + self.b * chunk["length"] / average_length)
+                    scores[chunk_id] = scores.get(chunk_id, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+
+            results, used = [], 0
+            for chunk_id, score in sorted(scores.items(), key=lambda item: item[1], reverse=True):
+                chunk = self.chunks[chunk_id]
+                tokens = estimate_tokens(chunk["text"])
+                if used + tokens > max_tokens:
+                    if results:
+                        continue  # a smaller, lower ranked chunk may still fit
+                    text = chunk["text"][:max_tokens * 4]
+                    tokens = max_tokens
+                else:
+                    text = chunk["text"]
+                results.append({"source": chunk["source"], "index": chunk["index"], "text": text, "score": round(score, 3)})
+                used += tokens
+                if used >= max_tokens:
+                    break
+            return results
+
+
+_lock = threading.Lock()
+_indexes: "OrderedDict[str, DocumentIndex]" = OrderedDict()
+
+
+def get_index(session: Optional[str] = None) -> DocumentIndex:
+    """Returns the document index of a session; the least recently used sessions are dropped."""
+    key = "default" if session is None else str(session)
+    with _lock:
+        index = _indexes.get(key)
+        if index is None:
+            index = _indexes[key] = DocumentIndex()
+            while len(_indexes) > MAX_SESSIONS:
+                _indexes.popitem(last=False)
+        else:
+            _indexes.move_to_end(key)
+        return index
+
+
+def drop_index(session: Optional[str] = None) -> None:
+    with _lock:
+        _indexes.pop("default" if session is None else str(session), None)
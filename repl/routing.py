@@ -0,0 +1,45 @@
+import logging
+import threading
+from typing import Any, Dict, List
+
+
+class ModelRouter:
+    def __init__(self, escalate_on_failure: bool = True, escalation_llm=None):
+        """
+        Chooses the LLM for each step of the ReAct loop.
+
+        A step uses the `llm` of its step config, or the agent's default LLM. If the
+        response of a smaller step model fails schema validation, the step is re-run
+        once on the escalation model (the agent's default LLM unless given).
+
+        Args:
+            escalate_on_failure (bool): Re-run a step on the escalation model when its output is invalid.
+            escalation_llm (Optional[LLM]): The model to escalate to. Defaults to the agent's LLM.
+        """
+        self.escalate_on_failure = escalate_on_failure
+        self.escalation_llm = escalation_llm
+        # Shared by the concurrent runs of a server or batch worker
+        self.escalations = {}
+        self._lock = threading.Lock()
+
+    def route(self, step: str, step_llm, default_llm) -> List[Any]:
+        """
+        Returns the LLMs to try for a step, in order.
+        """
+        llm = step_llm or default_llm
+        target = self.escalation_llm or default_llm
+        if self.escalate_on_failure and target is not llm:
+            return [llm, target]
+        return [llm]
+
+    def should_escalate(self, step: str, response: Any) -> bool:
+        """
+        Checks whether a step response is invalid, i.e. failed JSON parsing or schema validation.
+        """
+        responses = response if isinstance(response, list) else [response]
+        invalid = any(isinstance(r, dict) and "error" in r for r in responses)
+        if invalid:
+            with self._lock:
+                self.escalations[step] = self.escalations.get(step, 0) + 1
+            logging.info(f"Escalating step '{step}' after invalid response: {responses}")
+        return invalid
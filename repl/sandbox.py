@@ -0,0 +1,401 @@
+import ast
+import atexit
+import contextlib
+import hashlib
+import io
+import json
+import multiprocessing
+import os
+import queue
+import re
+import select
+import shutil
+import signal
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from typing import Any, Dict, Optional, Sequence
+
+try:
+    import resource
+except ImportError:  # Windows: no CPU or memory limits, only the wall-clock timeout
+    resource = None
+
+CAN_FORK = hasattr(os, "fork")
+
+_lock = threading.Lock()
+_sandbox = None
+_config = {
+    "workers": 2,
+    "timeout": 10.0,
+    "cpu_seconds": 10,
+    "memory_mb": 1024,
+    "max_output": 10000,
+    "root": None,
+}
+
+
+def _compile(code: str, mode: str):
+    """
+    Compiles a snippet. In "exec" mode a trailing expression is evaluated separately,
+    so its value is returned like in an interactive session.
+    """
+    if mode == "eval":
+        return None, compile(code, "<sandbox>", "eval")
+    tree = ast.parse(code, "<sandbox>", "exec")
+    if tree.body and isinstance(tree.body[-1], ast.Expr):
+        last = ast.Expression(tree.body.pop().value)
+        return compile(tree, "<sandbox>", "exec"), compile(last, "<sandbox>", "eval")
+    return compile(tree, "<sandbox>", "exec"), None
+
+
+def _truncate(text: str, limit: int, truncated: bool = False) -> str:
+    if truncated or len(text) > limit:
+        return text[:limit] + "\n...[output truncated]"
+    return text
+
+
+def _execute(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Runs a job in the current process and returns its value or error."""
+    try:
+        body, last = _compile(job["code"], job["mode"])
+        namespace = {"__name__": "__main__"}
+        if body is not None:
+            exec(body, namespace)
+        value = eval(last, namespace) if last is not None else None
+        # The value is capped like the output, so a huge result is not sent back over the pipe
+        return {"value": None if value is None else _truncate(repr(value), job["max_output"]), "error": None}
+    except BaseException as e:
+        # Only the frames of the snippet itself, not those of the sandbox
+        frames = [frame for frame in traceback.extract_tb(e.__traceback__) if frame.filename == "<sandbox>"]
+        lines = ["Traceback (most recent call last):\n"] + traceback.format_list(frames) if frames else []
+        return {"value": None, "error": "".join(lines + traceback.format_exception_only(type(e), e)).rstrip()}
+
+
+def _read_capped(path: str, limit: int) -> str:
+    try:
+        with open(path, "rb") as f:
+            data = f.read(limit + 1)
+    except OSError:
+        return ""
+    return _truncate(data[:limit].decode("utf-8", errors="replace"), limit, len(data) > limit)
+
+
+def _run_forked(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Forks the warm worker for one job. The child gets the resource limits, runs in the
+    scratch directory with stdout and stderr redirected to files, and is killed with its
+    process group when the wall-clock timeout expires.
+    """
+    workdir = job["workdir"]
+    # Own capture files per job: several jobs of one session can run at the same time
+    stdout_fd, stdout_path = tempfile.mkstemp(prefix=".stdout_", dir=workdir)
+    stderr_fd, stderr_path = tempfile.mkstemp(prefix=".stderr_", dir=workdir)
+    read_fd, write_fd = os.pipe()
+    start = time.perf_counter()
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.close(read_fd)
+            os.setpgid(0, 0)
+            if resource is not None:
+                if job["cpu_seconds"]:
+                    resource.setrlimit(resource.RLIMIT_CPU, (job["cpu_seconds"], job["cpu_seconds"] + 1))
+                if job["memory_mb"]:
+                    limit = job["memory_mb"] * 1024 * 1024
+                    resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+            os.chdir(workdir)
+            os.dup2(stdout_fd, 1)
+            os.dup2(stderr_fd, 2)
+            result = _execute(job)
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os.write(write_fd, json.dumps(result).encode("utf-8"))
+        finally:
+            os._exit(0)
+
+    os.close(write_fd)
+    os.close(stdout_fd)
+    os.close(stderr_fd)
+    data = b""
+    timed_out = False
+    deadline = start + job["timeout"]
+    while True:
+        remaining = deadline - time.perf_counter()
+        if remaining <= 0:
+            timed_out = True
+            break
+        readable, _, _ = select.select([read_fd], [], [], remaining)
+        if readable:
+            chunk = os.read(read_fd, 65536)
+            if not chunk:
+                break
+            data += chunk
+    os.close(read_fd)
+    if timed_out:
+        with contextlib.suppress(ProcessLookupError):
+            os.killpg(pid, signal.SIGKILL)
+    _, status = os.waitpid(pid, 0)
+
+    try:
+        result = json.loads(data) if data else {"value": None, "error": None}
+    except json.JSONDecodeError:
+        result = {"value": None, "error": None}
+    if timed_out:
+        result["error"] = f"Timed out after {job['timeout']}s"
+    elif os.WIFSIGNALED(status) and not result["error"]:
+        sig = os.WTERMSIG(status)
+        reason = "CPU time limit exceeded" if sig == getattr(signal, "SIGXCPU", None) else f"Killed by signal {sig}"
+        result["error"] = reason
+    elif not data and not result["error"]:
+        result["error"] = "The process exited without a result"
+    result["stdout"] = _read_capped(stdout_path, job["max_output"])
+    result["stderr"] = _read_capped(stderr_path, job["max_output"])
+    for path in (stdout_path, stderr_path):
+        with contextlib.suppress(OSError):
+            os.remove(path)
+    result["timed_out"] = timed_out
+    result["seconds"] = time.perf_counter() - start
+    return result
+
+
+def _run_inline(job: Dict[str, Any]) -> Dict[str, Any]:
+    """Fallback without fork: runs the job in the worker itself; the parent enforces the timeout."""
+    start = time.perf_counter()
+    stdout, stderr = io.StringIO(), io.StringIO()
+    cwd = os.getcwd()
+    try:
+        os.chdir(job["workdir"])
+        with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+            result = _execute(job)
+    finally:
+        os.chdir(cwd)
+    limit = job["max_output"]
+    result.update(stdout=_truncate(stdout.getvalue(), limit), stderr=_truncate(stderr.getvalue(), limit), timed_out=False, seconds=time.perf_counter() - start)
+    return result
+
+
+def _worker_main(conn, preload: Sequence[str]) -> None:
+    """Warm worker: imports the preloaded modules once, then runs jobs until told to stop."""
+    for module in preload:
+        with contextlib.suppress(ImportError):
+            __import__(module)
+    conn.send("ready")
+    while True:
+        try:
+            job = conn.recv()
+        except EOFError:
+            return
+        if job is None:
+            return
+        conn.send(_run_forked(job) if CAN_FORK else _run_inline(job))
+
+
+class Worker:
+    def __init__(self, context, preload: Sequence[str]):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn, tuple(preload)), daemon=True, name="react-sandbox")
+        self.process.start()
+        child_conn.close()
+        self.ready = False
+
+    def wait_ready(self, timeout: float) -> bool:
+        if not self.ready and self.conn.poll(timeout):
+            self.ready = self.conn.recv() == "ready"
+        return self.ready
+
+    def kill(self) -> None:
+        with contextlib.suppress(Exception):
+            self.process.kill()
+            self.process.join(1)
+        self.conn.close()
+
+
+class Sandbox:
+    def __init__(
+        self,
+        workers: int = 2,
+        timeout: float = 10.0,
+        cpu_seconds: Optional[int] = 10,
+        memory_mb: Optional[int] = 1024,
+        max_output: int = 10000,
+        root: Optional[str] = None,
+        preload: Sequence[str] = ("math", "json", "re", "statistics", "decimal", "fractions", "datetime"),
+    ):
+        """
+        Runs untrusted Python snippets in a pool of pre-warmed worker processes.
+
+        Workers are started on the first `run` or `warm` call and import `preload`, so a
+        sandbox that is only used for its scratch directories starts no processes. On POSIX each job forks its worker
+        (about a millisecond instead of an interpreter start), so jobs never share state,
+        and the child gets CPU time and address-space limits. A job that exceeds its
+        wall-clock timeout is killed; a worker that stops responding is replaced. Either
+        way the caller gets an error result after at most the timeout.
+
+        Each session gets its own scratch directory as working directory.
+
+        Args:
+            workers (int): Number of warm workers, i.e. jobs that run concurrently.
+            timeout (float): Default wall-clock limit per job in seconds.
+            cpu_seconds (Optional[int]): CPU time limit per job (POSIX only).
+            memory_mb (Optional[int]): Address-space limit per job in MB (POSIX only).
+            max_output (int): Maximum characters of stdout and stderr returned.
+            root (Optional[str]): Directory for the session scratch directories. Defaults to a temporary directory.
+            preload (Sequence[str]): Modules imported by the workers before the first job.
+        """
+        self.workers = workers
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.max_output = max_output
+        self.preload = tuple(preload)
+        self._owns_root = root is None
+        self.root = root or tempfile.mkdtemp(prefix="react-sandbox-")
+        os.makedirs(self.root, exist_ok=True)
+        # Spawned workers are single-threaded, so forking them is safe even when the agent runs threads
+        self._context = multiprocessing.get_context("spawn")
+        self._idle = queue.Queue()
+        self._started = False
+        self._closed = False
+        self._start_lock = threading.Lock()
+
+    def _start(self) -> None:
+        if self._started:
+            return
+        with self._start_lock:
+            if not self._started and not self._closed:
+                for _ in range(self.workers):
+                    self._idle.put(Worker(self._context, self.preload))
+                self._started = True
+
+    def scratch_path(self, session: Optional[str] = None) -> str:
+        """The path of a session's working directory, without creating it."""
+        name = "default" if session is None else str(session)
+        safe = re.sub(r"[^A-Za-z0-9_.-]", "_", name)[:40]
+        return os.path.join(self.root, f"{safe}-{hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]}")
+
+    def scratch_dir(self, session: Optional[str] = None) -> str:
+        """The working directory of a session, created on first use."""
+        path = self.scratch_path(session)
+        os.makedirs(path, exist_ok=True)
+        return path
+
+    def remove_scratch_dir(self, session: Optional[str] = None) -> None:
+        shutil.rmtree(self.scratch_path(session), ignore_errors=True)
+
+    def warm(self, timeout: float = 30.0) -> None:
+        """Starts the workers and waits until the idle ones have imported their modules."""
+        self._start()
+        workers = []
+        while True:
+            try:
+                workers.append(self._idle.get_nowait())
+            except queue.Empty:
+                break
+        for worker in workers:
+            worker.wait_ready(timeout)
+            self._idle.put(worker)
+
+    def run(self, code: str, mode: str = "exec", session: Optional[str] = None, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Runs a snippet. Waiting for a free worker counts towards the timeout.
+
+        Args:
+            code (str): Python source. In "exec" mode the value of a trailing expression is returned.
+            mode (str): "exec" for statements, "eval" for a single expression.
+            session (Optional[str]): Session whose scratch directory is the working directory.
+            timeout (Optional[float]): Wall-clock limit in seconds. Defaults to the sandbox timeout.
+
+        Returns:
+            Dict[str, Any]: "value" (repr of the result or None), "error" (traceback or limit
+            message, or None), "stdout", "stderr", "timed_out" and "seconds".
+        """
+        if self._closed:
+            raise RuntimeError("Sandbox is closed")
+        timeout = self.timeout if timeout is None else timeout
+        job = {
+            "code": code, "mode": mode, "workdir": self.scratch_dir(session),
+            "cpu_seconds": self.cpu_seconds, "memory_mb": self.memory_mb, "max_output": self.max_output,
+        }
+        start = time.perf_counter()
+        self._start()
+        try:
+            worker = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            return self._failed(f"Timed out after {timeout}s waiting for a free sandbox worker", True, start)
+        job["timeout"] = remaining = max(0.0, timeout - (time.perf_counter() - start))
+        timed_out = False
+        try:
+            if not worker.wait_ready(30.0):
+                raise RuntimeError("Sandbox worker did not start")
+            worker.conn.send(job)
+            # The worker enforces the timeout itself; the grace period covers forking and reporting
+            if worker.conn.poll(remaining + 2.0):
+                result = worker.conn.recv()
+                self._idle.put(worker)
+                return result
+            timed_out = True
+            error = f"Timed out after {timeout}s"
+        except Exception as e:
+            error = f"Sandbox worker failed: {e}"
+        # Replace a worker that crashed or stopped responding
+        worker.kill()
+        self._idle.put(Worker(self._context, self.preload))
+        return self._failed(error, timed_out, start)
+
+    @staticmethod
+    def _failed(error: str, timed_out: bool, start: float) -> Dict[str, Any]:
+        return {"value": None, "error": error, "stdout": "", "stderr": "", "timed_out": timed_out, "seconds": time.perf_counter() - start}
+
+    def close(self) -> None:
+        self._closed = True
+        while True:
+            try:
+                worker = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            with contextlib.suppress(Exception):
+                worker.conn.send(None)
+            worker.kill()
+        if self._owns_root:
+            shutil.rmtree(self.root, ignore_errors=True)
+
+
+def configure_sandbox(**options) -> None:
+    """
+    Changes the settings of the shared sandbox (see `Sandbox`). The next `get_sandbox` call starts a new one.
+    """
+    global _sandbox
+    unknown = set(options) - set(_config) - {"preload"}
+    if unknown:
+        raise ValueError(f"Unknown sandbox options: {', '.join(sorted(unknown))}")
+
+    with _lock:
+        _config.update(options)
+        if _sandbox is not None:
+            _sandbox.close()
+        _sandbox = None
+
+
+def remove_scratch_dir(session: Optional[str]) -> None:
+    """Removes a session's scratch directory from the shared sandbox, without starting one."""
+    sandbox = _sandbox
+    if sandbox is not None:
+        sandbox.remove_scratch_dir(session)
+
+
+def get_sandbox() -> Sandbox:
+    """
+    Returns the shared sandbox used by the code tools. Its workers start with the first job.
+    """
+    global _sandbox
+    if _sandbox is not None:
+        return _sandbox
+
+    with _lock:
+        if _sandbox is None:
+            _sandbox = Sandbox(**_config)
+            atexit.register(_sandbox.close)
+    return _sandbox
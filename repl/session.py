@@ -0,0 +1,156 @@
+import contextvars
+import json
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, List, Optional
+
+# The session of the run whose tools are executing; tools use it for per-session state
+# such as the sandbox scratch directory.
+CURRENT_SESSION = contextvars.ContextVar("react_session", default=None)
+# The user input of that run, e.g. to pick the passages of a fetched page relevant to it
+CURRENT_QUERY = contextvars.ContextVar("react_query", default=None)
+
+
+class SessionStore:
+    def __init__(self, path: str = "sessions.db"):
+        """
+        Persistent conversation sessions stored in a SQLite database.
+
+        The history of a session is append-only: finished runs add their messages, nothing
+        is rewritten. Each `execute` run is checkpointed after every step (the step to run
+        next and the memory written so far), so an interrupted run resumes from its last
+        completed step instead of repeating its LLM and tool calls.
+
+        Args:
+            path (str): Path of the database file.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS messages ("
+            "session TEXT NOT NULL, seq INTEGER NOT NULL, role TEXT, data TEXT NOT NULL, created REAL NOT NULL, "
+            "PRIMARY KEY (session, seq));"
+            "CREATE TABLE IF NOT EXISTS runs ("
+            "session TEXT NOT NULL, run INTEGER NOT NULL, input TEXT NOT NULL, status TEXT NOT NULL, "
+            "step_idx INTEGER NOT NULL DEFAULT 0, memory_len INTEGER NOT NULL DEFAULT 0, "
+            "started REAL NOT NULL, updated REAL NOT NULL, PRIMARY KEY (session, run));"
+            "CREATE TABLE IF NOT EXISTS run_memory ("
+            "session TEXT NOT NULL, run INTEGER NOT NULL, seq INTEGER NOT NULL, data TEXT NOT NULL, "
+            "PRIMARY KEY (session, run, seq));"
+        )
+        self._conn.commit()
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def sessions(self) -> List[str]:
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT session FROM runs UNION SELECT DISTINCT session FROM messages").fetchall()
+        return [row[0] for row in rows]
+
+    def count(self, session: str) -> int:
+        """Number of history messages of a session."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM messages WHERE session = ?", (session,)).fetchone()[0]
+
+    def history(self, session: str, limit: Optional[int] = None, before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """
+        Loads history messages, oldest first. Only the newest `limit` messages are read,
+        so long sessions do not load every old turn; older pages are fetched with `before`.
+
+        Args:
+            session (str): The session id.
+            limit (Optional[int]): Maximum number of messages. None loads all.
+            before (Optional[int]): Only messages with a sequence number below this one.
+
+        Returns:
+            List[Dict[str, Any]]: The messages.
+        """
+        query = "SELECT data FROM messages WHERE session = ?"
+        params = [session]
+        if before is not None:
+            query += " AND seq < ?"
+            params.append(before)
+        query += " ORDER BY seq DESC"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+        return [json.loads(row[0]) for row in reversed(rows)]
+
+    def append_messages(self, session: str, messages: List[Dict[str, Any]]) -> None:
+        with self._lock, self._conn:
+            self._append(session, messages)
+
+    def _append(self, session, messages):
+        start = self._conn.execute("SELECT COALESCE(MAX(seq), -1) + 1 FROM messages WHERE session = ?", (session,)).fetchone()[0]
+        now = time.time()
+        self._conn.executemany(
+            "INSERT INTO messages (session, seq, role, data, created) VALUES (?, ?, ?, ?, ?)",
+            [(session, start + i, m.get("role"), json.dumps(m), now) for i, m in enumerate(messages) if m],
+        )
+
+    def start_run(self, session: str, input_str: str) -> int:
+        """Starts a run; an unfinished earlier run of the session is marked as abandoned."""
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.execute("UPDATE runs SET status = 'abandoned', updated = ? WHERE session = ? AND status = 'running'", (now, session))
+            run = self._conn.execute("SELECT COALESCE(MAX(run), -1) + 1 FROM runs WHERE session = ?", (session,)).fetchone()[0]
+            self._conn.execute(
+                "INSERT INTO runs (session, run, input, status, started, updated) VALUES (?, ?, ?, 'running', ?, ?)",
+                (session, run, input_str, now, now),
+            )
+        return run
+
+    def pending_run(self, session: str) -> Optional[Dict[str, Any]]:
+        """
+        The unfinished run of a session, if any.
+
+        Returns:
+            Optional[Dict[str, Any]]: "run", "input", "step_idx" (the step to run next) and
+            "memory" as of the last checkpoint.
+        """
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT run, input, step_idx, memory_len FROM runs WHERE session = ? AND status = 'running' ORDER BY run DESC LIMIT 1",
+                (session,),
+            ).fetchone()
+            if row is None:
+                return None
+            run, input_str, step_idx, memory_len = row
+            memory = self._conn.execute(
+                "SELECT data FROM run_memory WHERE session = ? AND run = ? AND seq < ? ORDER BY seq",
+                (session, run, memory_len),
+            ).fetchall()
+        return {"run": run, "input": input_str, "step_idx": step_idx, "memory": [json.loads(m[0]) for m in memory]}
+
+    def checkpoint(self, session: str, run: int, step_idx: int, memory: List[Dict[str, Any]], saved: int) -> int:
+        """
+        Appends the memory messages from index `saved` on and records the step to run next,
+        in one transaction.
+
+        Returns:
+            int: The number of memory messages saved, to pass as `saved` next time.
+        """
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO run_memory (session, run, seq, data) VALUES (?, ?, ?, ?)",
+                [(session, run, i, json.dumps(memory[i])) for i in range(saved, len(memory))],
+            )
+            self._conn.execute(
+                "UPDATE runs SET step_idx = ?, memory_len = ?, updated = ? WHERE session = ? AND run = ?",
+                (step_idx, len(memory), time.time(), session, run),
+            )
+        return len(memory)
+
+    def finish_run(self, session: str, run: int, messages: List[Dict[str, Any]]) -> None:
+        """Marks a run as done and appends its result messages to the session history."""
+        with self._lock, self._conn:
+            self._append(session, messages)
+            self._conn.execute("UPDATE runs SET status = 'done', updated = ? WHERE session = ? AND run = ?", (time.time(), session, run))
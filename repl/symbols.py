@@ -0,0 +1,604 @@
+"""
+Persistent symbol index for `find_symbol`.
+
+Python files are parsed with `ast`, C sources and headers with regular expressions on the
+comment- and string-free text. Definitions, declarations and references are stored with
+their ranges in a SQLite database. Re-indexing is incremental: files whose mtime and size
+are unchanged are skipped, changed files are re-parsed only if their content hash differs,
+and large batches are parsed on all cores. Exact lookups use the name index, partial names
+fall back to a prefix range scan and then to a trigram index of the defined names.
+
+Usage:
+    python -m repl.symbols index ROOT [ROOT ...] [--db symbols.db] [--workers N]
+    python -m repl.symbols find NAME [--db symbols.db]
+"""
+import argparse
+import ast
+import bisect
+import hashlib
+import json
+import keyword
+import logging
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+SOURCE_EXTENSIONS = {".py": "python", ".c": "c", ".h": "c"}
+SKIP_DIRS = {".git", ".hg", ".svn", "__pycache__", "node_modules", ".venv", "venv", ".tox", "build", "dist"}
+MAX_FILE_BYTES = 2 * 1024 * 1024  # larger files are usually generated and are not parsed
+MAX_CONTENT = 300
+PARALLEL_THRESHOLD = 200  # changed files from which parsing uses a process pool
+BATCH_FILES = 500  # files written per transaction
+
+# (name, kind, detail, start_line, start_character, end_line, end_character, content)
+Symbol = Tuple[str, str, str, int, int, int, int, str]
+
+C_KEYWORDS = frozenset(
+    "auto break case char const continue default do double else enum extern float for goto if inline int long "
+    "register restrict return short signed sizeof static struct switch typedef union unsigned void volatile while "
+    "_Bool _Complex _Static_assert defined".split()
+)
+
+# `self` and `cls` are excluded too: they are in every method and never the symbol looked for
+PY_KEYWORDS = frozenset(keyword.kwlist) | {"self", "cls"}
+
+_PY_NOISE = re.compile(
+    r"""#[^\n]*|(?<!\w)[rRbBuUfF]{0,2}(?:'''(?:\\.|[^\\])*?'''|\"\"\"(?:\\.|[^\\])*?\"\"\"|'(?:\\.|[^'\\\n])*'|"(?:\\.|[^"\\\n])*")"""
+)
+_C_NOISE = re.compile(r"//[^\n]*|/\*.*?\*/|\"(?:\\.|[^\"\\\n])*\"|'(?:\\.|[^'\\\n])*'", re.S)
+_C_PREPROCESSOR = re.compile(r"^[ \t]*#(?:[^\n]*\\\n)*[^\n]*", re.M)
+_C_DEFINE = re.compile(r"^[ \t]*#[ \t]*define[ \t]+([A-Za-z_]\w*)", re.M)
+_C_FUNCTION = re.compile(r"\b([A-Za-z_]\w*)\s*\((?:[^()]|\([^()]*\))*\)\s*([{;])")
+_C_TYPE = re.compile(r"\b(struct|union|enum)\s+([A-Za-z_]\w*)\s*\{")
+_C_TYPEDEF = re.compile(r"\btypedef\b")
+_C_VARIABLE = re.compile(
+    r"^[ \t]*((?:(?:static|extern|const|volatile|unsigned|signed|struct|union|enum)\s+)*[A-Za-z_]\w*(?:\s+|\s*\*+\s*))"
+    r"([A-Za-z_]\w*)\s*(?:\[[^\]\n]*\]\s*)*[=;]",
+    re.M,
+)
+_IDENTIFIER = re.compile(r"\b[A-Za-z_]\w*")
+_REFERENCE = re.compile(r"\b([A-Za-z_]\w*)(\s*\()?")
+_SEMICOLON = re.compile(";")
+
+
+def _blank(match) -> str:
+    """Replaces a match with spaces, keeping newlines, so offsets stay valid."""
+    return re.sub(r"[^\n]", " ", match.group())
+
+
+def _truncate(text: str, limit: int = MAX_CONTENT) -> str:
+    return text if len(text) <= limit else text[:limit] + "..."
+
+
+def _references(code: str, text: str, line_starts: List[int], keywords: frozenset, defined: set) -> List[Symbol]:
+    """Every identifier of `code` (comments and strings blanked) except keywords and the defined names."""
+    lines = text.split("\n")
+    references = []
+    line, next_start, content = -1, 0, ""
+    for match in _REFERENCE.finditer(code):
+        name, start = match.group(1), match.start()
+        if name in keywords or start in defined:
+            continue
+        # Matches come in order, so the line only ever moves forward
+        if start >= next_start:
+            line = bisect.bisect_right(line_starts, start) - 1
+            next_start = line_starts[line + 1] if line + 1 < len(line_starts) else len(code) + 1
+            content = _truncate(lines[line].strip(), 200)
+        character = start - line_starts[line]
+        detail = "function call" if match.group(2) else "reference"
+        references.append((name, "Reference", detail, line, character, line, character + len(name), content))
+    return references
+
+
+class _Positions:
+    def __init__(self, text: str):
+        self.line_starts = [0] + [m.end() for m in re.finditer("\n", text)]
+
+    def __call__(self, offset: int) -> Tuple[int, int]:
+        line = bisect.bisect_right(self.line_starts, offset) - 1
+        return line, offset - self.line_starts[line]
+
+
+def parse_c(text: str) -> List[Symbol]:
+    """Definitions, declarations and references of a C source or header."""
+    symbols = []
+    position = _Positions(text)
+    code = _C_NOISE.sub(_blank, text)
+
+    def add(name, kind, detail, start, end, name_offset=None):
+        (sl, sc), (el, ec) = position(start), position(end)
+        symbols.append((name, kind, detail, sl, sc, el, ec, _truncate(text[start:end])))
+        if name_offset is not None:
+            defined.add(name_offset)
+
+    defined = set()
+    for match in _C_DEFINE.finditer(code):
+        end = code.find("\n", match.start())
+        add(match.group(1), "Macro", "macro definition", match.start() + len(match.group()) - len(match.group().lstrip()), len(code) if end < 0 else end, match.start(1))
+    code = _C_PREPROCESSOR.sub(_blank, code)
+
+    # Brace depth at every position and the matching closing brace of every opening one
+    brace_positions, depths, closing, stack = [], [], {}, []
+    for match in re.finditer(r"[{}]", code):
+        if match.group() == "{":
+            stack.append(match.start())
+        elif stack:
+            closing[stack.pop()] = match.start()
+        brace_positions.append(match.start())
+        depths.append(len(stack))
+
+    def depth(offset):
+        i = bisect.bisect_left(brace_positions, offset) - 1
+        return depths[i] if i >= 0 else 0
+
+    def statement_start(offset):
+        start = max(code.rfind(c, 0, offset) for c in ";{}") + 1
+        return start + len(code[start:offset]) - len(code[start:offset].lstrip())
+
+    def statement_end(offset):
+        for match in _SEMICOLON.finditer(code, offset):
+            if depth(match.start()) == depth(offset):
+                return match.end()
+        return len(code)
+
+    for match in _C_FUNCTION.finditer(code):
+        name = match.group(1)
+        if name in C_KEYWORDS or depth(match.start()) != 0:
+            continue
+        start = statement_start(match.start())
+        if start == match.start():
+            continue  # a macro invocation like `FOO(x);` without a return type
+        if match.group(2) == "{":
+            add(name, "Function", "function definition", start, closing.get(match.end() - 1, len(code) - 1) + 1, match.start(1))
+        else:
+            add(name, "Function", "function declaration", start, match.end(), match.start(1))
+
+    for match in _C_TYPE.finditer(code):
+        add(match.group(2), "Type", f"{match.group(1)} definition", match.start(), closing.get(match.end() - 1, len(code) - 1) + 1, match.start(2))
+
+    for match in _C_TYPEDEF.finditer(code):
+        if depth(match.start()) != 0:
+            continue
+        end = statement_end(match.start())
+        segment = code[match.start():end]
+        pointer = re.search(r"\(\s*\*\s*([A-Za-z_]\w*)\s*\)", segment)
+        names = [m for m in _IDENTIFIER.finditer(segment) if m.group() not in C_KEYWORDS]
+        found = pointer.start(1) if pointer else (names[-1].start() if names else None)
+        if found is not None:
+            offset = match.start() + found
+            add(_IDENTIFIER.match(code, offset).group(), "Type", "typedef", match.start(), end, offset)
+
+    for match in _C_VARIABLE.finditer(code):
+        first = match.group(1).split()[0]
+        if first in ("return", "typedef", "else", "goto", "case") or depth(match.start()) != 0 or match.start(2) in defined:
+            continue
+        start = match.start(1) + len(match.group(1)) - len(match.group(1).lstrip())
+        detail = "variable declaration" if first == "extern" else "variable definition"
+        add(match.group(2), "Variable", detail, start, statement_end(match.start(2)), match.start(2))
+
+    symbols.extend(_references(code, text, position.line_starts, C_KEYWORDS, defined))
+    return symbols
+
+
+def parse_python(text: str) -> List[Symbol]:
+    """
+    Definitions and references of a Python module; files that do not parse have none.
+    Definitions come from the statements of the syntax tree, references from the identifiers
+    of the source, which is much faster than visiting every expression node.
+    """
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    symbols = []
+    defined = set()
+    position = _Positions(text)
+    lines = text.split("\n")
+
+    def add(node, name, kind, detail, name_line, name_character):
+        content = _truncate("\n".join(lines[node.lineno - 1:node.end_lineno]).strip())
+        symbols.append((name, kind, detail, node.lineno - 1, node.col_offset, node.end_lineno - 1, node.end_col_offset, content))
+        if name_character >= 0:
+            defined.add(position.line_starts[name_line - 1] + name_character)
+
+    def visit(body, scope):
+        for node in body:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                if isinstance(node, ast.ClassDef):
+                    kind, detail, inner = "Class", "class definition", "class"
+                elif scope == "class":
+                    kind, detail, inner = "Method", "method definition", "function"
+                else:
+                    kind, detail, inner = "Function", "function definition", "function"
+                add(node, node.name, kind, detail, node.lineno, lines[node.lineno - 1].find(node.name, node.col_offset))
+                visit(node.body, inner)
+                continue
+            if isinstance(node, (ast.Assign, ast.AnnAssign)) and scope != "function":
+                for target in node.targets if isinstance(node, ast.Assign) else [node.target]:
+                    if isinstance(target, ast.Name):
+                        add(node, target.id, "Variable", "variable definition", target.lineno, target.col_offset)
+            # Definitions inside compound statements (if, for, while, with, try, match)
+            for field in ("body", "orelse", "finalbody"):
+                inner_body = getattr(node, field, None)
+                if isinstance(inner_body, list):
+                    visit(inner_body, scope)
+            for inner in getattr(node, "handlers", None) or getattr(node, "cases", None) or []:
+                visit(inner.body, scope)
+
+    try:
+        visit(tree.body, "module")
+    except RecursionError:
+        pass  # deeply nested generated code: keep what was found
+    symbols.extend(_references(_PY_NOISE.sub(_blank, text), text, position.line_starts, PY_KEYWORDS, defined))
+    return symbols
+
+
+PARSERS = {"python": parse_python, "c": parse_c}
+
+
+def _index_file(job: Tuple[str, int, int, Optional[str]]):
+    """
+    Reads, hashes and parses one file; runs in the worker processes.
+
+    Returns:
+        Tuple: (path, mtime, size, hash, symbols, lines). `symbols` is None if the content hash
+        is unchanged, and `hash` is None if the file could not be read. The content of references
+        is moved to `lines` ((line, text) pairs), so a line with several references is stored once.
+    """
+    path, mtime, size, old_hash = job
+    try:
+        with open(path, "rb") as f:
+            data = f.read(MAX_FILE_BYTES + 1)
+    except OSError:
+        return path, mtime, size, None, [], []
+    digest = hashlib.blake2b(data, digest_size=16).hexdigest()
+    if digest == old_hash:
+        return path, mtime, size, digest, None, []
+    if len(data) > MAX_FILE_BYTES:
+        return path, mtime, size, digest, [], []
+    language = SOURCE_EXTENSIONS[os.path.splitext(path)[1].lower()]
+    symbols, lines = [], {}
+    for symbol in PARSERS[language](data.decode("utf-8", errors="replace").replace("\r\n", "\n")):
+        if symbol[1] == "Reference":
+            lines[symbol[3]] = symbol[7]
+            symbol = symbol[:7] + (None,)
+        symbols.append(symbol)
+    return path, mtime, size, digest, symbols, list(lines.items())
+
+
+_INDEXES = "CREATE INDEX IF NOT EXISTS symbols_name ON symbols (name); CREATE INDEX IF NOT EXISTS symbols_file ON symbols (file);"
+
+
+def _trigrams(name: str) -> set:
+    name = name.lower()
+    return {name[i:i + 3] for i in range(len(name) - 2)}
+
+
+class SymbolIndex:
+    def __init__(self, path: str = "symbols.db", roots: Sequence[str] = (), workers: Optional[int] = None):
+        """
+        Symbol index of the source files below `roots`, stored in a SQLite database.
+
+        Call `update` to (re-)index; only new and changed files are parsed. Queries use one
+        read connection per thread, so they are not blocked by a running update.
+
+        Args:
+            path (str): Path of the database file.
+            roots (Sequence[str]): Directories to index.
+            workers (Optional[int]): Processes for parsing large batches. Defaults to the number of cores.
+        """
+        self.path = path
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.workers = workers or os.cpu_count() or 1
+        self.last_update = None
+        self.building = False  # a first build of an empty database is running
+        self._update_lock = threading.Lock()
+        self._local = threading.local()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(
+            "CREATE TABLE IF NOT EXISTS files ("
+            "id INTEGER PRIMARY KEY, path TEXT UNIQUE NOT NULL, root TEXT NOT NULL, mtime INTEGER, size INTEGER, hash TEXT);"
+            "CREATE TABLE IF NOT EXISTS symbols ("
+            "file INTEGER NOT NULL, name TEXT NOT NULL, kind TEXT, detail TEXT, "
+            "start_line INTEGER, start_character INTEGER, end_line INTEGER, end_character INTEGER, content TEXT);"
+            "CREATE TABLE IF NOT EXISTS lines ("
+            "file INTEGER NOT NULL, line INTEGER NOT NULL, text TEXT, PRIMARY KEY (file, line)) WITHOUT ROWID;"
+            "CREATE TABLE IF NOT EXISTS name_trigrams ("
+            "trigram TEXT NOT NULL, name TEXT NOT NULL, PRIMARY KEY (trigram, name)) WITHOUT ROWID;"
+            + _INDEXES
+        )
+        self._conn.commit()
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, check_same_thread=False)
+        return conn
+
+    def _walk(self, root: str) -> Iterator[Tuple[str, os.stat_result]]:
+        stack = [root]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name not in SKIP_DIRS and not entry.name.startswith("."):
+                            stack.append(entry.path)
+                    elif os.path.splitext(entry.name)[1].lower() in SOURCE_EXTENSIONS:
+                        yield entry.path, entry.stat()
+                except OSError:
+                    continue
+
+    def update(self) -> Dict[str, Any]:
+        """
+        Indexes new and changed files below the roots and drops deleted ones.
+
+        Returns:
+            Dict[str, Any]: Counts of the files seen, parsed, unchanged (same hash) and removed, and the duration.
+        """
+        with self._update_lock:
+            return self._update()
+
+    def _update(self) -> Dict[str, Any]:
+        start = time.perf_counter()
+        stats = {"files": 0, "parsed": 0, "unchanged": 0, "removed": 0}
+        # On a first build, creating the indexes once after loading is much faster than updating them per row
+        bulk = self._conn.execute("SELECT NOT EXISTS (SELECT 1 FROM files)").fetchone()[0]
+        if bulk:
+            self.building = True
+            self._conn.executescript("DROP INDEX IF EXISTS symbols_name; DROP INDEX IF EXISTS symbols_file;")
+        try:
+            for root in self.roots:
+                known = {
+                    path: (file_id, mtime, size, digest)
+                    for file_id, path, mtime, size, digest in self._conn.execute("SELECT id, path, mtime, size, hash FROM files WHERE root = ?", (root,))
+                }
+                jobs, seen = [], set()
+                for path, stat in self._walk(root):
+                    seen.add(path)
+                    row = known.get(path)
+                    if row is None or row[1] != stat.st_mtime_ns or row[2] != stat.st_size:
+                        jobs.append((path, stat.st_mtime_ns, stat.st_size, row[3] if row else None))
+                stats["files"] += len(seen)
+
+                if len(jobs) >= PARALLEL_THRESHOLD and self.workers > 1:
+                    # Spawned workers, since the agent process may be running threads
+                    with ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                        chunksize = max(1, min(64, len(jobs) // (self.workers * 8)))
+                        self._store(root, known, pool.map(_index_file, jobs, chunksize=chunksize), stats)
+                else:
+                    self._store(root, known, map(_index_file, jobs), stats)
+
+                removed = [known[path][0] for path in known if path not in seen]
+                with self._conn:
+                    names = self._delete_symbols(removed)
+                    self._conn.executemany("DELETE FROM files WHERE id = ?", [(file_id,) for file_id in removed])
+                    self._prune_trigrams(names)
+                stats["removed"] += len(removed)
+        finally:
+            if bulk:
+                self._conn.executescript(_INDEXES)
+                self.building = False
+            self.last_update = time.time()
+        stats["seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def _store(self, root: str, known: Dict[str, Tuple], results, stats: Dict[str, int]) -> None:
+        """Writes parse results in batches, one transaction per batch."""
+        batch = []
+        for result in results:
+            batch.append(result)
+            if len(batch) >= BATCH_FILES:
+                self._write(root, known, batch, stats)
+                batch = []
+        if batch:
+            self._write(root, known, batch, stats)
+
+    def _delete_symbols(self, file_ids: List[int]) -> set:
+        """Deletes the symbols and reference lines of files and returns the names they defined."""
+        names = set()
+        for file_id in file_ids:
+            names.update(row[0] for row in self._conn.execute(
+                "SELECT DISTINCT name FROM symbols WHERE file = ? AND kind != 'Reference'", (file_id,)
+            ))
+            self._conn.execute("DELETE FROM symbols WHERE file = ?", (file_id,))
+            self._conn.execute("DELETE FROM lines WHERE file = ?", (file_id,))
+        return names
+
+    def _prune_trigrams(self, names: set) -> None:
+        """Drops the trigrams of names that no file defines anymore."""
+        gone = [
+            name for name in names
+            if self._conn.execute("SELECT 1 FROM symbols WHERE name = ? AND kind != 'Reference' LIMIT 1", (name,)).fetchone() is None
+        ]
+        self._conn.executemany("DELETE FROM name_trigrams WHERE trigram = ? AND name = ?", [(trigram, name) for name in gone for trigram in _trigrams(name)])
+
+    def _write(self, root: str, known: Dict[str, Tuple], batch: List[Tuple], stats: Dict[str, int]) -> None:
+        stale = set()
+        with self._conn:
+            for path, mtime, size, digest, symbols, lines in batch:
+                row = known.get(path)
+                if row is not None:
+                    file_id = row[0]
+                    self._conn.execute("UPDATE files SET mtime = ?, size = ?, hash = ? WHERE id = ?", (mtime, size, digest, file_id))
+                else:
+                    file_id = self._conn.execute(
+                        "INSERT INTO files (path, root, mtime, size, hash) VALUES (?, ?, ?, ?, ?)", (path, root, mtime, size, digest)
+                    ).lastrowid
+                if symbols is None:
+                    stats["unchanged"] += 1
+                    continue
+                stats["parsed"] += 1
+                if row is not None:
+                    stale |= self._delete_symbols([file_id])
+                self._conn.executemany(
+                    "INSERT INTO symbols VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", [(file_id,) + symbol for symbol in symbols]
+                )
+                self._conn.executemany("INSERT INTO lines VALUES (?, ?, ?)", [(file_id, line, text) for line, text in lines])
+                defined = {symbol[0] for symbol in symbols if symbol[1] != "Reference"}
+                self._conn.executemany(
+                    "INSERT OR IGNORE INTO name_trigrams VALUES (?, ?)",
+                    [(trigram, name) for name in defined for trigram in _trigrams(name)],
+                )
+            self._prune_trigrams(stale)
+
+    def refresh(self, max_age: float) -> None:
+        """Starts an update in the background if the last one is older than `max_age` seconds."""
+        if self._update_lock.locked() or (self.last_update is not None and time.time() - self.last_update < max_age):
+            return
+        if self.last_update is None and not self.file_count():
+            # Set before the thread starts, so queries right after this call know the index is incomplete
+            self.building = True
+        threading.Thread(target=self._background_update, daemon=True, name="symbol-index").start()
+
+    def _background_update(self) -> None:
+        if not self._update_lock.acquire(blocking=False):
+            return
+        try:
+            self._update()
+        except Exception as e:
+            logging.error(f"Symbol index update failed: {e}")
+        finally:
+            self.building = False
+            self._update_lock.release()
+
+    def file_count(self) -> int:
+        return self._reader().execute("SELECT COUNT(*) FROM files").fetchone()[0]
+
+    def similar_names(self, name: str, limit: int = 20) -> List[str]:
+        """Defined names starting with `name`, or else containing it (case-insensitive)."""
+        conn = self._reader()
+        names = [row[0] for row in conn.execute(
+            "SELECT DISTINCT name FROM symbols WHERE name >= ? AND name < ? AND kind != 'Reference' LIMIT ?",
+            (name, name + "\U0010ffff", limit),
+        )]
+        if names:
+            return names
+        trigrams = sorted(_trigrams(name))
+        if not trigrams:
+            return []
+        rows = conn.execute(
+            f"SELECT name FROM name_trigrams WHERE trigram IN ({','.join('?' * len(trigrams))}) "
+            "GROUP BY name HAVING COUNT(*) = ? LIMIT ?",
+            (*trigrams, len(trigrams), limit * 5),
+        )
+        return [candidate for (candidate,) in rows if name.lower() in candidate.lower()][:limit]
+
+    def find(self, name: str, limit: int = 200) -> List[Dict[str, Any]]:
+        """
+        Looks up a symbol.
+
+        Args:
+            name (str): The symbol name.
+            limit (int): Maximum number of results.
+
+        Returns:
+            List[Dict[str, Any]]: Definitions and declarations first, then references, each with
+            `file` (relative to its root), `kind`, `range`, `detail` and `content`. If the name is
+            unknown, the definitions of similar names are returned.
+        """
+        query = (
+            "SELECT files.path, files.root, kind, detail, start_line, start_character, end_line, end_character, "
+            "COALESCE(content, lines.text) FROM symbols JOIN files ON files.id = symbols.file "
+            "LEFT JOIN lines ON lines.file = symbols.file AND lines.line = symbols.start_line WHERE name {} "
+            "ORDER BY kind = 'Reference', files.path, start_line LIMIT ?"
+        )
+        conn = self._reader()
+        rows = conn.execute(query.format("= ?"), (name, limit)).fetchall()
+        if not rows:
+            names = self.similar_names(name)
+            if names:
+                rows = conn.execute(
+                    query.format(f"IN ({','.join('?' * len(names))}) AND kind != 'Reference'"), (*names, limit)
+                ).fetchall()
+        return [
+            {
+                "file": os.path.relpath(path, root),
+                "kind": kind,
+                "range": [{"line": start_line, "character": start_character}, {"line": end_line, "character": end_character}],
+                "detail": detail,
+                "content": content,
+            }
+            for path, root, kind, detail, start_line, start_character, end_line, end_character, content in rows
+        ]
+
+    def close(self) -> None:
+        self._conn.close()
+
+
+_lock = threading.Lock()
+_index = None
+_config = {
+    "path": os.environ.get("REACT_SYMBOL_DB", "symbols.db"),
+    "roots": [root for root in os.environ.get("REACT_SYMBOL_ROOTS", "").split(os.pathsep) if root],
+    "workers": None,
+    "refresh_interval": 60.0,  # seconds between background re-indexing runs
+}
+
+
+def configure_symbols(**options) -> None:
+    """
+    Changes the settings of the shared symbol index (path, roots, workers, refresh_interval).
+    The next `get_symbol_index` call opens a new index.
+    """
+    global _index
+    unknown = set(options) - set(_config)
+    if unknown:
+        raise ValueError(f"Unknown symbol index options: {', '.join(sorted(unknown))}")
+
+    with _lock:
+        _config.update(options)
+        if _index is not None:
+            _index.close()
+        _index = None
+
+
+def get_symbol_index() -> Optional[SymbolIndex]:
+    """
+    Returns the shared index used by `find_symbol`, or None if no roots are configured.
+    Indexing always runs in the background, so a first build of a large tree does not block
+    the caller; while `building` is set, queries see the files indexed so far. Build the
+    index beforehand with `python -m repl.symbols index` to avoid that.
+    """
+    global _index
+    if not _config["roots"]:
+        return None
+    with _lock:
+        if _index is None:
+            _index = SymbolIndex(_config["path"], _config["roots"], _config["workers"])
+        index = _index
+    index.refresh(_config["refresh_interval"])
+    return index
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", choices=["index", "find"])
+    parser.add_argument("args", nargs="+", help="Roots to index, or the name to find")
+    parser.add_argument("--db", default="symbols.db")
+    parser.add_argument("--workers", type=int)
+    args = parser.parse_args()
+
+    if args.command == "index":
+        index = SymbolIndex(args.db, args.args, args.workers)
+        print(json.dumps(index.update()))
+    else:
+        index = SymbolIndex(args.db)
+        start = time.perf_counter()
+        results = index.find(args.args[0])
+        print(json.dumps(results, indent=2))
+        print(f"{len(results)} results in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,38 @@
 
 from datetime import datetime
-import pytz
 import json
+import os
 import io
 import contextlib
-from ddg import Duckduckgo
+import contextvars
+import tempfile
 from repl.types import Result, Agent
-from serpapi import GoogleSearch
-import requests
-from bs4 import BeautifulSoup
+from repl.cache import cached_tool
+from concurrent.futures import ThreadPoolExecutor
+import threading
+
+# Heavy third-party dependencies (pytz, ddg, serpapi, requests, bs4) are imported inside
+# the tools that use them, so importing this module stays cheap.
+
+# read_url extraction settings. Streaming mode stops downloading once the text budget is reached.
+READ_URL_STREAMING = True
+READ_URL_MAX_CHARS = 200000  # text kept per page and indexed for retrieval
+READ_URL_MAX_BYTES = 5 * 1024 * 1024
+# Tokens of page text returned by read_url and search_fetched (see repl.retrieval)
+READ_URL_TOKEN_BUDGET = 1200
+
+_ddg_lock = threading.Lock()
+_ddg_client = None
+
+
+def get_ddg_client():
+    """Returns the shared DuckDuckGo client instead of building one per search."""
+    global _ddg_client
+    with _ddg_lock:
+        if _ddg_client is None:
+            from ddg import Duckduckgo
+            _ddg_client = Duckduckgo()
+    return _ddg_client
 
 
 def get_weather(location, time="now"):
@@ -27,6 +51,8 @@ def date(timezone='UTC'):
     - str: Formatted current date and time.
     """
     if timezone:
+        import pytz
+
         # Get the current time in the specified timezone
         tz = pytz.timezone(timezone)
         current_datetime = datetime.now(tz)
@@ -37,7 +63,9 @@ def date(timezone='UTC'):
     return current_datetime.strftime("%B %d, %Y Time: %H:%M:%S")
 
 
-def read_url(url: str) -> Result:
+# Pages are large: only a few are kept in memory, the rest in the disk tier if one is configured
+@cached_tool(ttl=3600, memory_size=16)
+def fetch_page(url: str) -> Result:
     """
     Fetches and extracts text content from a given webpage URL.
 
@@ -47,13 +75,31 @@ def read_url(url: str) -> Result:
     Returns:
         Result: An object containing the extracted text or an error message.
     """
+    import requests
+    from repl.net import http_get
+
     result = Result()  # Initialize the result object
 
     try:
-        headers = {"User-Agent": "Mozilla/5.0"}
-        response = requests.get(url, headers=headers, timeout=10)
+        if READ_URL_STREAMING:
+            from repl.html_text import extract_text_from_chunks
+
+            with http_get(url, stream=True) as response:
+                response.raise_for_status()  # Raise an error for bad responses (4xx, 5xx)
+                result.value = extract_text_from_chunks(
+                    response.iter_content(chunk_size=16384),
+                    max_chars=READ_URL_MAX_CHARS,
+                    encoding=response.encoding,
+                    max_bytes=READ_URL_MAX_BYTES,
+                )
+            result.error = False
+            return result
+
+        response = http_get(url)
         response.raise_for_status()  # Raise an error for bad responses (4xx, 5xx)
 
+        from bs4 import BeautifulSoup
+
         # Parse HTML content
         soup = BeautifulSoup(response.text, "html.parser")
 
@@ -65,7 +111,7 @@ def read_url(url: str) -> Result:
         text = soup.get_text(separator="\n", strip=True)
 
         # Limit output size (prevent excessively large content)
-        result.value = text[:5000]  # First 5000 characters
+        result.value = text[:READ_URL_MAX_CHARS]
         result.error = False
 
     except requests.exceptions.RequestException as e:
@@ -75,6 +121,104 @@ def read_url(url: str) -> Result:
     return result
 
 
+def read_url(url: str) -> Result:
+    """
+    Fetches a webpage and returns the passages of its text most relevant to the current question.
+    The whole page is kept, so search_fetched can find other passages later without fetching again.
+
+    Args:
+        url (str): The webpage URL.
+
+    Returns:
+        Result: An object containing the relevant text or an error message.
+    """
+    from repl.retrieval import get_index, chunk_text, estimate_tokens
+    from repl.session import CURRENT_SESSION, CURRENT_QUERY
+
+    page = fetch_page(url)
+    if page.error:
+        return page
+
+    index = get_index(CURRENT_SESSION.get())
+    total = index.add(url, page.value)
+    query = CURRENT_QUERY.get()
+    passages = index.search(query, READ_URL_TOKEN_BUDGET, source=url) if query else []
+
+    if passages:
+        # Relevant passages in page order
+        passages.sort(key=lambda passage: passage["index"])
+        header = f"[{len(passages)} of {total} passages of {url}, selected for: {query}]"
+        text = "\n\n[...]\n\n".join(passage["text"] for passage in passages)
+    else:
+        # Nothing to rank by: the start of the page within the budget
+        passages, used = [], 0
+        for chunk in chunk_text(page.value):
+            used += estimate_tokens(chunk)
+            if passages and used > READ_URL_TOKEN_BUDGET:
+                break
+            passages.append(chunk[:READ_URL_TOKEN_BUDGET * 4])
+        header = f"[First {len(passages)} of {total} passages of {url}]"
+        text = "\n".join(passages)
+    if len(passages) < total:
+        header += " Use search_fetched to find other passages of fetched pages."
+    return Result(value=f"{header}\n{text}", error=False)
+
+
+def search_fetched(query: str) -> Result:
+    """
+    Searches the pages fetched so far with read_url or read_urls and returns the most relevant passages, without fetching again.
+
+    Args:
+        query (str): What to look for.
+
+    Returns:
+        Result: The matching passages with their URLs, or an error message.
+    """
+    from repl.retrieval import get_index
+    from repl.session import CURRENT_SESSION
+
+    index = get_index(CURRENT_SESSION.get())
+    if not len(index):
+        return Result(value="Error: No pages have been fetched yet. Use read_url first.", error=True)
+    passages = index.search(query, READ_URL_TOKEN_BUDGET)
+    if not passages:
+        return Result(value=f"No passages of the {len(index)} fetched pages match: {query}", error=False)
+    return Result(value="\n\n".join(f"[{passage['source']}]\n{passage['text']}" for passage in passages), error=False)
+
+
+def read_urls(urls: list) -> Result:
+    """
+    Fetches several webpages concurrently and extracts their text content.
+
+    Args:
+        urls (list): The webpage URLs.
+
+    Returns:
+        Result: A JSON list with one entry per URL: {"url", "error", "content"}.
+    """
+    result = Result()
+    if isinstance(urls, str):
+        urls = [urls]
+
+    if not urls:
+        result.value = "Error: No URLs given."
+        result.error = True
+        result.repeat = True
+        return result
+
+    # The pool threads run read_url in the caller's context, so it sees the session and question
+    contexts = [contextvars.copy_context() for _ in urls]
+    with ThreadPoolExecutor(max_workers=min(8, len(urls))) as pool:
+        pages = list(pool.map(lambda context, url: context.run(read_url, url), contexts, urls))
+
+    result.value = json.dumps(
+        [{"url": url, "error": page.error, "content": page.value} for url, page in zip(urls, pages)]
+    )
+    result.error = all(page.error for page in pages)
+    return result
+
+
+@cached_tool(ttl=900, casefold=True)
 def google(query: str) -> str:
     """
     Performs a web search for the given query using SerpApi and retrieves a list of search results.
@@ -97,6 +241,8 @@ def google(query: str) -> str:
             "api_key": "YOUR_SERPAPI_KEY"  # Replace with your actual API key
         }
         
+        from serpapi import GoogleSearch
+
         search = GoogleSearch(params)
         web_results = search.get_dict()
         
@@ -122,6 +268,7 @@ def google(query: str) -> str:
 
 
 
+@cached_tool(ttl=900, casefold=True)
 def web_search(query: str) -> str:
     """
     Performs a web search for the given query using DuckDuckGo and retrieves a list of search results.
@@ -137,7 +284,7 @@ def web_search(query: str) -> str:
         result.value = "Error: Search engine provides no results."  
         result.error = True     
                 
-        ddg_api = Duckduckgo()
+        ddg_api = get_ddg_client()
         # Perform the search using DuckDuckGo
         web_results = ddg_api.search(query)
 
@@ -183,13 +330,19 @@ def count_letters(word: str, letter: str) -> int:
     """
     return word.count(letter)
 
-def calculate_expression(expression: str) -> float:
+def calculate_expression(expression: str, variables: dict = None):
     """Evaluate mathematical expressions.
     
     Args:
-        expression: The arithmetic expression to calculate (required)
+        expression: The arithmetic expression to calculate (required). Supports + - * / // % **, comparisons, "a if condition else b" and the math functions sqrt, exp, log, sin, cos, tan, abs, round, min, max, floor, ceil, ...
+        variables: Values of the variables in the expression, e.g. {"x": 2}. A list ({"x": [1, 2, 3]}) or a range ({"x": {"start": 0, "stop": 10, "step": 1}} or {"x": {"start": 0, "stop": 1, "num": 11}}) evaluates the expression for all values at once and returns a list.
     """
-    return eval(expression)  # In practice, use a safe evaluator
+    from repl.expr import evaluate, ExpressionError
+
+    try:
+        return evaluate(expression, variables)
+    except ExpressionError as e:
+        return Result(value=f"Error evaluating expression: {e}", error=True)
 
 
 
@@ -212,47 +365,16 @@ def find_symbol(symbol_name: str) -> list:
             {"file": "include\\brake_system.h", "kind": "Reference", "range": [{"line": 46, "character": 5}, {"line": 46, "character": 23}], "detail": "function reference", "content": "BrakeSystem_Update(sensor_data);"}
         ]
     """
-    
-    # Example symbol data with function occurrences
-    symbol_data = [
-        {
-            "file": "src\\brake_system.c",
-            "kind": "Function",
-            "range": [{"line": 21, "character": 0}, {"line": 55, "character": 1}],
-            "detail": "function definition",
-            "content": "void BrakeSystem_Update(SensorData sensor_data) {\n    // Compute CRC for the sensor data\n    sensor_data.crc = CRC_Compute((uint8_t*)&sensor_data, sizeof(SensorData) - sizeof(sensor_data.crc));\n    brake_status.sensor_data = sensor_data;\n    ...}"
-        },
-        {
-            "file": "include\\brake_system.h",
-            "kind": "Function",
-            "range": [{"line": 46, "character": 0}, {"line": 46, "character": 48}],
-            "detail": "function declaration",
-            "content": "void BrakeSystem_Init(BrakeConfig config);\nvoid BrakeSystem_Update(SensorData sensor_data);"
-        },
-        {
-            "file": "src\\main.c",
-            "kind": "Reference",
-            "range": [{"line": 22, "character": 4}, {"line": 22, "character": 22}],
-            "detail": "function call",
-            "content": "BrakeSystem_Update(sensor_data);"
-        },
-        {
-            "file": "src\\brake_system.c",
-            "kind": "Reference",
-            "range": [{"line": 21, "character": 5}, {"line": 21, "character": 23}],
-            "detail": "function reference",
-            "content": "BrakeSystem_Update(sensor_data);"
-        },
-        {
-            "file": "include\\brake_system.h",
-            "kind": "Reference",
-            "range": [{"line": 46, "character": 5}, {"line": 46, "character": 23}],
-            "detail": "function reference",
-            "content": "BrakeSystem_Update(sensor_data);"
-        }
-    ]
-    
-    return symbol_data
+    from repl.symbols import get_symbol_index
+
+    # The index of the directories in REACT_SYMBOL_ROOTS (see repl.symbols.configure_symbols)
+    index = get_symbol_index()
+    if index is None:
+        return Result(value="No source directories are indexed. Set REACT_SYMBOL_ROOTS or call repl.symbols.configure_symbols(roots=[...]).", error=True)
+    results = index.find(symbol_name)
+    if index.building:
+        return Result(value=f"The symbol index is still being built ({index.file_count()} files so far), so these results may be incomplete: {results}")
+    return results
 
 
 
@@ -286,7 +408,40 @@ def write_code(code: str):
     Returns:
         str: The file path where the code was written.
     """
-    file_path = "code_temp.py"
-    with open(file_path, "w") as file:
+    from repl.sandbox import get_sandbox
+    from repl.session import CURRENT_SESSION
+
+    # Each session writes into its own sandbox scratch directory, where run_code executes;
+    # every call gets its own file because tool calls of one step run concurrently
+    fd, file_path = tempfile.mkstemp(prefix="code_", suffix=".py", dir=get_sandbox().scratch_dir(CURRENT_SESSION.get()))
+    with os.fdopen(fd, "w") as file:
         file.write(code)
     return file_path
+
+
+def run_code(code: str) -> Result:
+    """
+    Runs Python code in an isolated sandbox process and returns its output. The working directory
+    is the session's scratch directory, which also contains the file written by write_code. The
+    value of a final expression is returned. Time and memory are limited.
+
+    Args:
+        code (str): The Python code to run.
+
+    Returns:
+        str: The captured stdout and stderr, the value of the last expression and any error.
+    """
+    from repl.sandbox import get_sandbox
+    from repl.session import CURRENT_SESSION
+
+    output = get_sandbox().run(code, session=CURRENT_SESSION.get())
+    parts = []
+    if output["stdout"]:
+        parts.append(f"stdout:\n{output['stdout']}")
+    if output["stderr"]:
+        parts.append(f"stderr:\n{output['stderr']}")
+    if output["value"] is not None:
+        parts.append(f"value: {output['value']}")
+    if output["error"]:
+        parts.append(f"error:\n{output['error']}")
+    return Result(value="\n".join(parts) or "(no output)", error=bool(output["error"]))
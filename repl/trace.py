@@ -0,0 +1,486 @@
+"""
+Record/replay of agent runs.
+
+A `TraceRecorder` passed to `ReAct(tracer=...)` appends every `execute` run to a JSONL
+trace: the run input, the prompt messages of each LLM call, the streamed chunks with
+their time offsets and every tool call with its result and duration. Message contents
+are written once and referenced by hash afterwards, so long histories stay compact.
+
+A `TraceReplayer` substitutes the recorded LLM streams and tool results, either with the
+original timing or as fast as possible, so a run can be reproduced without a model server.
+
+Usage:
+    python -m repl.trace trace.jsonl [--run RUN_ID] [--realtime] [--speed 1.0]
+"""
+import argparse
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict, deque
+from typing import Any, Callable, Dict, List, Optional
+
+from repl.cache import make_key
+from repl.types import Result
+
+
+# Prompts render the current date and time, which never matches the recording
+TIMESTAMP = re.compile(r"\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}")
+# Message ids a recorder remembers as written; older messages are written again when they recur
+MAX_MESSAGE_IDS = 10000
+
+
+def message_id(message: Dict[str, Any]) -> str:
+    return make_key(message)[:16]
+
+
+def prompt_signature(messages: List[Dict[str, Any]]) -> str:
+    """Hash of a prompt with timestamps masked, to detect prompts that changed since recording."""
+    return make_key([
+        {**m, "content": TIMESTAMP.sub("<date>", m["content"])} if isinstance(m.get("content"), str) else m
+        for m in messages
+    ])
+
+
+def dump_result(result) -> Dict[str, Any]:
+    if isinstance(result, Result):
+        return {"result": result.model_dump(include={"value", "error", "finish", "repeat"})}
+    return {"value": result if isinstance(result, (str, int, float, bool, type(None))) else str(result)}
+
+
+def load_result(data: Dict[str, Any]):
+    if "result" in data:
+        return Result(**data["result"])
+    return data.get("value")
+
+
+def dump_step_config(step_config: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+    """The step config as JSON. Step models are stored by their model name, not as objects."""
+    config = {}
+    for step, settings in step_config.items():
+        settings = dict(settings)
+        llm = settings.get("llm")
+        if llm is not None and not isinstance(llm, dict):
+            model = getattr(llm, "model", None)
+            if model:
+                settings["llm"] = {"model": model}
+            else:
+                del settings["llm"]
+        config[step] = settings
+    return config
+
+
+def tool_key(action: Any) -> str:
+    if not isinstance(action, dict):
+        return make_key(action)
+    return make_key(action.get("action"), action.get("parameters", {}))
+
+
+class RecordingStream:
+    def __init__(self, stream, recorder: "TraceRecorder", event: Dict[str, Any], start: float):
+        """
+        Passes a completion stream through and writes it to the trace with the time offset
+        of every chunk once the stream is exhausted, closed or fails.
+        """
+        self.stream = stream
+        self.recorder = recorder
+        self.event = event
+        self.start = start
+        self.chunks = []
+        self._written = False
+
+    def _add(self, chunk):
+        self.chunks.append([round(time.perf_counter() - self.start, 4), chunk.model_dump(exclude_none=True)])
+
+    def _write(self, closed: bool = False, error: Optional[str] = None, aborted: bool = False):
+        if self._written:
+            return
+        self._written = True
+        event = {**self.event, "chunks": self.chunks, "closed": closed}
+        if error:
+            event["error"] = error
+        if aborted:
+            event["aborted"] = True
+        self.recorder.write(event)
+
+    def abort(self):
+        """
+        Records the chunks streamed so far as an aborted call, e.g. of a run whose client left.
+        The caller closes the HTTP stream below this wrapper.
+        """
+        self._write(aborted=True)
+
+    def __iter__(self):
+        try:
+            for chunk in self.stream:
+                self._add(chunk)
+                yield chunk
+        except Exception as e:
+            self._write(error=str(e))
+            raise
+        self._write()
+
+    def close(self):
+        self._write(closed=True)
+        close = getattr(self.stream, "close", None)
+        if close:
+            close()
+
+
+class AsyncRecordingStream(RecordingStream):
+    async def __aiter__(self):
+        try:
+            async for chunk in self.stream:
+                self._add(chunk)
+                yield chunk
+        except Exception as e:
+            self._write(error=str(e))
+            raise
+        self._write()
+
+    async def close(self):
+        self._write(closed=True)
+        close = getattr(self.stream, "close", None) or getattr(self.stream, "aclose", None)
+        if close:
+            result = close()
+            if asyncio.iscoroutine(result):
+                await result
+
+
+class TraceRecorder:
+    def __init__(self, path: str):
+        """
+        Appends agent runs to a JSONL trace file. One recorder can be shared by several
+        agents; writes are serialized and flushed line by line, so a crashed process
+        leaves a readable trace.
+
+        Args:
+            path (str): The trace file. Existing traces are appended to.
+        """
+        self.path = path
+        self._file = open(path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+        # Ids of the messages already written, least recently used first
+        self._messages = OrderedDict()
+
+    def write(self, event: Dict[str, Any]) -> None:
+        line = json.dumps(event, separators=(",", ":"), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+    def message_ids(self, messages: List[Dict[str, Any]]) -> List[str]:
+        """Writes message contents not yet in the trace and returns their ids."""
+        ids = []
+        for message in messages:
+            mid = message_id(message)
+            with self._lock:
+                new = mid not in self._messages
+                self._messages[mid] = None
+                self._messages.move_to_end(mid)
+                if len(self._messages) > MAX_MESSAGE_IDS:
+                    self._messages.popitem(last=False)
+            if new:
+                self.write({"ev": "msg", "id": mid, "message": message})
+            ids.append(mid)
+        return ids
+
+    def start_run(self, input_str: str, messages: List[Dict[str, Any]], tools: List[str], settings: Optional[Dict[str, Any]] = None) -> str:
+        """
+        Writes the header of a run.
+
+        Args:
+            input_str (str): The user input.
+            messages (List[Dict[str, Any]]): The history the run starts with.
+            tools (List[str]): The names of the run's tools.
+            settings (Optional[Dict[str, Any]]): `ReAct` arguments that shape the prompts
+                ("step_config", "tool_mode", "prompt_layout", "context"), so a replay uses the same.
+        """
+        run = uuid.uuid4().hex[:12]
+        settings = dict(settings or {})
+        if "step_config" in settings:
+            settings["step_config"] = dump_step_config(settings["step_config"])
+        self.write({
+            "ev": "run", "run": run, "ts": time.time(), "input": input_str,
+            "history": self.message_ids(messages), "tools": tools, "settings": settings,
+        })
+        return run
+
+    def end_run(self, run: str, response: List[Dict[str, Any]]) -> None:
+        self.write({"ev": "end", "run": run, "ts": time.time(), "response": response})
+
+    def _llm_event(self, run, step, llm, messages, functions, response_format) -> Dict[str, Any]:
+        return {
+            "ev": "llm", "run": run, "step": step, "ts": time.time(),
+            "model": getattr(llm, "model", None), "messages": self.message_ids(messages),
+            "tools": bool(functions), "response_format": bool(response_format),
+        }
+
+    def completion(self, run, step, llm, messages, functions=None, response_format=None):
+        """Requests a stream from `llm` and records it."""
+        event = self._llm_event(run, step, llm, messages, functions, response_format)
+        start = time.perf_counter()
+        try:
+            stream = llm.get_chat_completion(messages, functions=functions, stream=True, response_format=response_format)
+        except Exception as e:
+            self.write({**event, "chunks": [], "error": str(e)})
+            raise
+        return RecordingStream(stream, self, event, start)
+
+    async def acompletion(self, run, step, llm, messages, functions=None, response_format=None):
+        event = self._llm_event(run, step, llm, messages, functions, response_format)
+        start = time.perf_counter()
+        try:
+            stream = await llm.get_chat_completion(messages, functions=functions, stream=True, response_format=response_format)
+        except Exception as e:
+            self.write({**event, "chunks": [], "error": str(e)})
+            raise
+        return AsyncRecordingStream(stream, self, event, start)
+
+    def tool_call(self, run, action, call: Callable):
+        """Runs `call(action)` and records the tool result and its duration."""
+        start = time.perf_counter()
+        try:
+            result = call(action)
+        except Exception as e:
+            self._write_tool(run, action, start, {"raised": str(e)})
+            raise
+        self._write_tool(run, action, start, dump_result(result))
+        return result
+
+    async def atool_call(self, run, action, call: Callable):
+        start = time.perf_counter()
+        try:
+            result = await call(action)
+        except Exception as e:
+            self._write_tool(run, action, start, {"raised": str(e)})
+            raise
+        self._write_tool(run, action, start, dump_result(result))
+        return result
+
+    def _write_tool(self, run, action, start, outcome):
+        self.write({
+            "ev": "tool", "run": run, "ts": time.time(), "key": tool_key(action),
+            "action": action, "seconds": round(time.perf_counter() - start, 4), **outcome,
+        })
+
+
+def load_trace(path: str):
+    """
+    Reads a trace file.
+
+    Returns:
+        Tuple[Dict[str, Dict], Dict[str, Dict]]: The messages by id and the runs by id,
+        each run with its "run" event, "llm" and "tool" events in order and its "end" event.
+    """
+    messages = {}
+    runs = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                event = json.loads(line)
+            except json.JSONDecodeError:
+                # Partially written last line of a crashed process
+                continue
+            kind = event.get("ev")
+            if kind == "msg":
+                messages[event["id"]] = event["message"]
+            elif kind == "run":
+                runs[event["run"]] = {"start": event, "llm": [], "tool": [], "end": None}
+            elif event.get("run") in runs:
+                if kind == "end":
+                    runs[event["run"]]["end"] = event
+                else:
+                    runs[event["run"]][kind].append(event)
+    return messages, runs
+
+
+class ReplayStream:
+    def __init__(self, chunks, realtime: bool, speed: float):
+        """Replays recorded chunks, optionally at their recorded time offsets."""
+        self.chunks = chunks
+        self.realtime = realtime
+        self.speed = speed
+        self.closed = False
+
+    def delay(self, start: float, offset: float) -> float:
+        return max(0.0, offset / self.speed - (time.perf_counter() - start)) if self.realtime else 0.0
+
+    def __iter__(self):
+        from openai.types.chat import ChatCompletionChunk
+
+        start = time.perf_counter()
+        for offset, chunk in self.chunks:
+            if self.closed:
+                return
+            wait = self.delay(start, offset)
+            if wait:
+                time.sleep(wait)
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    async def __aiter__(self):
+        from openai.types.chat import ChatCompletionChunk
+
+        start = time.perf_counter()
+        for offset, chunk in self.chunks:
+            if self.closed:
+                return
+            wait = self.delay(start, offset)
+            if wait:
+                await asyncio.sleep(wait)
+            yield ChatCompletionChunk.model_validate(chunk)
+
+    def close(self):
+        self.closed = True
+
+
+class TraceReplayer:
+    def __init__(self, path: str, run: Optional[str] = None, realtime: bool = False, speed: float = 1.0):
+        """
+        Substitutes recorded LLM streams and tool results for one run of a trace.
+
+        LLM calls are answered in recorded order per step, tool calls by their action and
+        parameters. Prompts that differ from the recording are collected in `divergences`.
+
+        Args:
+            path (str): The trace file.
+            run (Optional[str]): The run to replay. Defaults to the last run in the trace.
+            realtime (bool): Keep the recorded time to first token, token timing and tool durations.
+            speed (float): Speed-up factor for realtime replay.
+        """
+        self.messages, self.runs = load_trace(path)
+        if not self.runs:
+            raise ValueError(f"No runs in trace: {path}")
+        if run is not None and run not in self.runs:
+            raise ValueError(f"Unknown run: {run}")
+        self.run = self.runs[run or list(self.runs)[-1]]
+        self.realtime = realtime
+        self.speed = speed
+        self.divergences = []
+        self._lock = threading.Lock()
+        self.reset()
+
+    @property
+    def input(self) -> str:
+        return self.run["start"]["input"]
+
+    @property
+    def history(self) -> List[Dict[str, Any]]:
+        return [self.messages[mid] for mid in self.run["start"]["history"]]
+
+    @property
+    def tool_names(self) -> List[str]:
+        return self.run["start"]["tools"]
+
+    @property
+    def settings(self) -> Dict[str, Any]:
+        """The recorded `ReAct` arguments of the run, empty for traces written without them."""
+        return self.run["start"].get("settings", {})
+
+    def reset(self) -> None:
+        self._llm = defaultdict(deque)
+        for event in self.run["llm"]:
+            self._llm[event["step"]].append(event)
+        self._tools = defaultdict(deque)
+        for event in self.run["tool"]:
+            self._tools[event["key"]].append(event)
+
+    def start_run(self, input_str, messages, tools, settings=None) -> str:
+        return self.run["start"]["run"]
+
+    def end_run(self, run, response) -> None:
+        pass
+
+    def _next_llm(self, step, messages) -> Dict[str, Any]:
+        with self._lock:
+            if not self._llm[step]:
+                raise RuntimeError(f"Trace has no further LLM call for step '{step}'")
+            event = self._llm[step].popleft()
+        recorded = [self.messages.get(mid, {}) for mid in event["messages"]]
+        if prompt_signature(messages) != prompt_signature(recorded):
+            self.divergences.append({"step": step, "ts": event["ts"]})
+            logging.warning(f"Replay prompt for step '{step}' differs from the recording")
+        if event.get("error") and not event["chunks"]:
+            raise RuntimeError(event["error"])
+        return event
+
+    def completion(self, run, step, llm, messages, functions=None, response_format=None):
+        return ReplayStream(self._next_llm(step, messages)["chunks"], self.realtime, self.speed)
+
+    async def acompletion(self, run, step, llm, messages, functions=None, response_format=None):
+        return ReplayStream(self._next_llm(step, messages)["chunks"], self.realtime, self.speed)
+
+    def _next_tool(self, action) -> Dict[str, Any]:
+        with self._lock:
+            queue = self._tools.get(tool_key(action))
+            event = queue.popleft() if queue else None
+        if event is None:
+            name = action.get("action") if isinstance(action, dict) else None
+            return {"result": {"value": f"Tool call {name} is not in the trace", "error": True, "repeat": True}, "seconds": 0}
+        return event
+
+    def _outcome(self, event):
+        if "raised" in event:
+            raise RuntimeError(event["raised"])
+        return load_result(event)
+
+    def tool_call(self, run, action, call: Callable):
+        event = self._next_tool(action)
+        if self.realtime and event["seconds"]:
+            time.sleep(event["seconds"] / self.speed)
+        return self._outcome(event)
+
+    async def atool_call(self, run, action, call: Callable):
+        event = self._next_tool(action)
+        if self.realtime and event["seconds"]:
+            await asyncio.sleep(event["seconds"] / self.speed)
+        return self._outcome(event)
+
+    def replay(self, agent, tools: Optional[List[Callable]] = None, **kwargs):
+        """
+        Re-runs the recorded run on `agent`, which must have been created with `tracer=self`.
+        Tools default to the recorded tool names looked up in `repl.tools`.
+
+        Yields:
+            The events of `agent.execute`.
+        """
+        if tools is None:
+            from repl.plugins import available_tools, load_tools
+            tools = load_tools([name for name in self.tool_names if name in available_tools()])
+        self.reset()
+        yield from agent.execute(self.input, self.history, tools=tools, **kwargs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("trace", help="JSONL trace written by TraceRecorder")
+    parser.add_argument("--run", help="Run id, defaults to the last run")
+    parser.add_argument("--realtime", action="store_true", help="Keep the recorded timing")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up factor for --realtime")
+    args = parser.parse_args()
+
+    from ReAct import ReAct
+    from repl.llm import LLM
+
+    replayer = TraceReplayer(args.trace, args.run, args.realtime, args.speed)
+    # The client is never called during a replay; the step config and prompt layout are the recorded ones
+    agent = ReAct(llm=LLM(client=object()), tracer=replayer, **replayer.settings)
+    start = time.perf_counter()
+    for event in replayer.replay(agent):
+        if "content" in event:
+            print(event["content"], end="", flush=True)
+        if "error" in event:
+            print(f"\nError: {event['error']}")
+    print(f"\n\nReplayed run {replayer.run['start']['run']} in {time.perf_counter() - start:.2f}s, "
+          f"{len(replayer.divergences)} diverging prompts")
+
+
+if __name__ == "__main__":
+    main()
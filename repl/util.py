@@ -118,6 +118,12 @@ def process_and_print_streaming_response(response):
         if "error" in chunk:
             print(f"\033[91mError:\033[0m {chunk['error']}")  # Print error in red color
             
+        if chunk.get("reset"):
+            # The step is re-run on another model; its streamed content so far is discarded
+            print(f"\n\033[93m[discarded, escalating to {chunk.get('escalate_to') or 'another model'}]\033[0m")
+            content = ""
+            continue
+
         if "step" in chunk:
             if chunk["step"] != last_sender:
                 # Reset content when the sender changes
@@ -0,0 +1,354 @@
+"""
+HTTP server that streams ReAct runs as Server-Sent Events.
+
+Endpoints:
+    POST /v1/runs              {"query": "...", "session_id": "...", "max_turns": 20, "stream": true}
+                               Streams the {"content", "step"} / {"error"} / {"response"} events
+                               as `data:` lines, followed by `data: [DONE]`. A {"reset", "step"}
+                               event means the step's content so far is discarded (the step is
+                               re-run on the escalation model).
+                               With "stream": false the final response is returned as JSON.
+    GET  /v1/sessions/<id>     The stored history of a session.
+    GET  /health               Active and queued runs.
+    GET  /metrics              Prometheus metrics (see repl.metrics).
+
+Runs execute on a fixed set of agents, one per worker. A request waits up to
+--queue-timeout for a free worker; when --max-queue requests are already waiting it is
+rejected immediately with 503. A run whose client disconnects is cancelled.
+
+Usage:
+    python server.py [--port 8000] [--workers 4] [--max-queue 16] [--db sessions.db]
+                     [--model phi4:14b] [--base-url http://localhost:11434/v1/] [--fused]
+"""
+import argparse
+import json
+import logging
+import queue
+import select
+import socket
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class SessionBusy(Exception):
+    pass
+
+
+class MemorySessions:
+    def __init__(self):
+        """In-memory session histories, used when the server has no session store."""
+        self.histories = {}
+        self._lock = threading.Lock()
+
+    def history(self, session_id):
+        with self._lock:
+            return list(self.histories.get(session_id, []))
+
+    def append(self, session_id, messages):
+        with self._lock:
+            self.histories.setdefault(session_id, []).extend(m for m in messages if m)
+
+
+class AgentServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, agent_factory, tools, workers: int = 4, max_queue: int = 16,
+                 queue_timeout: float = 30.0, max_turns: int = 20, session_store=None):
+        """
+        HTTP server running agent runs with admission control.
+
+        Args:
+            address (Tuple[str, int]): Host and port to listen on.
+            agent_factory (Callable[[], ReAct]): Builds one agent per worker. Agents are reused
+                across runs, but never used by two runs at once.
+            tools (List[Callable]): The tools of every run.
+            workers (int): Maximum number of concurrent runs.
+            max_queue (int): Maximum number of requests waiting for a worker.
+            queue_timeout (float): Seconds a request waits for a worker before it is rejected.
+            max_turns (int): Default and upper limit of a run's turns.
+            session_store (Optional[SessionStore]): Persists session histories and checkpoints.
+                Without one, histories are kept in memory.
+        """
+        super().__init__(address, AgentHandler)
+        self.tools = tools
+        self.workers = workers
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.max_turns = max_turns
+        self.session_store = session_store
+        self.memory_sessions = MemorySessions()
+        self.agents = queue.Queue()
+        for _ in range(workers):
+            self.agents.put(agent_factory())
+        self.waiting = 0
+        self.active = 0
+        self.rejected = 0
+        self.cancelled = 0
+        self.running_sessions = set()
+        self.closed = False
+        self._lock = threading.Lock()
+
+    def server_close(self):
+        super().server_close()
+        # Agents of runs still in progress are closed when they are released
+        self.closed = True
+        while True:
+            try:
+                self.agents.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers, "active": self.active, "queued": self.waiting,
+                "max_queue": self.max_queue, "rejected": self.rejected, "cancelled": self.cancelled,
+            }
+
+    def acquire(self, gone):
+        """
+        Waits for a free agent.
+
+        Args:
+            gone (Callable[[], bool]): Whether the client has disconnected while waiting.
+
+        Returns:
+            Optional[ReAct]: The agent, or None if the queue is full, the wait timed out or the client left.
+        """
+        with self._lock:
+            if self.waiting >= self.max_queue and self.agents.empty():
+                self.rejected += 1
+                return None
+            self.waiting += 1
+        try:
+            deadline = time.monotonic() + self.queue_timeout
+            while time.monotonic() < deadline:
+                try:
+                    agent = self.agents.get(timeout=max(0.0, min(0.5, deadline - time.monotonic())))
+                except queue.Empty:
+                    if gone():
+                        return None
+                    continue
+                with self._lock:
+                    self.active += 1
+                return agent
+            with self._lock:
+                self.rejected += 1
+            return None
+        finally:
+            with self._lock:
+                self.waiting -= 1
+
+    def release(self, agent):
+        with self._lock:
+            self.active -= 1
+        if self.closed:
+            agent.close()
+        else:
+            self.agents.put(agent)
+
+    def claim_session(self, session_id):
+        """Only one run per session at a time, since runs append to the session history."""
+        if session_id is None:
+            return
+        with self._lock:
+            if session_id in self.running_sessions:
+                raise SessionBusy(session_id)
+            self.running_sessions.add(session_id)
+
+    def release_session(self, session_id):
+        with self._lock:
+            self.running_sessions.discard(session_id)
+
+    def start_run(self, agent, query, session_id, max_turns):
+        """Starts the run generator; sessions use the session store or the in-memory histories."""
+        if session_id is not None and self.session_store is not None:
+            return agent.execute(query, None, tools=self.tools, max_turns=max_turns, session_id=session_id)
+        history = self.memory_sessions.history(session_id) if session_id is not None else []
+        return agent.execute(query, history, tools=self.tools, max_turns=max_turns)
+
+    def finish_run(self, session_id, response):
+        if session_id is not None and self.session_store is None and response:
+            self.memory_sessions.append(session_id, response)
+
+    def session_history(self, session_id):
+        if self.session_store is not None:
+            return self.session_store.history(session_id)
+        return self.memory_sessions.history(session_id)
+
+
+class AgentHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        logging.info("%s - %s" % (self.address_string(), format % args))
+
+    def client_gone(self) -> bool:
+        """Checks without blocking whether the client closed the connection."""
+        try:
+            readable, _, _ = select.select([self.connection], [], [], 0)
+            return bool(readable) and self.connection.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
+
+    def _send_json(self, status, data, headers=None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        server = self.server
+        path = self.path.split("?")[0].rstrip("/")
+        if path == "/health":
+            self._send_json(200, server.stats())
+        elif path == "/metrics":
+            from repl.metrics import METRICS
+            body = METRICS.render().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif path.startswith("/v1/sessions/"):
+            self._send_json(200, {"session_id": path.rsplit("/", 1)[1], "history": server.session_history(path.rsplit("/", 1)[1])})
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        server = self.server
+        if self.path.split("?")[0].rstrip("/") != "/v1/runs":
+            self._send_json(404, {"error": "Not found"})
+            return
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+            request = json.loads(self.rfile.read(length) or b"{}")
+            query = request["query"]
+            if not isinstance(query, str) or not query.strip():
+                raise ValueError("empty query")
+        except (ValueError, KeyError, TypeError):
+            self._send_json(400, {"error": 'Expected a JSON body with a non-empty "query" string'})
+            return
+        max_turns = request.get("max_turns", server.max_turns)
+        if isinstance(max_turns, bool) or not isinstance(max_turns, int) or max_turns < 1:
+            self._send_json(400, {"error": '"max_turns" must be a positive integer'})
+            return
+        max_turns = min(max_turns, server.max_turns)
+        session_id = request.get("session_id")
+
+        try:
+            server.claim_session(session_id)
+        except SessionBusy:
+            self._send_json(409, {"error": f"Session {session_id} already has a run in progress"})
+            return
+        try:
+            agent = server.acquire(self.client_gone)
+            if agent is None:
+                self._send_json(503, {"error": "Server busy, try again later", **server.stats()}, {"Retry-After": "5"})
+                return
+            try:
+                if request.get("stream", True):
+                    self.stream_run(agent, query, session_id, max_turns)
+                else:
+                    self.collect_run(agent, query, session_id, max_turns)
+            finally:
+                server.release(agent)
+        finally:
+            server.release_session(session_id)
+
+    def collect_run(self, agent, query, session_id, max_turns):
+        response, error = None, None
+        for event in self.server.start_run(agent, query, session_id, max_turns):
+            if "error" in event:
+                error = event["error"]
+            if "response" in event:
+                response = event["response"]
+        self.server.finish_run(session_id, response)
+        self._send_json(200, {"response": response, "error": error})
+
+    def stream_run(self, agent, query, session_id, max_turns):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        self.close_connection = True
+
+        run = self.server.start_run(agent, query, session_id, max_turns)
+        try:
+            for event in run:
+                if "response" in event:
+                    self.server.finish_run(session_id, event["response"])
+                self.wfile.write(b"data: " + json.dumps(event).encode("utf-8") + b"\n\n")
+                self.wfile.flush()
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Closing the generator stops the LLM stream of the current step
+            with self.server._lock:
+                self.server.cancelled += 1
+            logging.info(f"Client disconnected, run cancelled (session {session_id})")
+        finally:
+            run.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=4, help="Maximum concurrent runs")
+    parser.add_argument("--max-queue", type=int, default=16, help="Maximum requests waiting for a worker")
+    parser.add_argument("--queue-timeout", type=float, default=30.0)
+    parser.add_argument("--model", default="phi4:14b")
+    parser.add_argument("--base-url", default="http://localhost:11434/v1/", help="Comma-separated URLs balance over several backends")
+    parser.add_argument("--hedge-after", type=float, help="Seconds without a first token before a hedged request (with several base URLs)")
+    parser.add_argument("--api-key", default="ollama")
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--fused", action="store_true", help="Use the fused two-step loop")
+    parser.add_argument("--tools", default="web_search,read_url,read_urls")
+    parser.add_argument("--max-turns", type=int, default=20)
+    parser.add_argument("--db", help="SQLite session store; sessions are kept in memory without it")
+    args = parser.parse_args()
+
+    from batch import make_client
+    from ReAct import ReAct
+    from repl.llm import LLM
+    from repl.prompts import STEP_CONFIG, FUSED_STEP_CONFIG
+    from repl.session import SessionStore
+    from repl.plugins import load_tools
+
+    # One client for all workers, so they share its connection pool and outstanding request counts
+    client = make_client({"base_url": args.base_url, "api_key": args.api_key, "timeout": args.timeout, "hedge_after": args.hedge_after})
+    session_store = SessionStore(args.db) if args.db else None
+    tool_names = [name.strip() for name in args.tools.split(",") if name.strip()]
+    tools = load_tools(tool_names)
+    if {"run_code", "write_code", "calculate_expression"} & set(tool_names):
+        # Start the sandbox workers now instead of on the first code step
+        from repl.sandbox import get_sandbox
+        get_sandbox().warm()
+
+    def agent_factory():
+        return ReAct(
+            llm=LLM(model=args.model, client=client),
+            step_config=FUSED_STEP_CONFIG if args.fused else STEP_CONFIG,
+            session_store=session_store,
+        )
+
+    server = AgentServer(
+        (args.host, args.port), agent_factory, tools, workers=args.workers, max_queue=args.max_queue,
+        queue_timeout=args.queue_timeout, max_turns=args.max_turns, session_store=session_store,
+    )
+    print(f"Agent server listening on http://{args.host}:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
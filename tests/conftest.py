@@ -0,0 +1,5 @@
+import os
+import sys
+
+# The agent modules are imported from the repository root, like batch.py and server.py do
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
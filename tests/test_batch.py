@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import batch
+
+
+def test_percentile():
+    assert batch.percentile([], 50) is None
+    assert batch.percentile([3, 1, 2], 50) == 2
+    assert batch.percentile(list(range(1, 101)), 95) == 95
+    assert batch.percentile([5], 99) == 5
+
+
+def test_load_records_fields(tmp_path):
+    path = tmp_path / "in.jsonl"
+    path.write_text(
+        json.dumps({"request_id": "a", "query": "q1"}) + "\n\n"
+        + json.dumps({"id": 7, "title": "T", "body": "B"}) + "\n"
+        + json.dumps({"query": "q3"}) + "\n"
+    )
+    records = batch.load_records(str(path), "request_id", "query")
+    assert records == [{"id": "a", "query": "q1"}, {"id": "7", "query": "T\n\nB"}, {"id": "4", "query": "q3"}]
+
+
+def test_load_done_skips_partial_line_and_errors(tmp_path):
+    path = tmp_path / "out.jsonl"
+    path.write_text(json.dumps({"id": "a", "error": None}) + "\n" + json.dumps({"id": "b", "error": "boom"}) + "\n" + '{"id": "c", "err')
+    assert batch.load_done(str(path), retry_errors=False) == {"a", "b"}
+    assert batch.load_done(str(path), retry_errors=True) == {"a"}
+    assert batch.load_done(str(tmp_path / "missing.jsonl"), retry_errors=False) == set()
+
+
+class InterruptingFile:
+    """Output file that raises KeyboardInterrupt on the first write, like Ctrl-C during the run."""
+
+    def write(self, data):
+        raise KeyboardInterrupt
+
+    def flush(self):
+        pass
+
+
+def test_interrupt_cancels_queued_queries():
+    started = []
+    lock = threading.Lock()
+
+    def run(record):
+        with lock:
+            started.append(record["id"])
+        time.sleep(0.05)
+        return {"id": record["id"], "seconds": 0.05, "error": None}
+
+    pool = ThreadPoolExecutor(max_workers=2)
+    pending = [{"id": str(i), "query": "q"} for i in range(50)]
+    start = time.perf_counter()
+    latencies, errors = batch.run_pending(pool, pending, InterruptingFile(), run=run)
+    pool.shutdown(wait=True)
+
+    assert latencies == [] and errors == 0
+    # Only the queries already running when Ctrl-C arrived were started
+    assert len(started) <= 4
+    assert time.perf_counter() - start < 1.0
+
+
+def test_run_pending_writes_rows(tmp_path):
+    path = tmp_path / "out.jsonl"
+    pending = [{"id": str(i), "query": "q"} for i in range(5)]
+    with ThreadPoolExecutor(max_workers=2) as pool, open(path, "a") as out:
+        latencies, errors = batch.run_pending(pool, pending, out, run=lambda r: {"id": r["id"], "seconds": 1.0, "error": "x" if r["id"] == "3" else None})
+    assert latencies == [1.0] * 5 and errors == 1
+    assert batch.load_done(str(path), retry_errors=True) == {"0", "1", "2", "4"}
+
+
+class MarkerAgent:
+    """Agent whose close() creates a marker file, to see it from the parent process."""
+
+    def __init__(self, path):
+        self.path = path
+
+    def close(self):
+        with open(self.path, "w") as f:
+            f.write("closed")
+
+
+def start_marker_agent(path):
+    batch._agents.append(MarkerAgent(path))
+    return True
+
+
+def test_process_workers_close_their_agents_on_exit(tmp_path):
+    path = str(tmp_path / "closed")
+    pool = ProcessPoolExecutor(max_workers=1, initializer=batch.init_process_worker, initargs=({},))
+    assert pool.submit(start_marker_agent, path).result(timeout=30)
+    pool.shutdown(wait=True)
+    with open(path) as f:
+        assert f.read() == "closed"
@@ -0,0 +1,365 @@
+import asyncio
+import inspect
+import threading
+
+import pytest
+
+from repl import cache
+from repl.cache import MemoryCache, SQLiteCache, TieredCache, cached_tool
+from repl.types import Result
+
+
+def test_memory_size_keeps_large_results_out_of_the_shared_memory_tier(tmp_path):
+    shared = TieredCache(MemoryCache(maxsize=512), SQLiteCache(str(tmp_path / "tools.db")))
+    calls = []
+
+    @cached_tool(ttl=60, cache=shared, memory_size=2)
+    def fetch(url: str) -> str:
+        calls.append(url)
+        return url * 1000
+
+    for url in ("a", "b", "c"):
+        fetch(url)
+    assert len(shared.memory) == 0
+    # "a" was evicted from the tool's own memory tier, but is still on disk
+    assert fetch("a") == "a" * 1000
+    assert calls == ["a", "b", "c"]
+    fetch.cache_clear()
+
+
+def test_memory_size_without_disk_tier(monkeypatch):
+    monkeypatch.setattr(cache, "TOOL_CACHE", TieredCache(MemoryCache(maxsize=512)))
+    calls = []
+
+    @cached_tool(ttl=60, memory_size=1)
+    def fetch(url: str) -> str:
+        calls.append(url)
+        return url
+
+    fetch("a"), fetch("a"), fetch("b"), fetch("a")
+    assert calls == ["a", "b", "a"]
+    assert len(cache.TOOL_CACHE.memory) == 0
+
+
+def test_make_key_is_stable():
+    assert cache.make_key("m", {"a": 1, "b": [1, 2]}) == cache.make_key("m", {"b": [1, 2], "a": 1})
+    assert cache.make_key("m", {"a": 1}) != cache.make_key("m", {"a": 2})
+    assert len(cache.make_key("x")) == 64
+
+
+def test_memory_cache_evicts_least_recently_used():
+    memory = MemoryCache(maxsize=2)
+    memory.set("a", 1)
+    memory.set("b", 2)
+    assert memory.get("a") == 1  # "b" is now the least recently used
+    memory.set("c", 3)
+    assert memory.get("b") is None
+    assert memory.get("a") == 1 and memory.get("c") == 3
+    assert len(memory) == 2
+
+
+def test_memory_cache_ttl():
+    memory = MemoryCache(ttl=60)
+    memory.set("default", 1)
+    memory.set("expired", 2, ttl=-1)
+    assert memory.get("default") == 1
+    assert memory.get("expired", "missing") == "missing"
+    assert len(memory) == 1
+
+
+def test_sqlite_cache_persists(tmp_path):
+    path = str(tmp_path / "cache.db")
+    disk = SQLiteCache(path)
+    disk.set("key", {"chunks": [1, 2, 3]})
+    disk.set("expired", 1, ttl=-1)
+    disk.close()
+
+    disk = SQLiteCache(path)
+    assert disk.get("key") == {"chunks": [1, 2, 3]}
+    assert disk.get("expired") is None
+    disk.delete("key")
+    assert disk.get("key") is None
+
+
+def test_sqlite_cache_evicts_least_recently_accessed(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"), max_bytes=250)
+    value = "x" * 80
+    disk.set("a", value)
+    disk.set("b", value)
+    disk.get("a")
+    disk.set("c", value)
+    assert disk.get("b") is None
+    assert disk.get("a") == value and disk.get("c") == value
+    # Values larger than the whole cache are not stored
+    disk.set("huge", "y" * 1000)
+    assert disk.get("huge") is None
+
+
+def test_sqlite_cache_drops_unreadable_values(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"))
+    disk.set("key", 1)
+    with disk._lock:
+        disk._conn.execute("UPDATE cache SET value = ?", (b"not a pickle",))
+        disk._conn.commit()
+    assert disk.get("key", "default") == "default"
+    assert disk._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 0
+
+
+def test_tiered_cache_promotes_disk_hits(tmp_path):
+    disk = SQLiteCache(str(tmp_path / "cache.db"))
+    disk.set("key", "value")
+    tiered = TieredCache(MemoryCache(), disk)
+    assert tiered.get("missing") is None
+    assert tiered.get("key") == "value"
+    assert tiered.memory.get("key") == "value"
+    assert tiered.stats() == {"hits": 1, "misses": 1, "size": 1}
+    tiered.clear()
+    assert tiered.get("key") is None
+
+
+class FakeCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **params):
+        from openai.types.chat import ChatCompletionChunk
+
+        self.calls += 1
+        text = f"answer at temperature {params['temperature']}"
+        return iter([
+            ChatCompletionChunk.model_validate({
+                "id": "c", "object": "chat.completion.chunk", "created": 0, "model": params["model"],
+                "choices": [{"index": 0, "delta": {"content": text[i:i + 5]}, "finish_reason": None}],
+            })
+            for i in range(0, len(text), 5)
+        ])
+
+
+def make_llm(**kwargs):
+    from types import SimpleNamespace
+
+    from repl.llm import LLM
+
+    completions = FakeCompletions()
+    llm = LLM(client=SimpleNamespace(chat=SimpleNamespace(completions=completions)), cache=TieredCache(MemoryCache()), **kwargs)
+    return llm, completions
+
+
+def streamed_text(stream):
+    return "".join(chunk.choices[0].delta.content for chunk in stream)
+
+
+def test_llm_replays_cached_streams():
+    llm, completions = make_llm()
+    messages = [{"role": "user", "content": "q"}]
+    first = streamed_text(llm.get_chat_completion(messages, stream=True))
+    second = streamed_text(llm.get_chat_completion(messages, stream=True))
+    assert first == second == "answer at temperature 0.1"
+    assert completions.calls == 1
+
+
+def test_llm_cache_key_includes_sampling_parameters():
+    llm, completions = make_llm()
+    messages = [{"role": "user", "content": "q"}]
+    streamed_text(llm.get_chat_completion(messages, stream=True))
+    llm.temperature = 0.7
+    assert streamed_text(llm.get_chat_completion(messages, stream=True)) == "answer at temperature 0.7"
+    assert completions.calls == 2
+
+
+def test_llm_does_not_cache_abandoned_streams():
+    llm, completions = make_llm()
+    messages = [{"role": "user", "content": "q"}]
+    stream = iter(llm.get_chat_completion(messages, stream=True))
+    next(stream)
+    del stream
+    streamed_text(llm.get_chat_completion(messages, stream=True))
+    assert completions.calls == 2
+
+
+def test_llm_caches_streams_closed_early():
+    llm, completions = make_llm()
+    messages = [{"role": "user", "content": "q"}]
+    stream = llm.get_chat_completion(messages, stream=True)
+    next(iter(stream))  # e.g. the JSON response is complete
+    stream.close()
+    assert streamed_text(llm.get_chat_completion(messages, stream=True)) == "answe"
+    assert completions.calls == 1
+
+
+def make_tool(**kwargs):
+    calls = []
+
+    @cached_tool(cache=TieredCache(MemoryCache()), **kwargs)
+    def search(query: str, max_results: int = 5) -> list:
+        """Searches the web."""
+        calls.append((query, max_results))
+        if query == "fail":
+            return Result(value="Error: offline", error=True)
+        return [f"{query} {i}" for i in range(max_results)]
+
+    return search, calls
+
+
+def test_cached_tool_keeps_the_signature():
+    search, _ = make_tool()
+    assert search.__name__ == "search"
+    assert search.__doc__ == "Searches the web."
+    assert list(inspect.signature(search).parameters) == ["query", "max_results"]
+
+
+def test_cached_tool_normalizes_arguments():
+    search, calls = make_tool(casefold=True)
+    first = search("Python  release ")
+    assert search("python release", max_results=5) == first
+    assert search(query="PYTHON RELEASE") == first
+    assert search("python release", 3) != first
+    assert calls == [("Python  release ", 5), ("python release", 3)]
+    assert search.cache_info() == {"hits": 2, "misses": 2, "ttl": 300}
+
+
+def test_cached_tool_is_case_sensitive_by_default():
+    search, calls = make_tool()
+    search("Python")
+    search("python")
+    assert len(calls) == 2
+
+
+def test_cached_tool_returns_copies():
+    search, _ = make_tool()
+    search("q").append("changed")
+    assert search("q") == ["q 0", "q 1", "q 2", "q 3", "q 4"]
+
+
+def test_cached_tool_does_not_cache_errors():
+    search, calls = make_tool()
+    assert search("fail").error
+    assert search("fail").error
+    assert len(calls) == 2
+    assert not cache.is_cacheable("Error: timeout")
+    assert not cache.is_cacheable(Result(value="again", repeat=True))
+    assert cache.is_cacheable(Result(value="ok"))
+
+
+def test_cached_tool_ttl():
+    search, calls = make_tool(ttl=-1)
+    search("q")
+    search("q")
+    assert len(calls) == 2
+
+
+def test_cached_tool_passes_invalid_arguments_through():
+    search, calls = make_tool()
+    with pytest.raises(TypeError):
+        search("q", 1, 2)
+    assert calls == []
+
+
+def test_cached_tool_cache_clear():
+    search, calls = make_tool()
+    search("q")
+    search.cache_clear()
+    assert search.cache_info()["hits"] == search.cache_info()["misses"] == 0
+    search("q")
+    assert len(calls) == 2
+
+
+class ThreadRecordingCache(TieredCache):
+    """Memory cache that records the threads its lookups and stores run on."""
+
+    def __init__(self):
+        super().__init__(MemoryCache())
+        self.threads = []
+
+    def get(self, key, default=None):
+        self.threads.append(threading.current_thread())
+        return super().get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.threads.append(threading.current_thread())
+        super().set(key, value, ttl)
+
+
+def test_async_llm_uses_the_cache_off_the_event_loop():
+    from types import SimpleNamespace
+
+    from repl.llm import AsyncLLM
+
+    completions = FakeCompletions()
+
+    async def create(**params):
+        stream = completions.create(**params)
+
+        async def chunks():
+            for chunk in stream:
+                yield chunk
+
+        return chunks()
+
+    cache = ThreadRecordingCache()
+    llm = AsyncLLM(client=SimpleNamespace(chat=SimpleNamespace(completions=SimpleNamespace(create=create))), cache=cache)
+    messages = [{"role": "user", "content": "q"}]
+
+    async def main():
+        texts = []
+        for _ in range(2):
+            stream = await llm.get_chat_completion(messages, stream=True)
+            texts.append("".join([chunk.choices[0].delta.content async for chunk in stream]))
+        return texts
+
+    assert asyncio.run(main()) == ["answer at temperature 0.1"] * 2
+    assert completions.calls == 1
+    assert len(cache.threads) == 3  # miss, store and hit
+    assert threading.main_thread() not in cache.threads
+
+
+def test_memory_size_counts_in_the_shared_cache(tmp_path, monkeypatch):
+    shared = TieredCache(MemoryCache(), SQLiteCache(str(tmp_path / "tools.db")))
+    monkeypatch.setattr(cache, "TOOL_CACHE", shared)
+
+    @cached_tool(ttl=60, memory_size=2)
+    def fetch(url: str) -> str:
+        return url * 10
+
+    fetch("a")
+    fetch("a")
+    assert shared.stats()["hits"] == 1 and shared.stats()["misses"] == 1
+
+    # A replaced shared cache gets a tier of its own
+    other = TieredCache(MemoryCache())
+    monkeypatch.setattr(cache, "TOOL_CACHE", other)
+    fetch("a")
+    assert other.stats()["misses"] == 1
+
+
+def test_cache_clear_deletes_only_the_tools_entries(tmp_path):
+    shared = TieredCache(MemoryCache(), SQLiteCache(str(tmp_path / "tools.db")))
+    calls = []
+
+    @cached_tool(cache=shared, memory_size=2)
+    def fetch(url: str) -> str:
+        calls.append(url)
+        return url
+
+    @cached_tool(cache=shared)
+    def search(query: str) -> str:
+        calls.append(query)
+        return query
+
+    fetch("page")
+    search("query")
+    fetch.cache_clear()
+    fetch("page")
+    search("query")
+    assert calls == ["page", "query", "page"]
+    # The disk tier no longer has the old entry either
+    assert shared.disk._conn.execute("SELECT COUNT(*) FROM cache").fetchone()[0] == 2
+
+
+def test_delete_prefix(tmp_path):
+    tiered = TieredCache(MemoryCache(), SQLiteCache(str(tmp_path / "cache.db")))
+    for key in ("a:1", "a:2", "ab:1", "b:1"):
+        tiered.set(key, key)
+    tiered.delete_prefix("a:")
+    assert [tiered.get(key) for key in ("a:1", "a:2", "ab:1", "b:1")] == [None, None, "ab:1", "b:1"]
+    assert tiered.disk.get("a:1") is None
@@ -0,0 +1,106 @@
+import logging
+import sys
+
+from repl.context import MESSAGE_OVERHEAD, ContextManager, TokenCounter
+
+
+class CharTokenizer:
+    """One token per character."""
+
+    def encode(self, text):
+        return list(text)
+
+
+def message(role, content, step=None):
+    return {"role": role, "content": content, "step": step}
+
+
+def make_manager(**kwargs):
+    return ContextManager(counter=TokenCounter(tokenizer=CharTokenizer()), **kwargs)
+
+
+def test_token_counter():
+    counter = TokenCounter(tokenizer=CharTokenizer())
+    assert counter.count("") == 0
+    assert counter.count("abcd") == 4
+    assert counter.count_message(message("user", "abc")) == 3 + MESSAGE_OVERHEAD
+    assert counter.count_message({"role": "assistant", "content": None}) == MESSAGE_OVERHEAD
+
+
+def test_heuristic_without_tokenizer():
+    counter = TokenCounter()
+    counter.tokenizer = None
+    counter.count.cache_clear()
+    assert counter.count("a" * 8) == 2
+    assert counter.count("a" * 9) == 3
+
+
+def test_everything_fits():
+    manager = make_manager(max_tokens=1000, reserve_tokens=0)
+    head, history, question = [message("system", "sys")], [message("user", "old")], [message("user", "q")]
+    memory = [message("assistant", "thought", "think")]
+    assert manager.build("think", head, history, question, memory) == head + history + question + memory
+    assert manager.stats[-1]["dropped"] == 0
+
+
+def test_window_drops_oldest_history_first():
+    head, question = [message("system", "s")], [message("user", "q")]
+    history = [message("user", "h" * 20), message("assistant", "i" * 20)]
+    memory = [message("assistant", "m" * 20)]
+    pinned = 2 * (1 + MESSAGE_OVERHEAD)
+    # Room for the memory message and one history message
+    manager = make_manager(max_tokens=pinned + 2 * (20 + MESSAGE_OVERHEAD), reserve_tokens=0)
+    messages = manager.build("think", head, history, question, memory)
+    assert messages == head + history[1:] + question + memory
+    assert manager.stats[-1]["dropped"] == 1
+
+
+def test_history_is_dropped_when_memory_does_not_fit():
+    head, question = [message("system", "s")], [message("user", "q")]
+    memory = [message("assistant", "a" * 50), message("assistant", "b" * 10)]
+    manager = make_manager(max_tokens=2 * (1 + MESSAGE_OVERHEAD) + 10 + MESSAGE_OVERHEAD, reserve_tokens=0)
+    messages = manager.build("think", head, [message("user", "h")], question, memory)
+    assert messages == head + question + memory[1:]
+
+
+def test_old_tool_outputs_are_compressed():
+    manager = make_manager(max_tokens=10000, keep_recent=1, tool_output_tokens=10)
+    old, recent = message("tool", "x" * 100), message("tool", "y" * 100)
+    messages = manager.build("action", [], [], [], [old, recent])
+    assert messages[0]["content"].startswith("x" * 10 + "\n...[tool output truncated, 90 characters omitted]")
+    assert messages[1] is recent
+    # The original memory message is not modified and its compressed copy is reused
+    assert old["content"] == "x" * 100
+    assert manager.build("action", [], [], [], [old, recent])[0]["content"] == messages[0]["content"]
+
+
+def test_stats_are_bounded():
+    manager = make_manager(max_stats=3)
+    for i in range(10):
+        manager.build(f"step{i}", [], [], [message("user", "q")], [])
+    assert [s["step"] for s in manager.stats] == ["step7", "step8", "step9"]
+
+
+def test_estimated_counts_keep_a_margin_free():
+    counter = TokenCounter()
+    counter.tokenizer = None
+    assert counter.margin == 0.1
+    assert TokenCounter(tokenizer=CharTokenizer()).margin == 0
+
+    history = [message("user", "a" * 43), message("user", "b" * 43)]
+    # Both messages fit 100 tokens, only one fits the 90 left after the margin
+    exact = ContextManager(max_tokens=100, reserve_tokens=0, counter=TokenCounter(tokenizer=CharTokenizer()))
+    assert exact.build("think", [], history, [], []) == history
+    manager = ContextManager(max_tokens=100, reserve_tokens=0, counter=TokenCounter(tokenizer=CharTokenizer(), margin=0.1))
+    assert manager.build("think", [], history, [], []) == history[1:]
+    assert manager.stats[-1]["tokens"] == 43 + MESSAGE_OVERHEAD
+
+
+def test_tokenizer_by_name_falls_back_to_an_estimate(monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "transformers", None)
+    caplog.set_level(logging.INFO)
+    counter = TokenCounter(tokenizer="microsoft/phi-4")
+    assert "Tokenizer microsoft/phi-4 unavailable" in caplog.text
+    assert counter.margin == 0.1
+    assert f"Counting tokens with {counter.description}" in caplog.text
+    assert not counter.description.startswith("tokenizer")
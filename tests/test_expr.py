@@ -0,0 +1,102 @@
+import math
+import sys
+
+import pytest
+
+from repl import expr
+from repl.expr import CompiledExpression, ExpressionError, compile_expression, evaluate, vectorized
+
+
+def test_scalar_evaluation():
+    assert evaluate("sqrt(x**2 + y**2)", {"x": 3, "y": 4}) == 5.0
+    assert evaluate("2 ** 10 // 3 % 7") == 1024 // 3 % 7
+    assert evaluate("1 if x > 0 and not x > 5 else -1", {"x": 3}) == 1
+    assert evaluate("0 < x < 1", {"x": 2}) is False
+    assert evaluate("log(8, 2) + round(pi, 2) + max(1, 2, 3)") == pytest.approx(3 + 3.14 + 3)
+
+
+@pytest.mark.parametrize("expression", [
+    "__import__('os')",
+    "x.__class__",
+    "open('f')",
+    "[1, 2][0]",
+    "'text'",
+    "(lambda: 1)()",
+    "sqrt(x=1)",
+    "_secret + 1",
+    "[x for x in y]",
+])
+def test_rejects_unsupported_syntax(expression):
+    with pytest.raises(ExpressionError):
+        CompiledExpression(expression)
+
+
+def test_rejects_invalid_and_long_expressions():
+    with pytest.raises(ExpressionError, match="Invalid expression"):
+        CompiledExpression("1 +")
+    with pytest.raises(ExpressionError, match="longer than"):
+        CompiledExpression("1+" * expr.MAX_EXPRESSION_LENGTH + "1")
+
+
+def test_rejects_huge_integer_powers():
+    with pytest.raises(ExpressionError, match="too large"):
+        evaluate("9 ** 9 ** 9")
+    assert evaluate("2 ** 64") == 2 ** 64
+    assert evaluate("(-1) ** 10 ** 9") == 1
+    assert evaluate("2.0 ** 0.5") == math.sqrt(2)
+
+
+def test_errors_become_expression_errors():
+    with pytest.raises(ExpressionError, match="ZeroDivisionError"):
+        evaluate("1 / x", {"x": 0})
+    with pytest.raises(ExpressionError, match="ValueError"):
+        evaluate("sqrt(-1)")
+    with pytest.raises(ExpressionError, match="Missing variables: x, y"):
+        evaluate("x + y")
+
+
+def test_variables():
+    compiled = CompiledExpression("a * x + b + pi")
+    assert compiled.variables == ["a", "b", "x"]
+    with pytest.raises(ExpressionError, match="flat list"):
+        compiled.evaluate({"a": 1, "b": 2, "x": [1, [2]]})
+    with pytest.raises(ExpressionError, match="number"):
+        compiled.evaluate({"a": "1", "b": 2, "x": 3})
+    with pytest.raises(ExpressionError, match="same length"):
+        compiled.evaluate({"a": [1, 2], "b": [1, 2, 3], "x": 1})
+
+
+def test_vector_evaluation():
+    assert evaluate("x ** 2 + c", {"x": [1, 2, 3], "c": 1}) == [2, 5, 10]
+    assert evaluate("x if 1 < x < 3 else -x", {"x": [1, 2, 3]}) == [-1, 2, -3]
+    assert evaluate("not x > 1 or x == 3", {"x": [1, 2, 3]}) == [True, False, True]
+    assert evaluate("max(x, 2) + log(x, 10)", {"x": [1, 100]}) == [2, 102]
+    assert evaluate("pi", {"x": [1, 2]}) == [math.pi, math.pi]
+
+
+def test_ranges():
+    assert evaluate("x", {"x": {"start": 1, "stop": 5}}) == [1, 2, 3, 4]
+    assert evaluate("x", {"x": {"start": 0, "stop": 1, "num": 5}}) == [0, 0.25, 0.5, 0.75, 1]
+    assert evaluate("x", {"x": {"start": 0, "stop": 1, "step": 0.5}}) == [0, 0.5]
+    with pytest.raises(ExpressionError, match="step 0"):
+        evaluate("x", {"x": {"stop": 1, "step": 0}})
+    with pytest.raises(ExpressionError, match="at most"):
+        evaluate("x", {"x": {"stop": expr.MAX_ELEMENTS + 1}})
+    with pytest.raises(ExpressionError, match="needs"):
+        evaluate("x", {"x": {"start": 1}})
+
+
+def test_without_numpy(monkeypatch, caplog):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    vectorized.cache_clear()
+    try:
+        compiled = CompiledExpression("x ** 2 if x > 1 else 0")
+        assert compiled.evaluate({"x": [1, 2, 3]}) == [0, 4, 9]
+        assert not vectorized()
+        assert "evaluated per element" in caplog.text
+    finally:
+        vectorized.cache_clear()
+
+
+def test_compiled_expressions_are_cached():
+    assert compile_expression("x + 1") is compile_expression("x + 1")
@@ -0,0 +1,47 @@
+from repl.html_text import TextExtractor, extract_text, extract_text_from_chunks
+
+PAGE = (
+    "<html><head><title>Title</title><style>p { color: red }</style>"
+    "<script>var text = '<p>not text</p>';</script></head>"
+    "<body><p>  First &amp; paragraph </p><noscript>Enable JS</noscript>"
+    "<div>Second<br>line</div></body></html>"
+)
+
+
+def test_extract_text():
+    assert extract_text(PAGE) == "Title\nFirst & paragraph\nSecond\nline"
+
+
+def test_extract_text_budget():
+    assert extract_text(PAGE, max_chars=8) == "Title\nFi"
+
+
+def test_feed_stops_at_the_budget():
+    parser = TextExtractor(max_chars=10)
+    assert not parser.feed("<p>short</p>")
+    assert parser.feed("<p>long enough</p>")
+    parser.feed("<p>ignored</p>")
+    assert parser.get_text() == "short\nlong"
+
+
+def test_chunks_with_split_characters():
+    data = "<p>café – naïve</p>".encode("utf-8")
+    chunks = [data[i:i + 3] for i in range(0, len(data), 3)]
+    assert extract_text_from_chunks(chunks) == "café – naïve"
+    assert extract_text_from_chunks([data], encoding="no-such-codec") == "café – naïve"
+
+
+def test_chunks_stop_reading_early():
+    read = []
+
+    def chunks():
+        for n in range(1000):
+            read.append(n)
+            yield f"<p>paragraph {n}</p>".encode()
+
+    assert extract_text_from_chunks(chunks(), max_chars=30).startswith("paragraph 0\nparagraph 1")
+    assert len(read) == 3
+
+    read.clear()
+    extract_text_from_chunks(chunks(), max_chars=10_000, max_bytes=100)
+    assert len(read) == 6  # 18 bytes each
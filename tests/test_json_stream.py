@@ -0,0 +1,74 @@
+import json
+
+from repl.json_stream import JSONStreamParser, extract_json
+
+
+def feed_all(deltas):
+    parser = JSONStreamParser()
+    for i, delta in enumerate(deltas):
+        end = parser.feed(delta)
+        if end is not None:
+            return parser, i, end
+    return parser, None, None
+
+
+def test_detects_the_end_of_the_object():
+    parser, index, end = feed_all(['```json\n{"act', 'ion": "get_time", ', '"parameters": {}}\n``', '`\nmore'])
+    assert parser.complete
+    assert (index, end) == (2, len('"parameters": {}}'))
+    assert json.loads(parser.get_text()) == {"action": "get_time", "parameters": {}}
+
+
+def test_ignores_brackets_in_strings():
+    text = '{"text": "a } and a ] and \\"quoted {\\" \\\\", "list": [1, [2]]} trailing'
+    parser, _, end = feed_all([text])
+    assert text[:end].endswith("]]}")
+    assert json.loads(parser.get_text())["text"] == 'a } and a ] and "quoted {" \\'
+
+
+def test_char_by_char():
+    text = '[{"a": "\\\\"}, {"b": "}"}] rest'
+    parser, index, end = feed_all(list(text))
+    assert index == text.index(" rest") - 1 and end == 1
+    assert json.loads(parser.get_text()) == [{"a": "\\"}, {"b": "}"}]
+
+
+def test_incomplete():
+    parser, index, _ = feed_all(['Sure: {"a": [1, 2'])
+    assert index is None and not parser.complete
+    assert parser.get_text() == '{"a": [1, 2'
+    assert JSONStreamParser().get_text() == ""
+
+
+def test_feed_after_completion():
+    parser = JSONStreamParser()
+    parser.feed("{}")
+    assert parser.feed("{}") == 0
+    assert parser.get_text() == "{}"
+
+
+def test_extract_json():
+    assert extract_json('Answer:\n```json\n{"a": 1}\n```') == '{"a": 1}'
+    assert extract_json('{"a": 1} {"b": 2}') == '{"a": 1}'
+    assert extract_json("no json here") is None
+    assert extract_json('{"a": ') is None
+
+
+def is_object(value):
+    return isinstance(value, dict)
+
+
+def test_bracketed_preamble_does_not_end_the_value():
+    deltas = ['Using [1] as the', ' index: {"action": "get', '_time", "parameters": {}} done']
+    parser = JSONStreamParser(is_object)
+    ends = [parser.feed(delta) for delta in deltas]
+    assert ends == [None, None, len('_time", "parameters": {}}')]
+    assert json.loads(parser.get_text()) == {"action": "get_time", "parameters": {}}
+    assert extract_json('Using [1] as the index: {"a": 1}', is_object) == '{"a": 1}'
+
+
+def test_invalid_values_are_skipped():
+    assert extract_json('Set {x} first, then {"a": [1]}') == '{"a": [1]}'
+    assert extract_json("[1, 2]") == "[1, 2]"
+    assert extract_json("[1, 2]", is_object) is None
+    assert extract_json('{"a": 1} {"b": 2}', lambda value: "b" in value) == '{"b": 2}'
@@ -0,0 +1,83 @@
+import urllib.request
+
+import pytest
+
+from repl import metrics
+from repl.metrics import MetricsRegistry
+
+
+@pytest.fixture
+def registry():
+    registry = MetricsRegistry(enabled=True)
+    registry.counter("react_tool_calls_total", "Number of tool calls.", ["tool", "status"])
+    registry.histogram("react_step_duration_seconds", "Duration of a step.", ["step"], buckets=(0.1, 1.0))
+    return registry
+
+
+def test_counter_rendering(registry):
+    calls = registry.metrics["react_tool_calls_total"]
+    calls.inc(tool="web_search", status="ok")
+    calls.inc(2, tool="web_search", status="ok")
+    calls.inc(tool='say "hi"\n', status="error")
+    lines = list(calls.render())
+    assert lines == [
+        "# HELP react_tool_calls Number of tool calls.",
+        "# TYPE react_tool_calls counter",
+        'react_tool_calls_total{tool="web_search",status="ok"} 3',
+        'react_tool_calls_total{tool="say \\"hi\\"\\n",status="error"} 1',
+    ]
+
+
+def test_histogram_rendering(registry):
+    durations = registry.metrics["react_step_duration_seconds"]
+    for value in (0.05, 0.1, 0.5, 3.0):
+        durations.observe(value, step="think")
+    assert list(durations.render())[2:] == [
+        'react_step_duration_seconds_bucket{step="think",le="0.1"} 2',
+        'react_step_duration_seconds_bucket{step="think",le="1"} 3',
+        'react_step_duration_seconds_bucket{step="think",le="+Inf"} 4',
+        'react_step_duration_seconds_sum{step="think"} 3.65',
+        'react_step_duration_seconds_count{step="think"} 4',
+    ]
+
+
+def test_render_formats(registry):
+    registry.metrics["react_tool_calls_total"].inc(tool="a", status="ok")
+    text = registry.render()
+    assert text.endswith("\n") and "# EOF" not in text
+    assert registry.render(openmetrics=True).endswith("# EOF\n")
+
+
+def test_snapshot_and_reset(registry):
+    registry.metrics["react_tool_calls_total"].inc(tool="a", status="ok")
+    registry.metrics["react_step_duration_seconds"].observe(0.5, step="think")
+    registry.metrics["react_step_duration_seconds"].observe(1.5, step="think")
+    assert registry.snapshot() == {
+        "react_tool_calls_total": {"a,ok": 1},
+        "react_step_duration_seconds": {"think": {"count": 2, "sum": 2.0, "mean": 1.0}},
+    }
+    registry.reset()
+    assert registry.snapshot() == {"react_tool_calls_total": {}, "react_step_duration_seconds": {}}
+
+
+def test_registering_twice_returns_the_same_metric(registry):
+    assert registry.counter("react_tool_calls_total", "Other.") is registry.metrics["react_tool_calls_total"]
+
+
+def test_http_server(monkeypatch):
+    monkeypatch.setattr(metrics.METRICS, "enabled", False)
+    monkeypatch.setattr(metrics.METRICS, "metrics", {})
+    metrics.METRICS.counter("react_runs_total", "Number of execute runs.").inc()
+    server = metrics.start_http_server(port=0)
+    try:
+        assert metrics.METRICS.enabled
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url, timeout=5) as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert "react_runs_total 1" in response.read().decode()
+        request = urllib.request.Request(url, headers={"Accept": "application/openmetrics-text"})
+        with urllib.request.urlopen(request, timeout=5) as response:
+            assert response.read().decode().endswith("# EOF\n")
+    finally:
+        server.shutdown()
+        server.server_close()
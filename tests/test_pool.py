@@ -0,0 +1,166 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from openai import APIConnectionError
+
+from repl.pool import AsyncEndpointPool, Endpoint, EndpointPool, is_retryable
+
+
+def connection_error():
+    return APIConnectionError(request=None)
+
+
+class FakeClient:
+    """Client whose completions either fail with a connection error or stream the given chunks."""
+
+    def __init__(self, fail=False, chunks=("a", "b")):
+        self.fail = fail
+        self.chunks = list(chunks)
+        self.calls = 0
+        self.probes = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+        self.models = SimpleNamespace(list=self.list_models)
+
+    def create(self, **params):
+        self.calls += 1
+        if self.fail:
+            raise connection_error()
+        return iter(self.chunks)
+
+    def list_models(self, timeout=None):
+        self.probes.append(timeout)
+        if self.fail:
+            raise connection_error()
+        return []
+
+
+def make_pool(*clients, **kwargs):
+    kwargs.setdefault("health_interval", None)
+    kwargs.setdefault("backoff", 0.0)
+    return EndpointPool([Endpoint(f"http://node{i}/v1/", client=c) for i, c in enumerate(clients)], **kwargs)
+
+
+def test_is_retryable():
+    assert is_retryable(connection_error())
+    assert not is_retryable(ValueError("bad request"))
+
+
+def test_pick_prefers_fewest_outstanding():
+    pool = make_pool(FakeClient(), FakeClient())
+    first, second = pool.endpoints
+    pool.acquire(first)
+    assert pool.pick() is second
+    pool.acquire(second)
+    pool.acquire(second)
+    assert pool.pick() is first
+
+
+def test_stream_is_released_when_exhausted():
+    pool = make_pool(FakeClient(chunks=["x", "y", "z"]))
+    stream = pool.create(stream=True)
+    assert pool.endpoints[0].outstanding == 1
+    assert list(stream) == ["x", "y", "z"]
+    assert pool.endpoints[0].outstanding == 0
+
+
+def test_connection_failures_retry_on_another_endpoint():
+    down, up = FakeClient(fail=True), FakeClient()
+    pool = make_pool(down, up, max_failures=1, retries=2)
+    for _ in range(4):
+        assert list(pool.create(stream=True)) == ["a", "b"]
+    assert down.calls == 1
+    assert not pool.endpoints[0].healthy
+    assert pool.stats()["retried"] == 1
+
+
+def test_all_endpoints_down_raises():
+    pool = make_pool(FakeClient(fail=True), FakeClient(fail=True), retries=1)
+    with pytest.raises(APIConnectionError):
+        pool.create(stream=True)
+
+
+def test_health_check_reuses_the_endpoint_client():
+    client = FakeClient()
+    pool = make_pool(client, cooldown=60)
+    pool.endpoints[0].down_until = float("inf")
+    assert pool.check_health(only_unhealthy=True) == {"http://node0/v1/": True}
+    assert pool.endpoints[0].healthy
+    assert pool.check_health() == {"http://node0/v1/": True}
+    assert client.probes == [5.0, 5.0]
+    assert pool.probe_client(pool.endpoints[0]) is client
+
+
+def test_async_pool_builds_one_probe_client_per_endpoint():
+    pool = AsyncEndpointPool(["http://127.0.0.1:1/v1/"], health_interval=None)
+    endpoint = pool.endpoints[0]
+    probe = pool.probe_client(endpoint)
+    assert probe is not endpoint.client
+    assert pool.check_health() == {"http://127.0.0.1:1/v1/": False}
+    assert pool.probe_client(endpoint) is probe
+
+
+class AsyncFakeStream:
+    def __init__(self, chunks):
+        self.chunks = list(chunks)
+        self.closed = False
+
+    async def __aiter__(self):
+        for chunk in self.chunks:
+            yield chunk
+
+    async def close(self):
+        self.closed = True
+
+
+class AsyncFakeClient:
+    def __init__(self, delay):
+        self.delay = delay
+        self.streams = []
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self.create))
+
+    async def create(self, **params):
+        await asyncio.sleep(self.delay)
+        self.streams.append(AsyncFakeStream(["a", "b"]))
+        return self.streams[-1]
+
+
+def make_async_pool(*clients, **kwargs):
+    kwargs.setdefault("health_interval", None)
+    return AsyncEndpointPool([Endpoint(f"http://node{i}/v1/", client=c) for i, c in enumerate(clients)], **kwargs)
+
+
+def test_cancelled_hedged_request_releases_its_endpoints():
+    pool = make_async_pool(AsyncFakeClient(10), AsyncFakeClient(10), hedge_after=0.01)
+
+    async def main():
+        task = asyncio.create_task(pool.create(stream=True))
+        await asyncio.sleep(0.1)
+        assert [e.outstanding for e in pool.endpoints] == [1, 1]
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+        await asyncio.sleep(0.01)
+        # Checked while the loop still runs; asyncio.run would cancel leftover tasks anyway
+        assert [e.outstanding for e in pool.endpoints] == [0, 0]
+
+    asyncio.run(main())
+    assert pool.stats()["hedges"] == 1
+
+
+def test_hedged_request_discards_the_slower_stream():
+    slow, fast = AsyncFakeClient(0.2), AsyncFakeClient(0.0)
+    pool = make_async_pool(slow, fast, hedge_after=0.01)
+
+    async def main():
+        # The first pick is random; make the slow endpoint the primary
+        pool.endpoints[1].outstanding = 1
+        stream = await pool.create(stream=True)
+        pool.endpoints[1].outstanding -= 1
+        chunks = [chunk async for chunk in stream]
+        await asyncio.sleep(0.3)
+        return chunks
+
+    assert asyncio.run(main()) == ["a", "b"]
+    assert slow.streams[0].closed
+    assert [e.outstanding for e in pool.endpoints] == [0, 0]
@@ -0,0 +1,61 @@
+from ReAct import ReAct
+from repl.prompts import SHARED_PREAMBLE, STEP_CONFIG, PromptTemplate
+
+
+def test_render():
+    template = PromptTemplate("Today: {date}. Tools: {tools}")
+    assert template.fields == {"date", "tools"}
+    assert template.render(date="2024-01-01", tools=["a"]) == "Today: 2024-01-01. Tools: ['a']"
+
+
+def test_missing_values_are_kept():
+    assert PromptTemplate("Reply with {answer!r:>10} on {date}").render(date="Monday") == "Reply with {answer!r:>10} on Monday"
+
+
+def test_literal_braces_are_kept():
+    text = 'Respond with JSON: {"done": true} on {date}'
+    assert PromptTemplate(text).render(date="Monday") == 'Respond with JSON: {"done": true} on Monday'
+    # Not a valid template at all
+    template = PromptTemplate("Close with } and {date}")
+    assert template.fields == set()
+    assert template.render(date="x") == "Close with } and {date}"
+
+
+def test_partial():
+    template = PromptTemplate("{tools} | {date}")
+    partial = template.partial(tools="web_search")
+    assert partial.fields == {"date"}
+    assert partial.render(date="today", tools="ignored") == "web_search | today"
+    assert template.render(tools="other", date="today") == "other | today"
+
+
+def echo(text: str) -> str:
+    """
+    Returns the text.
+
+    Args:
+        text (str): The text.
+    """
+    return text
+
+
+def test_system_prompt_has_tools_and_fresh_date(monkeypatch):
+    agent = ReAct(llm=None, step_config=STEP_CONFIG)
+    agent.use_tools([echo])
+    monkeypatch.setattr("ReAct.get_current_date", lambda: "DAY ONE")
+    first = agent.get_system_prompt("action")
+    assert "echo" in first and "{tools}" not in first
+    monkeypatch.setattr("ReAct.get_current_date", lambda: "DAY TWO")
+    assert agent.get_system_prompt("action") == first.replace("DAY ONE", "DAY TWO")
+
+
+def test_prefix_layout_shares_the_head_of_all_steps():
+    agent = ReAct(llm=None, step_config=STEP_CONFIG, prompt_layout="prefix")
+    agent.use_tools([echo])
+    history = [{"role": "user", "content": "earlier"}]
+    question = [{"role": "user", "content": "question"}]
+    think = agent.build_messages("think", history, question, [])
+    action = agent.build_messages("action", history, question, [])
+    assert think[0] == action[0] == {"role": "system", "content": SHARED_PREAMBLE}
+    assert think[:3] == action[:3]
+    assert think[-1]["content"] != action[-1]["content"]
@@ -0,0 +1,207 @@
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+
+from ReAct import ReAct
+from repl.prompts import ACTION_SCHEMA, REFLECTION_SCHEMA
+from repl.routing import ModelRouter
+from repl.session import CURRENT_QUERY, CURRENT_SESSION
+
+
+def chunk(text):
+    return SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=text, tool_calls=None))])
+
+
+class FakeStream:
+    def __init__(self, text, pause=None):
+        self.text = text
+        self.pause = pause
+        self.closed = False
+
+    def __iter__(self):
+        for i in range(0, len(self.text), 4):
+            yield chunk(self.text[i:i + 4])
+
+    async def __aiter__(self):
+        for i in range(0, len(self.text), 4):
+            yield chunk(self.text[i:i + 4])
+            await asyncio.sleep(self.pause or 0)
+
+    def close(self):
+        self.closed = True
+
+
+class FakeLLM:
+    """Replies with fixed text, or with `reply(messages)`, and keeps the streams it returned."""
+
+    def __init__(self, reply, pause=None):
+        self.reply = reply
+        self.pause = pause
+        self.streams = []
+
+    def _stream(self, messages):
+        text = self.reply(messages) if callable(self.reply) else self.reply
+        self.streams.append(FakeStream(text, self.pause))
+        return self.streams[-1]
+
+    def get_chat_completion(self, messages, functions=None, stream=False, response_format=None):
+        return self._stream(messages)
+
+
+class AsyncFakeLLM(FakeLLM):
+    async def get_chat_completion(self, messages, functions=None, stream=False, response_format=None):
+        return self._stream(messages)
+
+
+def user_input(messages):
+    return next(m["content"] for m in messages if m["role"] == "user")
+
+
+def make_agent(llm_class=FakeLLM, action='{"action": "echo", "parameters": {"text": "hi"}}', think="Let me think.", pause=None):
+    config = {
+        "think": {"prompt": "Think.", "llm": llm_class(think, pause)},
+        "action": {"prompt": "Act with {tools}", "schema": ACTION_SCHEMA, "llm": llm_class(action)},
+        "reflection": {"prompt": "Reflect.", "schema": REFLECTION_SCHEMA, "llm": llm_class('{"done": true, "reason": "ok"}')},
+    }
+    return ReAct(llm=llm_class("unused"), step_config=config, router=ModelRouter(escalate_on_failure=False))
+
+
+def echo(text: str) -> str:
+    """
+    Returns the text.
+
+    Args:
+        text (str): The text.
+    """
+    return text
+
+
+async def collect(events):
+    return [event async for event in events]
+
+
+def test_execute_runs_steps_and_tools():
+    events = list(make_agent().execute("question", [], tools=[echo]))
+    assert {"content": "hi", "step": "tool"} in events
+    assert "".join(e["content"] for e in events if e.get("step") == "think") == "Let me think."
+    assert events[-1]["response"][0] == {"role": "user", "content": "question"}
+
+
+def test_aexecute_yields_the_same_events_as_execute():
+    sync_events = list(make_agent().execute("question", [], tools=[echo]))
+    async_events = asyncio.run(collect(make_agent(AsyncFakeLLM).aexecute("question", [], tools=[echo])))
+    assert async_events == sync_events
+
+
+def test_invalid_tool_parameters_repeat_the_action():
+    agent = make_agent(action='{"action": "echo", "parameters": {"wrong": 1}}')
+    events = list(agent.execute("question", [], tools=[echo], max_turns=6))
+    assert {"content": "No Tool Result. Try again.", "step": "tool"} in events
+
+
+def test_concurrent_aexecute_runs_keep_their_session_and_question():
+    async def whoami() -> str:
+        """Returns the session and question the tool sees."""
+        await asyncio.sleep(0.01)
+        return f"{CURRENT_SESSION.get()}|{CURRENT_QUERY.get()}"
+
+    def sync_whoami() -> str:
+        """Returns the session and question the tool sees, from a worker thread."""
+        return f"{CURRENT_SESSION.get()}|{CURRENT_QUERY.get()}"
+
+    for tool in (whoami, sync_whoami):
+        agent = make_agent(AsyncFakeLLM, action=f'{{"action": "{tool.__name__}", "parameters": {{}}}}')
+
+        async def main():
+            return await asyncio.gather(*(collect(agent.aexecute(f"question {n}", [], tools=[tool])) for n in range(5)))
+
+        for n, events in enumerate(asyncio.run(main())):
+            session, query = next(e["content"] for e in events if e.get("step") == "tool").split("|")
+            assert query == f"question {n}"
+            assert session != "None"
+
+
+def test_closing_execute_aborts_the_stream():
+    agent = make_agent()
+    events = agent.execute("question", [], tools=[echo])
+    next(events)
+    events.close()
+    assert agent.step_llms["think"].streams[0].closed
+
+
+def test_cancelled_aexecute_aborts_the_stream():
+    agent = make_agent(AsyncFakeLLM, think="a long answer " * 10, pause=10)
+
+    async def main():
+        started = asyncio.Event()
+
+        async def consume():
+            async for _ in agent.aexecute("question", [], tools=[echo]):
+                started.set()
+
+        task = asyncio.create_task(consume())
+        await started.wait()
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert agent.step_llms["think"].streams[0].closed
+
+
+def test_escalation_emits_a_reset_between_attempts():
+    config = {"reflection": {"prompt": "Reflect.", "schema": REFLECTION_SCHEMA, "llm": FakeLLM('{"done": "maybe"}')}}
+    default = FakeLLM('{"done": true, "reason": "ok"}')
+    default.model = "big"
+    agent = ReAct(llm=default, step_config=config)
+    events = list(agent.execute("question", [], tools=[]))
+
+    reset = next(i for i, e in enumerate(events) if e.get("reset"))
+    assert events[reset] == {"reset": True, "step": "reflection", "escalate_to": "big"}
+    before = "".join(e.get("content", "") for e in events[:reset])
+    after = "".join(e.get("content", "") for e in events[reset + 1:])
+    assert before == '{"done": "maybe"}'
+    assert after == '{"done": true, "reason": "ok"}'
+
+
+def test_close_shuts_down_the_tool_pool():
+    actions = '{"actions": [{"action": "echo", "parameters": {"text": "a"}}, {"action": "echo", "parameters": {"text": "b"}}]}'
+    with make_agent(action=actions) as agent:
+        events = list(agent.execute("question", [], tools=[echo]))
+        assert {"content": "[echo] a", "step": "tool"} not in events
+        assert {"content": "a", "step": "tool"} in events and {"content": "b", "step": "tool"} in events
+        pool = agent._tool_pool
+        assert pool is not None
+    assert agent._tool_pool is None
+    assert pool._shutdown
+
+
+def test_runs_without_a_session_remove_their_tool_state(tmp_path):
+    from repl import retrieval, sandbox
+
+    def use_state() -> str:
+        """Writes into the scratch directory and indexes a page."""
+        session = CURRENT_SESSION.get()
+        open(os.path.join(sandbox.get_sandbox().scratch_dir(session), "data.txt"), "w").close()
+        retrieval.get_index(session).add("https://example.com", "some page text")
+        return session
+
+    sandbox.configure_sandbox(root=str(tmp_path))
+    try:
+        agent = make_agent(action='{"action": "use_state", "parameters": {}}')
+        events = list(agent.execute("question", [], tools=[use_state]))
+        session = next(e["content"] for e in events if e.get("step") == "tool")
+        assert os.listdir(tmp_path) == []
+        assert session not in retrieval._indexes
+    finally:
+        sandbox.configure_sandbox(root=None)
+
+
+def test_bracketed_preamble_does_not_end_the_action_step():
+    agent = make_agent(action='Using [1] as the index: {"action": "echo", "parameters": {"text": "hi"}} trailing text')
+    events = list(agent.execute("question", [], tools=[echo]))
+    assert {"content": "hi", "step": "tool"} in events
+    action = "".join(e["content"] for e in events if e.get("step") == "action")
+    assert action.startswith("Using [1]") and action.endswith('{"text": "hi"}}')
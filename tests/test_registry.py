@@ -0,0 +1,84 @@
+import json
+
+from repl.registry import Tool, ToolRegistry
+
+
+def get_weather(city: str, days: int = 1, unit: str = None) -> str:
+    """
+    Gets the weather forecast of a city.
+
+    Args:
+        city (str): The city.
+        days (int): Number of days.
+        unit (str): "C" or "F".
+    """
+    return f"{city}: sunny for {days} days"
+
+
+def log_event(name: str, **fields):
+    """Logs an event."""
+    return name
+
+
+def error_of(result):
+    assert result.error and result.repeat
+    return json.loads(result.value)
+
+
+def test_parameters_schema():
+    schema = Tool.parameters_schema(get_weather)
+    assert schema == {
+        "type": "object",
+        "properties": {"city": {"type": "string"}, "days": {"type": "integer"}, "unit": {"type": ["string", "null"]}},
+        "required": ["city"],
+        "additionalProperties": False,
+    }
+    assert "additionalProperties" not in Tool.parameters_schema(log_event)
+
+
+def test_validate():
+    tool = Tool(get_weather)
+    assert tool.validate({"city": "Oslo", "unit": None}) == []
+    errors = tool.validate({"city": 3, "days": "two"})
+    assert sorted(error["parameter"] for error in errors) == ["city", "days"]
+    assert tool.validate({})[0]["parameter"] == "parameters"
+    assert Tool(log_event).validate({"name": "x", "anything": 1}) == []
+
+
+def test_dispatch_runs_valid_calls():
+    registry = ToolRegistry([get_weather])
+    assert registry.dispatch({"action": "get_weather", "parameters": {"city": "Oslo", "days": 2}}) == "Oslo: sunny for 2 days"
+
+
+def test_dispatch_rejects_invalid_calls():
+    registry = ToolRegistry([get_weather])
+    assert error_of(registry.dispatch("get_weather"))["error"] == "invalid_action"
+    assert error_of(registry.dispatch({"action": "get_time"}))["error"] == "unknown_action"
+    assert error_of(registry.dispatch({"error": "Invalid JSON", "raw_content": "{"}))["error"] == "invalid_response"
+
+    error = error_of(registry.dispatch({"action": "get_weather", "parameters": {"city": "Oslo", "country": "NO"}}))
+    assert error["error"] == "invalid_parameters"
+    assert error["action"] == "get_weather"
+    assert "country" in error["details"][0]["message"]
+
+
+def test_resolve():
+    registry = ToolRegistry([get_weather])
+    tool, error = registry.resolve({"action": "get_weather", "parameters": {"city": "Oslo"}})
+    assert error is None and tool.func is get_weather
+
+
+def test_descriptions_and_schemas_are_cached_until_registration():
+    registry = ToolRegistry([get_weather])
+    descriptions = registry.descriptions()
+    assert registry.descriptions() is descriptions
+    assert registry.schemas()[0]["function"]["name"] == "get_weather"
+    registry.register(log_event)
+    assert len(registry.descriptions()) == len(registry.schemas()) == 2
+
+
+def test_matches():
+    registry = ToolRegistry([get_weather, log_event])
+    assert registry.matches([log_event, get_weather])
+    assert not registry.matches([get_weather])
+    assert set(registry.function_map) == {"get_weather", "log_event"}
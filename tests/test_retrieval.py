@@ -0,0 +1,104 @@
+import pytest
+
+from repl import retrieval
+from repl.retrieval import DocumentIndex, chunk_text, estimate_tokens, get_index, tokenize
+
+
+def test_tokenize_drops_stopwords_and_single_characters():
+    assert tokenize("What is the Boiling point of H2O, a liquid?") == ["boiling", "point", "h2o", "liquid"]
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd") == 1
+    assert estimate_tokens("abcde") == 2
+
+
+def test_chunk_text_packs_whole_lines():
+    lines = [f"line {i} " + "x" * 40 for i in range(10)]
+    chunks = chunk_text("\n".join(lines), max_chars=110)
+    assert all(len(chunk) <= 110 for chunk in chunks)
+    assert chunks[0] == "\n".join(lines[:2])
+    assert "\n".join(chunks) == "\n".join(lines)
+
+
+def test_chunk_text_splits_long_lines_at_sentences():
+    text = "First sentence is here. " * 10
+    chunks = chunk_text(text, max_chars=100)
+    assert all(len(chunk) <= 100 for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert chunk_text("  \n\n ") == []
+
+
+def test_chunk_text_splits_words_without_spaces():
+    assert chunk_text("y" * 250, max_chars=100) == ["y" * 100, "y" * 100, "y" * 50]
+
+
+def make_index(**kwargs):
+    index = DocumentIndex(chunk_chars=60, **kwargs)
+    index.add("a", "Paris is the capital of France.\nThe Seine flows through Paris.\nCheese is popular.")
+    index.add("b", "Berlin is the capital of Germany.\nBerlin has many museums.")
+    return index
+
+
+def test_search_ranks_by_relevance():
+    results = make_index().search("capital of Germany")
+    assert results[0]["source"] == "b" and results[0]["index"] == 0
+    assert results[0]["score"] > results[-1]["score"]
+
+
+def test_search_within_one_source():
+    results = make_index().search("capital", source="a")
+    assert {r["source"] for r in results} == {"a"}
+
+
+def test_search_respects_the_token_budget():
+    index = make_index()
+    results = index.search("Paris Berlin capital museums Seine", max_tokens=20)
+    assert sum(estimate_tokens(r["text"]) for r in results) <= 20
+    # A chunk larger than the budget is cut instead of returning nothing
+    only = index.search("Paris", max_tokens=2)
+    assert len(only) == 1 and len(only[0]["text"]) == 8
+
+
+def test_search_without_matches():
+    assert make_index().search("volcano") == []
+    assert DocumentIndex().search("anything") == []
+
+
+def test_unchanged_document_is_not_reindexed():
+    index = make_index()
+    chunks = dict(index.chunks)
+    assert index.add("a", "Paris is the capital of France.\nThe Seine flows through Paris.\nCheese is popular.") == index.chunk_count("a")
+    assert index.chunks == chunks
+    # Only a digest of the text is kept, not the text itself
+    assert "text" not in index.documents["a"]
+
+
+def test_changed_document_replaces_its_chunks():
+    index = make_index()
+    index.add("a", "Lyon is known for food.")
+    assert index.chunk_count("a") == 1
+    assert index.search("Seine") == []
+    assert index.search("Lyon")[0]["source"] == "a"
+
+
+def test_oldest_documents_are_evicted():
+    index = make_index(max_documents=2)
+    index.add("c", "Rome is the capital of Italy.")
+    assert "a" not in index and "b" in index and "c" in index
+    assert len(index) == 2
+    assert all(chunk["source"] != "a" for chunk in index.chunks.values())
+    assert "seine" not in index.postings
+    assert index.total_length == sum(chunk["length"] for chunk in index.chunks.values())
+
+
+def test_indexes_are_per_session(monkeypatch):
+    monkeypatch.setattr(retrieval, "MAX_SESSIONS", 2)
+    monkeypatch.setattr(retrieval, "_indexes", type(retrieval._indexes)())
+    first = get_index("one")
+    assert get_index("one") is first and get_index("two") is not first
+    get_index("three")
+    assert get_index("one") is not first
+    retrieval.drop_index("one")
+    assert "one" not in retrieval._indexes
@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from repl.routing import ModelRouter
+
+SMALL, LARGE, OTHER = object(), object(), object()
+
+
+def test_route():
+    router = ModelRouter()
+    assert router.route("reflection", SMALL, LARGE) == [SMALL, LARGE]
+    assert router.route("think", None, LARGE) == [LARGE]
+    assert ModelRouter(escalation_llm=OTHER).route("think", None, LARGE) == [LARGE, OTHER]
+    assert ModelRouter(escalate_on_failure=False).route("reflection", SMALL, LARGE) == [SMALL]
+
+
+def test_should_escalate_counts_invalid_responses():
+    router = ModelRouter()
+    assert not router.should_escalate("action", {"action": "get_time", "parameters": {}})
+    assert router.should_escalate("action", {"error": "Invalid JSON"})
+    assert router.should_escalate("action", [{"action": "a", "parameters": {}}, {"error": "Schema"}])
+    assert not router.should_escalate("reflection", [{"done": True}])
+    assert router.escalations == {"action": 2}
+
+
+def test_escalations_are_counted_across_threads():
+    router = ModelRouter()
+    with ThreadPoolExecutor(8) as pool:
+        list(pool.map(lambda i: router.should_escalate(f"step{i % 2}", {"error": "Invalid JSON"}), range(2000)))
+    assert router.escalations == {"step0": 1000, "step1": 1000}
@@ -0,0 +1,119 @@
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from repl.sandbox import Sandbox
+
+
+@pytest.fixture(scope="module")
+def sandbox(tmp_path_factory):
+    sandbox = Sandbox(workers=4, timeout=5, cpu_seconds=5, memory_mb=512, root=str(tmp_path_factory.mktemp("sandbox")))
+    sandbox.warm()
+    yield sandbox
+    sandbox.close()
+
+
+def test_value_of_last_expression(sandbox):
+    result = sandbox.run("x = 6\nx * 7")
+    assert result["value"] == "42"
+    assert result["error"] is None
+
+
+def test_stdout_and_stderr_are_captured(sandbox):
+    result = sandbox.run("import sys\nprint('out')\nprint('err', file=sys.stderr)")
+    assert result["stdout"] == "out\n"
+    assert result["stderr"] == "err\n"
+
+
+def test_error_has_only_snippet_frames(sandbox):
+    result = sandbox.run("def f():\n    return 1 / 0\nf()")
+    assert result["error"].startswith("Traceback")
+    assert "ZeroDivisionError" in result["error"]
+    assert "sandbox.py" not in result["error"]
+
+
+def test_syntax_error(sandbox):
+    result = sandbox.run("def (:")
+    assert "SyntaxError" in result["error"]
+
+
+def test_timeout_kills_job(sandbox):
+    result = sandbox.run("while True: pass", timeout=0.5)
+    assert result["timed_out"]
+    assert result["error"].startswith("Timed out")
+    # The worker is usable afterwards
+    assert sandbox.run("1 + 1")["value"] == "2"
+
+
+def test_output_is_truncated(sandbox):
+    result = sandbox.run(f"print('x' * {sandbox.max_output * 2})")
+    assert result["stdout"].endswith("[output truncated]")
+
+
+def test_concurrent_jobs_of_one_session_keep_their_output(sandbox):
+    code = "import time\nfor _ in range(20):\n    print({n})\n    time.sleep(0.005)"
+    with ThreadPoolExecutor(8) as pool:
+        results = list(pool.map(lambda n: sandbox.run(code.format(n=n), session="shared"), range(8)))
+    for n, result in enumerate(results):
+        assert result["stdout"] == f"{n}\n" * 20
+
+
+def test_capture_files_are_removed(sandbox):
+    sandbox.run("print('hello')", session="clean")
+    assert os.listdir(sandbox.scratch_dir("clean")) == []
+
+
+def test_sessions_have_separate_working_directories(sandbox):
+    sandbox.run("open('data.txt', 'w').write('a')", session="one")
+    result = sandbox.run("import os\nos.path.exists('data.txt')", session="two")
+    assert result["value"] == "False"
+
+
+def test_write_code_uses_a_file_per_call(tmp_path):
+    from repl import sandbox as sandbox_module
+    from repl.tools import write_code
+
+    sandbox_module.configure_sandbox(workers=1, root=str(tmp_path))
+    try:
+        first, second = write_code("a = 1"), write_code("b = 2")
+        assert first != second
+        assert os.path.dirname(first) == os.path.dirname(second)
+        assert open(first).read() == "a = 1"
+    finally:
+        sandbox_module.configure_sandbox(root=None)
+
+
+def test_value_is_truncated(sandbox):
+    result = sandbox.run(f"'x' * {sandbox.max_output * 100}")
+    assert len(result["value"]) < sandbox.max_output + 100
+    assert result["value"].endswith("[output truncated]")
+
+
+def test_waiting_for_a_worker_counts_towards_the_timeout(tmp_path):
+    sandbox = Sandbox(workers=1, timeout=5, root=str(tmp_path))
+    try:
+        sandbox.warm()
+        with ThreadPoolExecutor(2) as pool:
+            busy = pool.submit(sandbox.run, "import time\ntime.sleep(2)")
+            time.sleep(0.3)
+            result = sandbox.run("1", timeout=0.5)
+        assert result["timed_out"] and "free sandbox worker" in result["error"]
+        assert result["seconds"] < 1.5
+        assert busy.result()["error"] is None
+    finally:
+        sandbox.close()
+
+
+def test_scratch_dirs_do_not_start_workers(tmp_path):
+    sandbox = Sandbox(workers=2, root=str(tmp_path))
+    try:
+        path = sandbox.scratch_dir("s")
+        assert os.path.isdir(path)
+        assert sandbox._idle.qsize() == 0
+        sandbox.remove_scratch_dir("s")
+        assert not os.path.exists(path)
+        assert sandbox.run("2 * 3")["value"] == "6"
+    finally:
+        sandbox.close()
@@ -0,0 +1,105 @@
+import json
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from server import AgentServer, MemorySessions, SessionBusy
+
+
+class FakeAgent:
+    def __init__(self):
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def execute(self, query, history, tools, max_turns, session_id=None):
+        yield {"response": [{"role": "user", "content": query}, {"role": "assistant", "content": f"max_turns={max_turns}"}]}
+
+
+@pytest.fixture
+def server():
+    server = AgentServer(("127.0.0.1", 0), FakeAgent, tools=[], workers=2, max_queue=1, queue_timeout=0.2)
+    yield server
+    server.server_close()
+
+
+def test_acquire_and_release(server):
+    first, second = server.acquire(lambda: False), server.acquire(lambda: False)
+    assert first is not second
+    assert server.stats()["active"] == 2
+    # No free agent: the request waits until the queue timeout
+    assert server.acquire(lambda: False) is None
+    assert server.stats()["rejected"] == 1
+    server.release(first)
+    assert server.acquire(lambda: False) is first
+
+
+def test_only_one_run_per_session(server):
+    server.claim_session("s")
+    with pytest.raises(SessionBusy):
+        server.claim_session("s")
+    server.release_session("s")
+    server.claim_session("s")
+    # Runs without a session never conflict
+    server.claim_session(None)
+    server.claim_session(None)
+
+
+def test_server_close_closes_agents(server):
+    busy = server.acquire(lambda: False)
+    idle = server.agents.queue[0]
+    server.server_close()
+    assert idle.closed and not busy.closed
+    server.release(busy)
+    assert busy.closed
+
+
+def test_memory_sessions_skip_empty_messages():
+    sessions = MemorySessions()
+    sessions.append("s", [{"role": "user", "content": "q"}, None])
+    assert sessions.history("s") == [{"role": "user", "content": "q"}]
+    assert sessions.history("other") == []
+
+
+def post(server, body):
+    request = urllib.request.Request(
+        f"http://127.0.0.1:{server.server_address[1]}/v1/runs", data=json.dumps(body).encode(), method="POST",
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=5) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, json.loads(e.read())
+
+
+@pytest.mark.parametrize("body", [
+    {},
+    {"query": ""},
+    {"query": "   "},
+    {"query": 42},
+    {"query": "q", "max_turns": "abc"},
+    {"query": "q", "max_turns": None},
+    {"query": "q", "max_turns": 0},
+    {"query": "q", "max_turns": -3},
+    {"query": "q", "max_turns": 2.5},
+    ["query"],
+])
+def test_invalid_requests_get_400(server, body):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        status, response = post(server, body)
+        assert status == 400 and "error" in response
+    finally:
+        server.shutdown()
+
+
+def test_max_turns_is_capped(server):
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        assert post(server, {"query": "q", "stream": False, "max_turns": 5})[1]["response"][1]["content"] == "max_turns=5"
+        assert post(server, {"query": "q", "stream": False, "max_turns": 500})[1]["response"][1]["content"] == f"max_turns={server.max_turns}"
+    finally:
+        server.shutdown()
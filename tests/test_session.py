@@ -0,0 +1,78 @@
+import pytest
+
+from repl.session import SessionStore
+from test_react import echo, make_agent
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SessionStore(str(tmp_path / "sessions.db"))
+    yield store
+    store.close()
+
+
+def message(n):
+    return {"role": "user", "content": f"message {n}"}
+
+
+def test_history_pages(store):
+    store.append_messages("s", [message(n) for n in range(5)])
+    store.append_messages("s", [message(5), None])
+    assert store.count("s") == 6
+    assert store.history("s") == [message(n) for n in range(6)]
+    assert store.history("s", limit=2) == [message(4), message(5)]
+    assert store.history("s", limit=2, before=4) == [message(2), message(3)]
+    assert store.history("other") == []
+
+
+def test_checkpoint_and_pending_run(store):
+    run = store.start_run("s", "question")
+    assert store.pending_run("s") == {"run": run, "input": "question", "step_idx": 0, "memory": []}
+
+    memory = [{"role": "assistant", "content": "thought"}]
+    saved = store.checkpoint("s", run, 1, memory, 0)
+    memory.append({"role": "assistant", "content": "action"})
+    assert store.checkpoint("s", run, 2, memory, saved) == 2
+    assert store.pending_run("s") == {"run": run, "input": "question", "step_idx": 2, "memory": memory}
+
+    store.finish_run("s", run, [message(0)])
+    assert store.pending_run("s") is None
+    assert store.history("s") == [message(0)]
+    assert store.sessions() == ["s"]
+
+
+def test_new_run_abandons_the_unfinished_one(store):
+    first = store.start_run("s", "first")
+    second = store.start_run("s", "second")
+    assert second == first + 1
+    assert store.pending_run("s")["input"] == "second"
+
+
+def test_pending_run_ignores_memory_past_the_checkpoint(store):
+    run = store.start_run("s", "question")
+    memory = [message(0), message(1)]
+    store.checkpoint("s", run, 1, memory, 0)
+    # A later checkpoint of a shorter memory (e.g. a repeated step) hides the old tail
+    store.checkpoint("s", run, 1, memory[:1], 1)
+    assert store.pending_run("s")["memory"] == [message(0)]
+
+
+def test_agent_resumes_an_interrupted_run(store):
+    agent = make_agent()
+    agent.session_store = store
+    run = agent.execute("question", None, tools=[echo], session_id="s")
+    for event in run:
+        if event.get("step") == "tool":
+            break
+    run.close()
+    pending = store.pending_run("s")
+    assert pending["step_idx"] > 0 and pending["memory"]
+
+    think_llm = agent.step_config["think"]["llm"]
+    calls = len(think_llm.streams)
+    events = list(agent.resume("s", tools=[echo]))
+    assert events[-1]["response"][0] == {"role": "user", "content": "question"}
+    assert len(think_llm.streams) == calls
+    assert store.pending_run("s") is None
+    assert store.history("s")[0] == {"role": "user", "content": "question"}
+    assert list(agent.resume("s", tools=[echo])) == []
@@ -0,0 +1,186 @@
+import os
+import threading
+import time
+
+import pytest
+
+from repl import symbols
+from repl.symbols import SymbolIndex, parse_c, parse_python
+
+PYTHON_SOURCE = '''\
+RATE = 3
+
+
+class Brake:
+    def apply(self, force):
+        return clamp(force)  # clamp(not_a_reference)
+
+
+def clamp(value):
+    """Uses clamp_limit in a docstring."""
+    return min(value, RATE)
+'''
+
+C_SOURCE = '''\
+#define MAX_FORCE 100
+typedef struct { int force; } BrakeConfig;
+struct Sensor { int value; };
+static int counter = 0;
+void BrakeSystem_Init(BrakeConfig config);
+
+void BrakeSystem_Update(int force) {
+    /* BrakeSystem_Init(config) in a comment */
+    if (force > MAX_FORCE) {
+        counter++;
+    }
+}
+'''
+
+
+def definitions(parsed):
+    return {(s[0], s[1], s[2]) for s in parsed if s[1] != "Reference"}
+
+
+def references(parsed, name):
+    return [(s[3], s[2]) for s in parsed if s[1] == "Reference" and s[0] == name]
+
+
+def test_parse_python_definitions():
+    assert definitions(parse_python(PYTHON_SOURCE)) == {
+        ("RATE", "Variable", "variable definition"),
+        ("Brake", "Class", "class definition"),
+        ("apply", "Method", "method definition"),
+        ("clamp", "Function", "function definition"),
+    }
+
+
+def test_parse_python_references_skip_comments_strings_and_definitions():
+    parsed = parse_python(PYTHON_SOURCE)
+    assert references(parsed, "clamp") == [(5, "function call")]
+    assert references(parsed, "RATE") == [(10, "reference")]
+    assert references(parsed, "not_a_reference") == [] and references(parsed, "clamp_limit") == []
+    assert references(parsed, "self") == []
+
+
+def test_parse_python_invalid_source():
+    assert parse_python("def broken(:\n") == []
+
+
+def test_parse_c():
+    parsed = parse_c(C_SOURCE)
+    assert definitions(parsed) == {
+        ("MAX_FORCE", "Macro", "macro definition"),
+        ("BrakeConfig", "Type", "typedef"),
+        ("Sensor", "Type", "struct definition"),
+        ("counter", "Variable", "variable definition"),
+        ("BrakeSystem_Init", "Function", "function declaration"),
+        ("BrakeSystem_Update", "Function", "function definition"),
+    }
+    update = next(s for s in parsed if s[0] == "BrakeSystem_Update")
+    assert (update[3], update[5]) == (6, 11)
+    assert references(parsed, "BrakeSystem_Init") == []
+    assert references(parsed, "MAX_FORCE") == [(8, "reference")]
+
+
+@pytest.fixture
+def tree(tmp_path):
+    root = tmp_path / "src"
+    root.mkdir()
+    (root / "brake.py").write_text(PYTHON_SOURCE)
+    (root / "brake.c").write_text(C_SOURCE)
+    (root / "__pycache__").mkdir()
+    (root / "__pycache__" / "skipped.py").write_text("skipped = 1\n")
+    return root
+
+
+@pytest.fixture
+def index(tmp_path, tree):
+    index = SymbolIndex(str(tmp_path / "symbols.db"), [str(tree)], workers=1)
+    yield index
+    index.close()
+
+
+def test_find_definitions_before_references(index):
+    assert index.update()["files"] == 2
+    results = index.find("clamp")
+    assert [(r["file"], r["kind"]) for r in results] == [("brake.py", "Function"), ("brake.py", "Reference")]
+    assert results[1]["content"] == "return clamp(force)  # clamp(not_a_reference)"
+    assert results[0]["range"] == [{"line": 8, "character": 0}, {"line": 10, "character": 27}]
+    assert index.find("skipped") == []
+
+
+def test_unknown_name_falls_back_to_similar_definitions(index):
+    index.update()
+    assert [r["file"] for r in index.find("BrakeSys")] == ["brake.c", "brake.c"]
+    assert {r["kind"] for r in index.find("akeSystem_Up")} == {"Function"}
+
+
+def test_update_is_incremental(index, tree):
+    index.update()
+    os.utime(tree / "brake.py")  # touched, same content
+    (tree / "extra.py").write_text("def extra():\n    pass\n")
+    (tree / "brake.c").unlink()
+    stats = index.update()
+    assert (stats["unchanged"], stats["parsed"], stats["removed"]) == (1, 1, 1)
+    assert index.find("BrakeSystem_Update") == []
+    assert index.update()["parsed"] == 0
+
+
+def trigram_names(index):
+    return {row[0] for row in index._reader().execute("SELECT DISTINCT name FROM name_trigrams")}
+
+
+def test_trigrams_of_removed_names_are_pruned(index, tree):
+    index.update()
+    assert {"BrakeSystem_Update", "clamp"} <= trigram_names(index)
+
+    (tree / "brake.c").unlink()
+    (tree / "brake.py").write_text("def clamp2(value):\n    return value\n")
+    index.update()
+    assert trigram_names(index) == {"clamp2"}
+    assert index.similar_names("lamp") == ["clamp2"]
+
+
+def test_trigrams_of_names_still_defined_elsewhere_are_kept(index, tree):
+    (tree / "other.py").write_text("def clamp(value):\n    return value\n")
+    index.update()
+    (tree / "brake.py").unlink()
+    index.update()
+    assert "clamp" in trigram_names(index)
+
+
+def test_first_call_indexes_in_the_background(tmp_path, tree, monkeypatch):
+    release = threading.Event()
+    original = SymbolIndex._update
+
+    def slow_update(self):
+        release.wait(5)
+        return original(self)
+
+    monkeypatch.setattr(SymbolIndex, "_update", slow_update)
+    symbols.configure_symbols(path=str(tmp_path / "shared.db"), roots=[str(tree)])
+    try:
+        from repl.tools import find_symbol
+
+        start = time.perf_counter()
+        result = find_symbol("clamp")
+        assert time.perf_counter() - start < 1.0
+        assert "still being built (0 files so far)" in result.value
+
+        release.set()
+        index = symbols.get_symbol_index()
+        for _ in range(100):
+            if not index.building:
+                break
+            time.sleep(0.05)
+        assert [r["kind"] for r in find_symbol("clamp")] == ["Function", "Reference"]
+    finally:
+        release.set()
+        symbols.configure_symbols(path="symbols.db", roots=[])
+
+
+def test_find_symbol_without_roots():
+    symbols.configure_symbols(roots=[])
+    from repl.tools import find_symbol
+
+    assert find_symbol("x").error
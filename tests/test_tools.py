@@ -0,0 +1,77 @@
+import json
+
+import pytest
+
+from repl import retrieval, tools
+from repl.session import CURRENT_QUERY, CURRENT_SESSION
+from repl.types import Result
+
+PAGE = "\n".join(
+    ["Welcome to the site. Navigation and menus."] * 30
+    + ["The boiling point of water at sea level is 100 degrees Celsius."]
+    + ["Footer text, links and copyright."] * 30
+)
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    fetched = []
+
+    def fetch_page(url):
+        fetched.append(url)
+        if "missing" in url:
+            return Result(value="Error fetching website: 404", error=True)
+        return Result(value=PAGE.replace("water", f"water ({url})"), error=False)
+
+    monkeypatch.setattr(tools, "fetch_page", fetch_page)
+    monkeypatch.setattr(retrieval, "_indexes", type(retrieval._indexes)())
+    return fetched
+
+
+def in_run(session, query, func, *args):
+    session_token, query_token = CURRENT_SESSION.set(session), CURRENT_QUERY.set(query)
+    try:
+        return func(*args)
+    finally:
+        CURRENT_SESSION.reset(session_token)
+        CURRENT_QUERY.reset(query_token)
+
+
+def test_read_url_returns_the_relevant_passage(pages):
+    result = in_run("s", "boiling point of water", tools.read_url, "http://a")
+    assert not result.error
+    assert result.value.startswith("[1 of ")
+    assert "100 degrees Celsius" in result.value
+    assert "Use search_fetched" in result.value
+    assert len(result.value) < len(PAGE) / 2
+
+
+def test_read_url_without_question_returns_the_start(pages):
+    result = in_run("s", None, tools.read_url, "http://a")
+    assert result.value.startswith("[First ")
+    assert "Welcome to the site" in result.value
+
+
+def test_read_url_passes_errors_through(pages):
+    assert in_run("s", "q", tools.read_url, "http://missing").error
+
+
+def test_search_fetched_searches_the_session_pages(pages):
+    assert in_run("s", "q", tools.search_fetched, "boiling").error
+    in_run("s", "weather", tools.read_url, "http://a")
+    in_run("s", "weather", tools.read_url, "http://b")
+    result = in_run("s", "q", tools.search_fetched, "boiling point")
+    assert "[http://a]" in result.value and "[http://b]" in result.value
+    # Other sessions do not see the pages
+    assert in_run("other", "q", tools.search_fetched, "boiling").error
+    assert "No passages" in in_run("s", "q", tools.search_fetched, "volcano").value
+
+
+def test_read_urls_runs_in_the_callers_session(pages):
+    result = in_run("s", "boiling point", tools.read_urls, ["http://a", "http://missing"])
+    entries = json.loads(result.value)
+    assert [entry["error"] for entry in entries] == [False, True]
+    assert "100 degrees Celsius" in entries[0]["content"]
+    assert "http://a" in retrieval.get_index("s")
+    assert not result.error
+    assert tools.read_urls([]).error
@@ -0,0 +1,160 @@
+import json
+
+import pytest
+from openai.types.chat import ChatCompletionChunk
+
+from ReAct import ReAct
+from repl.llm import LLM
+from repl.prompts import ACTION_SCHEMA, REFLECTION_SCHEMA
+from repl.routing import ModelRouter
+from repl.trace import TraceRecorder, TraceReplayer, load_trace, prompt_signature
+from repl.types import Result
+
+
+def chunks(text):
+    for i in range(0, len(text), 4):
+        yield ChatCompletionChunk.model_validate({
+            "id": "c", "object": "chat.completion.chunk", "created": 0, "model": "m",
+            "choices": [{"index": 0, "delta": {"content": text[i:i + 4]}, "finish_reason": None}],
+        })
+
+
+class ChunkLLM:
+    model = "m"
+
+    def __init__(self, text):
+        self.text = text
+
+    def get_chat_completion(self, messages, functions=None, stream=False, response_format=None):
+        if self.text is None:
+            raise AssertionError("The model is not called during a replay")
+        return chunks(self.text)
+
+
+def make_agent(tracer, replies=("Thinking.", '{"action": "lookup", "parameters": {"key": "a"}}', '{"done": true, "reason": "ok"}')):
+    think, action, reflection = replies
+    config = {
+        "think": {"prompt": "Think. Today: {date}", "llm": ChunkLLM(think)},
+        "action": {"prompt": "Act with {tools}", "schema": ACTION_SCHEMA, "llm": ChunkLLM(action)},
+        "reflection": {"prompt": "Reflect.", "schema": REFLECTION_SCHEMA, "llm": ChunkLLM(reflection)},
+    }
+    return ReAct(llm=ChunkLLM(None), step_config=config, router=ModelRouter(escalate_on_failure=False), tracer=tracer)
+
+
+def make_lookup(calls):
+    def lookup(key: str) -> Result:
+        """
+        Looks a key up.
+
+        Args:
+            key (str): The key.
+        """
+        calls.append(key)
+        return Result(value=f"value of {key}")
+
+    return lookup
+
+
+def test_record_and_replay(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    calls = []
+    recorder = TraceRecorder(path)
+    history = [{"role": "user", "content": "earlier question"}]
+    recorded = list(make_agent(recorder).execute("question", history, tools=[make_lookup(calls)]))
+    recorder.close()
+    assert calls == ["a"]
+
+    messages, runs = load_trace(path)
+    (run,) = runs.values()
+    assert [event["step"] for event in run["llm"]] == ["think", "action", "reflection"]
+    assert run["tool"][0]["result"]["value"] == "value of a"
+    assert run["end"]["response"] == recorded[-1]["response"]
+    # Message contents are written once and referenced by id
+    assert sum(1 for m in messages.values() if m == history[0]) == 1
+
+    replayer = TraceReplayer(path)
+    assert replayer.input == "question" and replayer.history == history
+    replayed = list(replayer.replay(make_agent(replayer, (None, None, None)), tools=[make_lookup(calls)]))
+    assert replayed == recorded
+    assert calls == ["a"]
+    assert replayer.divergences == []
+
+
+def test_replay_reports_diverging_prompts_and_unknown_tools(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    recorder = TraceRecorder(path)
+    list(make_agent(recorder).execute("question", [], tools=[make_lookup([])]))
+    recorder.close()
+
+    replayer = TraceReplayer(path)
+    agent = make_agent(replayer, (None, None, None))
+    agent.step_config["think"]["prompt"] = "Think differently."
+    list(replayer.replay(agent, tools=[make_lookup([])]))
+    assert [d["step"] for d in replayer.divergences] == ["think"]
+    assert replayer.tool_call(None, {"action": "lookup", "parameters": {"key": "b"}}, None).repeat
+
+
+def test_load_trace_skips_a_partial_last_line(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    path.write_text(json.dumps({"ev": "run", "run": "r", "input": "q", "history": [], "tools": []}) + "\n{\"ev\": \"llm\", \"ru")
+    _, runs = load_trace(str(path))
+    assert runs["r"]["llm"] == [] and runs["r"]["end"] is None
+
+
+def test_replayer_errors(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    path.write_text("")
+    with pytest.raises(ValueError, match="No runs"):
+        TraceReplayer(str(path))
+
+
+def test_prompt_signature_ignores_timestamps():
+    assert prompt_signature([{"role": "system", "content": "Today: 2024-01-01 10:00:00"}]) == \
+        prompt_signature([{"role": "system", "content": "Today: 2025-06-30 23:59:59"}])
+
+
+def test_aborted_steps_are_recorded(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    recorder = TraceRecorder(path)
+    run = make_agent(recorder, ("A long thought that is interrupted.", None, None)).execute("question", [], tools=[])
+    next(run)
+    run.close()
+    recorder.close()
+
+    _, runs = load_trace(path)
+    (event,) = next(iter(runs.values()))["llm"]
+    assert event["step"] == "think" and event["aborted"]
+    assert len(event["chunks"]) >= 1
+
+
+def test_replay_uses_the_recorded_settings(tmp_path):
+    path = str(tmp_path / "trace.jsonl")
+    recorder = TraceRecorder(path)
+    agent = make_agent(recorder)
+    agent.context = "Recorded context"
+    agent.prompt_layout = "prefix"
+    recorded = list(agent.execute("question", [], tools=[make_lookup([])]))
+    recorder.close()
+
+    replayer = TraceReplayer(path)
+    settings = replayer.settings
+    assert settings["prompt_layout"] == "prefix" and settings["context"] == "Recorded context"
+    assert settings["step_config"]["think"] == {"prompt": "Think. Today: {date}", "llm": {"model": "m"}}
+    # As in `python -m repl.trace`: an agent built from the recorded settings only
+    replay_agent = ReAct(llm=LLM(client=object()), tracer=replayer, router=ModelRouter(escalate_on_failure=False), **settings)
+    assert list(replayer.replay(replay_agent, tools=[make_lookup([])])) == recorded
+    assert replayer.divergences == []
+
+
+def test_recorder_remembers_a_bounded_number_of_messages(tmp_path, monkeypatch):
+    monkeypatch.setattr("repl.trace.MAX_MESSAGE_IDS", 2)
+    path = str(tmp_path / "trace.jsonl")
+    recorder = TraceRecorder(path)
+    messages = [{"role": "user", "content": str(n)} for n in range(3)]
+    recorder.message_ids(messages)
+    assert len(recorder._messages) == 2
+    # The oldest message was forgotten and is written again
+    recorder.message_ids(messages[:1])
+    recorder.close()
+    with open(path) as f:
+        assert sum(1 for line in f if json.loads(line)["message"] == messages[0]) == 2